@@ -0,0 +1,231 @@
+"""Batch analysis of recorded interviews.
+
+Processes a directory (or manifest) of recordings on a pool of worker threads
+that share one warm model cache, appending one JSON line per recording. The
+JSONL output doubles as the checkpoint: re-running with the same --output
+skips recordings that already have a result.
+
+Usage (from backend/):
+    python batch_analyze.py recordings/ --output results.jsonl --workers 2
+    python batch_analyze.py manifest.txt --output results.jsonl --parquet results.parquet --profile thorough
+
+A manifest is a text file with one path per line, or a .jsonl file with
+{"path": ..., "id": ...} objects. Relative paths are resolved against the
+manifest's directory.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from utils import media_index
+from utils.analyze import final_confidence_score
+from utils.profiles import PROFILES
+
+VIDEO_EXTENSIONS = {".webm", ".mp4", ".mov", ".mkv", ".avi", ".m4v"}
+
+
+def discover_inputs(source, recursive=False):
+    """Return [(id, path)] from a directory or a manifest file"""
+    if os.path.isdir(source):
+        entries = []
+        for root, dirs, files in os.walk(source):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                    path = os.path.join(root, name)
+                    entries.append((os.path.relpath(path, source), path))
+            if not recursive:
+                break
+        return sorted(entries)
+
+    base_dir = os.path.dirname(os.path.abspath(source))
+    entries = []
+    with open(source, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if source.endswith(".jsonl"):
+                record = json.loads(line)
+                path = record["path"]
+                job_id = record.get("id", path)
+            else:
+                path = job_id = line
+            if not os.path.isabs(path):
+                path = os.path.join(base_dir, path)
+            entries.append((job_id, path))
+    return entries
+
+
+def load_checkpoint(output_path, retry_failed=False):
+    """IDs already present in the output file (optionally ignoring failures)"""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            if retry_failed and record.get("status") != "ok":
+                continue
+            done.add(record.get("id"))
+    return done
+
+
+class ResultWriter:
+    """Appends results as JSON lines; each line is flushed to disk so a crash loses at most one job"""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+class ThroughputStats:
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.video_seconds = 0.0
+        self.processing_seconds = 0.0
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def record(self, ok, video_seconds, processing_seconds):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            self.video_seconds += video_seconds or 0
+            self.processing_seconds += processing_seconds or 0
+
+    def summary(self):
+        elapsed = time.time() - self.started
+        rate = self.done / elapsed if elapsed > 0 else 0
+        remaining = (self.total - self.done) / rate if rate > 0 else None
+        return {
+            "done": self.done,
+            "total": self.total,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 1),
+            "recordings_per_minute": round(rate * 60, 2),
+            "realtime_factor": round(self.video_seconds / elapsed, 2) if elapsed > 0 else None,
+            "avg_processing_seconds": round(self.processing_seconds / self.done, 2) if self.done else None,
+            "eta_seconds": round(remaining) if remaining is not None else None,
+        }
+
+    def line(self):
+        s = self.summary()
+        eta = f"{s['eta_seconds']}s" if s["eta_seconds"] is not None else "?"
+        return (f"[{s['done']}/{s['total']}] {s['recordings_per_minute']} rec/min, "
+                f"{s['realtime_factor']}x realtime, failed={s['failed']}, eta={eta}")
+
+
+def analyze_one(job_id, path, profile):
+    started = time.time()
+    if not os.path.exists(path):
+        result = {"error": "Video file not found"}
+    else:
+        result = final_confidence_score(path, profile=profile)
+    return {
+        "id": job_id,
+        "path": path,
+        "status": "error" if "error" in result else "ok",
+        "analyzed_at": datetime.now().isoformat(),
+        "wall_seconds": round(time.time() - started, 2),
+        "result": result,
+    }
+
+
+def write_parquet(jsonl_path, parquet_path):
+    """Flatten the JSONL results into a Parquet table (needs pandas + pyarrow)"""
+    import pandas as pd
+
+    with open(jsonl_path, "r", encoding="utf-8") as f:
+        records = []
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    frame = pd.json_normalize(records, sep=".")
+    # Nested lists/dicts (e.g. stage attributes) are stored as JSON strings
+    for column in frame.columns:
+        if frame[column].map(lambda v: isinstance(v, (list, dict))).any():
+            frame[column] = frame[column].map(lambda v: json.dumps(v) if isinstance(v, (list, dict)) else v)
+    frame.to_parquet(parquet_path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze a directory or manifest of interview recordings")
+    parser.add_argument("source", help="Directory of recordings, or manifest (.txt / .jsonl)")
+    parser.add_argument("--output", default="batch_results.jsonl", help="JSONL results file (also the checkpoint)")
+    parser.add_argument("--parquet", help="Also write all results to this Parquet file when done")
+    parser.add_argument("--workers", type=int, default=2, help="Recordings analysed concurrently")
+    parser.add_argument("--profile", default="balanced", choices=sorted(PROFILES))
+    parser.add_argument("--recursive", action="store_true", help="Descend into subdirectories")
+    parser.add_argument("--retry-failed", action="store_true", help="Re-run recordings whose previous result was an error")
+    parser.add_argument("--progress-every", type=int, default=10, help="Print throughput every N recordings")
+    parser.add_argument("--index-dir", default=media_index.INDEX_CACHE_DIR or media_index.CLI_INDEX_CACHE_DIR,
+                        help="Cache for frame indexes and remuxed copies (default: MEDIA_INDEX_DIR, "
+                             "else a temp directory; never next to the recordings)")
+    args = parser.parse_args()
+    media_index.set_cache_dir(args.index_dir)
+
+    entries = discover_inputs(args.source, args.recursive)
+    done = load_checkpoint(args.output, args.retry_failed)
+    pending = [(job_id, path) for job_id, path in entries if job_id not in done]
+    print(f"{len(entries)} recordings found, {len(entries) - len(pending)} already done, {len(pending)} to analyze")
+    if not pending:
+        if args.parquet:
+            write_parquet(args.output, args.parquet)
+        return
+
+    writer = ResultWriter(args.output)
+    stats = ThroughputStats(len(pending))
+    profile = PROFILES[args.profile]
+
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="batch")
+    try:
+        futures = {executor.submit(analyze_one, job_id, path, profile): job_id for job_id, path in pending}
+        for future in as_completed(futures):
+            record = future.result()
+            writer.write(record)
+            result = record["result"]
+            stats.record(record["status"] == "ok", result.get("video_duration"),
+                         result.get("performance", {}).get("processing_time_seconds"))
+            if record["status"] != "ok":
+                print(f"  failed: {record['id']}: {result.get('error')}")
+            if stats.done % args.progress_every == 0 or stats.done == stats.total:
+                print(stats.line())
+    except KeyboardInterrupt:
+        print("\nInterrupted; finished results are saved. Re-run the same command to resume.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        writer.close()
+        sys.exit(130)
+    executor.shutdown()
+    writer.close()
+
+    print(json.dumps(stats.summary(), indent=2))
+    if args.parquet:
+        write_parquet(args.output, args.parquet)
+        print(f"Parquet written to {args.parquet}")
+
+
+if __name__ == "__main__":
+    main()
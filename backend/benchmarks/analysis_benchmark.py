@@ -0,0 +1,249 @@
+"""End-to-end benchmark for the analysis pipeline.
+
+Generates synthetic interview-like recordings with ffmpeg (test pattern
+video plus synthesised speech when ffmpeg has flite, otherwise tones), then
+times every stage of final_confidence_score individually and end to end.
+Reports throughput, p50/p95 latency, peak RSS and CPU utilisation per stage
+and writes everything to a JSON file that can be compared across commits.
+
+Usage (from backend/):
+    python -m benchmarks.analysis_benchmark --durations 10,30 --resolutions 640x480,1280x720 --repeat 3
+    python -m benchmarks.analysis_benchmark --output new.json --compare old.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.stats import percentile
+from utils import analyze
+
+SPEECH_TEXT = (
+    "Thank you for the question. Um, in my last role I led a small team that "
+    "rebuilt our deployment pipeline. We cut release time in half, and I learned "
+    "a lot about, uh, communicating trade offs to stakeholders."
+)
+
+
+def current_rss_bytes():
+    """Resident set size of this process, or None if it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is KiB on Linux and bytes on macOS
+        return usage if sys.platform == "darwin" else usage * 1024
+    except ImportError:
+        return None
+
+
+class StageMonitor:
+    """Samples RSS in the background and measures wall/CPU time for one stage"""
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_rss = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            rss = current_rss_bytes()
+            if rss is not None and (self.peak_rss is None or rss > self.peak_rss):
+                self.peak_rss = rss
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_rss = current_rss_bytes()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall = time.perf_counter() - self._wall_start
+        self.cpu = time.process_time() - self._cpu_start
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def ffmpeg_has_filter(name):
+    try:
+        output = subprocess.run(["ffmpeg", "-hide_banner", "-filters"], capture_output=True, text=True).stdout
+    except FileNotFoundError:
+        return False
+    return any(line.split()[1:2] == [name] for line in output.splitlines() if line.strip())
+
+
+def generate_video(path, duration, width, height, fps=30, speech=True):
+    """Create a synthetic recording (webm, VP8 + Opus like the browser uploads)"""
+    if speech and ffmpeg_has_filter("flite"):
+        # Repeat the sentence to cover the requested duration
+        text = " ".join([SPEECH_TEXT] * max(1, int(duration // 12) + 1)).replace(":", " ")
+        audio_input = ["-f", "lavfi", "-i", f"flite=text='{text}'"]
+    else:
+        audio_input = ["-f", "lavfi", "-i", f"sine=frequency=220:beep_factor=4:duration={duration}"]
+
+    command = [
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={duration}",
+        *audio_input,
+        "-t", str(duration),
+        "-c:v", "libvpx", "-b:v", "1M", "-deadline", "realtime", "-cpu-used", "8",
+        "-c:a", "libopus", "-ar", "48000",
+        path,
+    ]
+    subprocess.run(command, check=True)
+    return path
+
+
+def run_stages(video_path, work_dir):
+    """Run every stage once and return {stage: (wall, cpu, peak_rss)}"""
+    timings = {}
+    audio_path = os.path.join(work_dir, "bench_audio.wav")
+
+    def measure(name, fn, *args):
+        with StageMonitor() as monitor:
+            result = fn(*args)
+        timings[name] = (monitor.wall, monitor.cpu, monitor.peak_rss)
+        return result
+
+    measure("audio_extraction", analyze.extract_audio_from_video, video_path, audio_path)
+    measure("facial", analyze.analyze_confidence_emotions, video_path)
+    measure("body", analyze.analyze_body_confidence, video_path)
+    measure("transcription", analyze.get_transcript_with_timing, audio_path)
+    measure("audio_features", analyze.analyze_audio_features, audio_path)
+
+    result = measure("end_to_end", analyze.final_confidence_score, video_path)
+    if isinstance(result, dict) and "error" in result:
+        raise RuntimeError(f"final_confidence_score failed: {result['error']}")
+
+    if os.path.exists(audio_path):
+        os.remove(audio_path)
+    return timings
+
+
+def summarise(samples, video_seconds):
+    """Aggregate repeated stage measurements into report fields"""
+    walls = [w for w, _, _ in samples]
+    cpus = [c for _, c, _ in samples]
+    rss = [r for _, _, r in samples if r is not None]
+    total_wall = sum(walls)
+    return {
+        "runs": len(samples),
+        "p50_seconds": round(percentile(walls, 50), 4),
+        "p95_seconds": round(percentile(walls, 95), 4),
+        "mean_seconds": round(total_wall / len(walls), 4),
+        "throughput_video_seconds_per_second": round(video_seconds * len(walls) / total_wall, 3) if total_wall > 0 else None,
+        "cpu_utilisation": round(sum(cpus) / total_wall, 3) if total_wall > 0 else None,
+        "peak_rss_mb": round(max(rss) / 1e6, 1) if rss else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def compare(current, baseline_path):
+    """Print per-case, per-stage p50 changes against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    base_cases = {case["name"]: case for case in baseline.get("cases", [])}
+    print(f"\nComparison against {baseline_path} (commit {baseline.get('commit')})")
+    for case in current["cases"]:
+        base = base_cases.get(case["name"])
+        if not base:
+            continue
+        for stage, stats in case["stages"].items():
+            old = base["stages"].get(stage)
+            if not old or not old["p50_seconds"]:
+                continue
+            change = (stats["p50_seconds"] - old["p50_seconds"]) / old["p50_seconds"] * 100
+            print(f"  {case['name']:<20} {stage:<18} {old['p50_seconds']:>8.3f}s -> "
+                  f"{stats['p50_seconds']:>8.3f}s  ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the video analysis pipeline")
+    parser.add_argument("--durations", default="10,30", help="Comma-separated clip lengths in seconds")
+    parser.add_argument("--resolutions", default="640x480,1280x720", help="Comma-separated WIDTHxHEIGHT values")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=3, help="Measured runs per case")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured runs before the first case (loads models)")
+    parser.add_argument("--tones", action="store_true", help="Use tones even if ffmpeg supports flite speech")
+    parser.add_argument("--output", default="analysis_benchmark.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    durations = [float(d) for d in args.durations.split(",") if d.strip()]
+    resolutions = [tuple(int(x) for x in r.lower().split("x")) for r in args.resolutions.split(",") if r.strip()]
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": dict(vars(args)),
+        "cases": [],
+    }
+
+    warmup_runs = args.warmup
+    with tempfile.TemporaryDirectory() as work_dir:
+        for duration in durations:
+            for width, height in resolutions:
+                name = f"{int(duration)}s_{width}x{height}"
+                video_path = os.path.join(work_dir, f"{name}.webm")
+                generate_video(video_path, duration, width, height, args.fps, speech=not args.tones)
+
+                for _ in range(warmup_runs):
+                    run_stages(video_path, work_dir)
+                warmup_runs = 0  # models stay warm for later cases
+
+                samples = {}
+                for _ in range(args.repeat):
+                    for stage, measurement in run_stages(video_path, work_dir).items():
+                        samples.setdefault(stage, []).append(measurement)
+
+                case = {
+                    "name": name,
+                    "duration_seconds": duration,
+                    "resolution": f"{width}x{height}",
+                    "fps": args.fps,
+                    "file_size_bytes": os.path.getsize(video_path),
+                    "stages": {stage: summarise(values, duration) for stage, values in samples.items()},
+                }
+                report["cases"].append(case)
+
+                print(f"\n{name}")
+                for stage, stats in case["stages"].items():
+                    print(f"  {stage:<18} p50={stats['p50_seconds']:.3f}s p95={stats['p95_seconds']:.3f}s "
+                          f"x{stats['throughput_video_seconds_per_second']} realtime "
+                          f"cpu={stats['cpu_utilisation']} rss={stats['peak_rss_mb']}MB")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""Benchmark the video decode backends used by the analyzers.
+
+Decodes the frames the facial and body analyzers sample (every 15th and 20th
+frame for the balanced profile) plus the audio track, once per configuration:
+
+    opencv            OpenCV/FFmpeg with default threading
+    opencv_threads    OpenCV with VIDEO_DECODE_THREADS-style explicit threads
+    ffmpeg            one ffmpeg pipe per analyzer + separate audio extraction
+    ffmpeg_shared     a single ffmpeg demux for both analyzers and the audio
+
+Reports wall time, CPU (this process plus ffmpeg children) and decoded
+frames/s, and writes a JSON file in the same layout as analysis_benchmark.
+
+Usage (from backend/):
+    python -m benchmarks.decode_benchmark --durations 30,120 --resolutions 1280x720 --threads 4
+    python -m benchmarks.decode_benchmark recording1.webm recording2.webm --max-width 480
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from benchmarks.analysis_benchmark import generate_video, git_commit
+from benchmarks.stats import percentile
+from utils import analyze
+from utils.decode import FFmpegFrameSource, OpenCVFrameSource, SharedDecode, probe_video
+from utils.media_index import build_index
+
+
+def cpu_seconds():
+    """CPU time of this process and its finished children (ffmpeg)"""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def drain(source):
+    count = 0
+    for _ in source:
+        count += 1
+    source.close()
+    return count
+
+
+def drain_parallel(sources):
+    """Consume several frame sources concurrently, like the analyzers do"""
+    counts = {}
+
+    def run(name, source):
+        counts[name] = drain(source)
+
+    threads = [threading.Thread(target=run, args=item) for item in sources.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts.values())
+
+
+def run_config(name, video_path, audio_path, intervals, max_width, threads):
+    if name == "opencv":
+        return drain_parallel({k: OpenCVFrameSource(video_path, i, max_width, threads=0)
+                               for k, i in intervals.items()}) \
+            + _extract(video_path, audio_path)
+    if name == "opencv_threads":
+        return drain_parallel({k: OpenCVFrameSource(video_path, i, max_width, threads=threads)
+                               for k, i in intervals.items()}) + _extract(video_path, audio_path)
+    if name == "ffmpeg":
+        return drain_parallel({k: FFmpegFrameSource(video_path, i, max_width, threads=threads)
+                               for k, i in intervals.items()}) + _extract(video_path, audio_path)
+    if name == "ffmpeg_shared":
+        shared = SharedDecode(video_path, intervals, audio_path, max_width, threads=threads)
+        frames = drain_parallel({k: shared.consumer(k) for k in intervals})
+        shared.wait_audio()
+        shared.close()
+        return frames
+    raise ValueError(f"Unknown configuration {name}")
+
+
+def _extract(video_path, audio_path):
+    analyze.extract_audio_from_video(video_path, audio_path)
+    return 0
+
+
+def measure(name, video_path, audio_path, intervals, max_width, threads):
+    cpu_start = cpu_seconds()
+    wall_start = time.perf_counter()
+    frames = run_config(name, video_path, audio_path, intervals, max_width, threads)
+    wall = time.perf_counter() - wall_start
+    if os.path.exists(audio_path):
+        os.remove(audio_path)
+    return wall, cpu_seconds() - cpu_start, frames
+
+
+def video_duration(video_path):
+    """Container duration from ffprobe, else the frame timestamp index (webm without a Duration element)"""
+    duration = probe_video(video_path)["duration"]
+    return duration if duration else build_index(video_path).duration
+
+
+def summarise(samples, video_seconds):
+    walls = [w for w, _, _ in samples]
+    cpus = [c for _, c, _ in samples]
+    frames = samples[0][2]
+    total_wall = sum(walls)
+    return {
+        "runs": len(samples),
+        "p50_seconds": round(percentile(walls, 50), 4),
+        "p95_seconds": round(percentile(walls, 95), 4),
+        "frames_decoded": frames,
+        "frames_per_second": round(frames * len(walls) / total_wall, 1) if total_wall > 0 else None,
+        "realtime_factor": round(video_seconds * len(walls) / total_wall, 2) if total_wall > 0 and video_seconds else None,
+        "cpu_seconds": round(sum(cpus) / len(cpus), 3),
+    }
+
+
+CONFIGS = ("opencv", "opencv_threads", "ffmpeg", "ffmpeg_shared")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark video decode backends")
+    parser.add_argument("videos", nargs="*", help="Recordings to decode (default: generate synthetic ones)")
+    parser.add_argument("--durations", default="30", help="Synthetic clip lengths in seconds")
+    parser.add_argument("--resolutions", default="1280x720", help="Synthetic WIDTHxHEIGHT values")
+    parser.add_argument("--face-interval", type=int, default=15)
+    parser.add_argument("--body-interval", type=int, default=20)
+    parser.add_argument("--max-width", type=int, default=None, help="Downscale frames wider than this")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Decoder threads for *_threads/ffmpeg")
+    parser.add_argument("--configs", default=",".join(CONFIGS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="decode_benchmark.json")
+    args = parser.parse_args()
+
+    intervals = {"facial": args.face_interval, "body": args.body_interval}
+    configs = [c for c in args.configs.split(",") if c.strip()]
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": dict(vars(args)),
+        "cases": [],
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        videos = list(args.videos)
+        if not videos:
+            for duration in [float(d) for d in args.durations.split(",") if d.strip()]:
+                for resolution in [r for r in args.resolutions.split(",") if r.strip()]:
+                    width, height = (int(x) for x in resolution.lower().split("x"))
+                    path = os.path.join(work_dir, f"{int(duration)}s_{width}x{height}.webm")
+                    videos.append(generate_video(path, duration, width, height, speech=False))
+
+        audio_path = os.path.join(work_dir, "decode_audio.wav")
+        for video_path in videos:
+            video_seconds = video_duration(video_path)
+
+            case = {"name": os.path.basename(video_path), "duration_seconds": video_seconds,
+                    "file_size_bytes": os.path.getsize(video_path), "configs": {}}
+            print(f"\n{case['name']}")
+            for name in configs:
+                try:
+                    samples = [measure(name, video_path, audio_path, intervals, args.max_width, args.threads)
+                               for _ in range(args.repeat)]
+                except Exception as e:
+                    case["configs"][name] = {"error": str(e)}
+                    print(f"  {name:<16} failed: {e}")
+                    continue
+                stats = case["configs"][name] = summarise(samples, video_seconds)
+                print(f"  {name:<16} p50={stats['p50_seconds']:.3f}s {stats['frames_per_second']} frames/s "
+                      f"x{stats['realtime_factor']} realtime cpu={stats['cpu_seconds']}s")
+            report["cases"].append(case)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
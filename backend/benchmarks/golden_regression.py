@@ -0,0 +1,397 @@
+"""Golden-output regression harness for the analysis pipeline.
+
+Speedups to the facial, body or speech analyzers must not silently move
+scores. This runs a corpus of recordings through final_confidence_score and
+compares every score and breakdown against recorded expected values (or
+against another pipeline) within per-field tolerance bands, reporting the
+score drift next to the speedup.
+
+The corpus (benchmarks/golden/corpus.json) lists synthetic recordings,
+generated with ffmpeg like analysis_benchmark, and a fixtures directory
+whose recordings are included as they are. Expected values are written to
+benchmarks/golden/expected.json by `record`; commit that file alongside
+deliberate score changes. It also records which optional models were
+available (DeepFace, MediaPipe, the Vosk model), since a missing one changes
+or removes scores; `check` points out when they differ from the current run.
+
+Usage (from backend/):
+    python -m benchmarks.golden_regression record
+    python -m benchmarks.golden_regression check
+    python -m benchmarks.golden_regression compare --baseline-ref HEAD~1
+    python -m benchmarks.golden_regression compare --baseline-profile balanced --candidate-profile fast
+
+compare runs the old pipeline (a git ref checked out into a temporary
+worktree, and/or another profile) and the current one on the same inputs,
+one after the other in separate processes so model caches and CPU don't
+interfere. check and compare exit with status 1 when a field drifts past
+its tolerance. Deadlines are lifted for all runs so budget cut-offs don't
+show up as drift.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+GOLDEN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIDEO_EXTENSIONS = (".webm", ".mp4", ".mov", ".mkv", ".m4v", ".avi")
+COMPARED_FIELDS = ("score", "facial_confidence", "speech_confidence", "body_confidence", "video_duration")
+BREAKDOWNS = ("facial_breakdown", "speech_breakdown", "body_breakdown")
+# Lifted so a loaded machine doesn't turn into partial results and fake drift
+RUN_ENV = {"ANALYSIS_DEADLINE_SECONDS": "86400", "ANALYSIS_GRACE_SECONDS": "3600"}
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_corpus(corpus_path):
+    with open(corpus_path) as f:
+        return json.load(f)
+
+
+def prepare_corpus(corpus, corpus_path, media_dir, tones=False):
+    """Generate missing synthetic recordings and collect fixtures; returns [{"name", "path", "sha256"}]"""
+    from benchmarks.analysis_benchmark import generate_video
+
+    cases = []
+    for spec in corpus.get("synthetic", []):
+        path = os.path.join(media_dir, spec["name"] + ".webm")
+        if not os.path.exists(path):
+            generate_video(path, spec["duration"], spec["width"], spec["height"], spec.get("fps", 30),
+                           speech=spec.get("speech", True) and not tones)
+        cases.append({"name": spec["name"], "path": path})
+
+    fixtures_dir = corpus.get("fixtures_dir")
+    if fixtures_dir:
+        fixtures_dir = os.path.join(os.path.dirname(os.path.abspath(corpus_path)), fixtures_dir)
+        if os.path.isdir(fixtures_dir):
+            for name in sorted(os.listdir(fixtures_dir)):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    cases.append({"name": "fixture_" + os.path.splitext(name)[0],
+                                  "path": os.path.join(fixtures_dir, name)})
+
+    for case in cases:
+        case["sha256"] = file_sha256(case["path"])
+    return cases
+
+
+def extract_fields(result):
+    """Flatten the compared scores of one /analyze result ({field: value})"""
+    fields = {name: result.get(name) for name in COMPARED_FIELDS}
+    for breakdown in BREAKDOWNS:
+        for key, value in (result.get(breakdown) or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                fields[f"{breakdown}.{key}"] = value
+    return fields
+
+
+def tolerance_for(field, tolerances):
+    if field in tolerances:
+        return tolerances[field]
+    if field.split(".")[0] in BREAKDOWNS:
+        return tolerances.get("breakdown", 0.0)
+    return 0.0
+
+
+def ffmpeg_version():
+    try:
+        output = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True, check=True).stdout
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+    return output.split("\n", 1)[0].split(" Copyright")[0].strip()
+
+
+def pipeline_environment(analyze):
+    """Optional models and tools that change scores when they are missing"""
+    model_cache = getattr(analyze, "model_cache", None)
+    return {
+        "deepface": getattr(analyze, "DEEPFACE_AVAILABLE", None),
+        "mediapipe": getattr(analyze, "MEDIAPIPE_AVAILABLE", None),
+        # Speech is only scored when the Vosk model loaded
+        "vosk": model_cache.is_loaded("vosk") if hasattr(model_cache, "is_loaded") else None,
+        "ffmpeg": ffmpeg_version(),
+    }
+
+
+def environment_differences(recorded, current):
+    """[(name, recorded, current)] for environment entries both sides know"""
+    return [(name, recorded[name], current.get(name)) for name in sorted(recorded or {})
+            if recorded[name] is not None and current.get(name) is not None and recorded[name] != current[name]]
+
+
+def run_pipeline(backend_dir, manifest_path, profile, repeat, warmup, output_path):
+    """Analyze every case with the pipeline in backend_dir (runs in a child process)"""
+    # The pipeline under test comes first on the path; cwd stays the current
+    # backend so both sides load the same model files
+    sys.path.insert(0, backend_dir)
+    for name in [module for module in sys.modules if module == "utils" or module.startswith("utils.")]:
+        del sys.modules[name]
+    from utils import analyze
+
+    supports_profile = "profile" in inspect.signature(analyze.final_confidence_score).parameters
+
+    def analyze_once(path):
+        if supports_profile and profile:
+            from utils.profiles import get_profile
+            return analyze.final_confidence_score(path, profile=get_profile(profile))
+        return analyze.final_confidence_score(path)
+
+    with open(manifest_path) as f:
+        cases = json.load(f)
+
+    if cases:
+        for _ in range(warmup):
+            analyze_once(cases[0]["path"])  # model loading isn't part of the speedup
+
+    results = {}
+    for case in cases:
+        seconds = []
+        result = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            result = analyze_once(case["path"])
+            seconds.append(time.perf_counter() - start)
+        entry = {"sha256": case["sha256"], "seconds": round(min(seconds), 4)}
+        if not isinstance(result, dict) or "error" in result:
+            entry["error"] = result.get("error") if isinstance(result, dict) else repr(result)
+        else:
+            entry["fields"] = extract_fields(result)
+            entry["partial"] = bool(result.get("partial"))
+        results[case["name"]] = entry
+
+    with open(output_path, "w") as f:
+        json.dump({"environment": pipeline_environment(analyze), "cases": results}, f, indent=2)
+
+
+def run_side(label, backend_dir, cases, profile, args, work_dir):
+    """Run one pipeline over the corpus in a fresh process; returns (results, environment)"""
+    manifest_path = os.path.join(work_dir, f"{label}_manifest.json")
+    output_path = os.path.join(work_dir, f"{label}_results.json")
+    with open(manifest_path, "w") as f:
+        json.dump(cases, f)
+    command = [sys.executable, os.path.abspath(__file__), "_run", "--backend-dir", backend_dir,
+               "--manifest", manifest_path, "--output", output_path,
+               "--repeat", str(args.repeat), "--warmup", str(args.warmup)]
+    if profile:
+        command += ["--profile", profile]
+    print(f"Running {label} pipeline ({backend_dir}, profile {profile or 'default'})")
+    from utils.media_index import CLI_INDEX_CACHE_DIR
+    env = {**os.environ, **RUN_ENV}
+    # Keep index files and remuxed copies out of the fixtures directory
+    env.setdefault("MEDIA_INDEX_DIR", CLI_INDEX_CACHE_DIR)
+    subprocess.run(command, check=True, cwd=BACKEND_DIR, env=env)
+    with open(output_path) as f:
+        output = json.load(f)
+    return output["cases"], output["environment"]
+
+
+class GitWorktree:
+    """Temporary checkout of a git ref, removed on exit"""
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.path = None
+
+    def __enter__(self):
+        self.path = tempfile.mkdtemp(prefix="golden-baseline-")
+        subprocess.run(["git", "worktree", "add", "--detach", self.path, self.ref], check=True,
+                       cwd=BACKEND_DIR, stdout=subprocess.DEVNULL)
+        return os.path.join(self.path, "backend")
+
+    def __exit__(self, *exc):
+        subprocess.run(["git", "worktree", "remove", "--force", self.path], cwd=BACKEND_DIR,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return False
+
+
+def diff_results(baseline, candidate, tolerances):
+    """Per case: the fields out of tolerance, max drift and speedup; returns (rows, failed)"""
+    rows = []
+    failed = False
+    for name, base in baseline.items():
+        current = candidate.get(name)
+        row = {"name": name, "violations": [], "max_drift": 0.0, "speedup": None, "note": None, "failed": False}
+        rows.append(row)
+        if current is None:
+            row["note"] = "missing from candidate run"
+            row["failed"] = failed = True
+            continue
+        if "error" in base or "error" in current:
+            row["note"] = f"error: {current.get('error') or base.get('error')}"
+            row["failed"] = "error" in current
+            failed = failed or row["failed"]
+            continue
+        if base.get("sha256") and base["sha256"] != current.get("sha256"):
+            row["note"] = "input differs from the recorded one (regenerated by another ffmpeg?)"
+        if current.get("partial"):
+            row["note"] = "candidate result is partial"
+        if base.get("seconds") and current.get("seconds"):
+            row["speedup"] = base["seconds"] / current["seconds"]
+        for field in sorted(set(base["fields"]) | set(current["fields"])):
+            old, new = base["fields"].get(field), current["fields"].get(field)
+            if old is None and new is None:
+                continue
+            if old is None or new is None:
+                row["violations"].append((field, old, new, None))
+                continue
+            drift = abs(new - old)
+            row["max_drift"] = max(row["max_drift"], drift)
+            if drift > tolerance_for(field, tolerances) + 1e-9:
+                row["violations"].append((field, old, new, drift))
+        row["failed"] = bool(row["violations"])
+        failed = failed or row["failed"]
+    return rows, failed
+
+
+def print_report(rows, baseline_label, candidate_label):
+    print(f"\n{baseline_label} -> {candidate_label}")
+    print(f"  {'case':<32} {'speedup':>8} {'max drift':>10}  status")
+    for row in rows:
+        speedup = f"x{row['speedup']:.2f}" if row["speedup"] else "-"
+        status = "FAIL" if row["failed"] else "ok"
+        print(f"  {row['name']:<32} {speedup:>8} {row['max_drift']:>10.2f}  {status}"
+              + (f"  ({row['note']})" if row["note"] else ""))
+        for field, old, new, drift in row["violations"]:
+            drift_text = f"drift {drift:.2f}" if drift is not None else "missing on one side"
+            print(f"      {field}: {old} -> {new} ({drift_text})")
+    speedups = [row["speedup"] for row in rows if row["speedup"]]
+    if speedups:
+        print(f"  overall speedup x{sum(speedups) / len(speedups):.2f} (mean over cases)")
+
+
+def git_commit(backend_dir=BACKEND_DIR):
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=backend_dir).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def parse_tolerances(corpus, overrides):
+    tolerances = dict(corpus.get("tolerances", {}))
+    for override in overrides or []:
+        field, _, value = override.partition("=")
+        tolerances[field] = float(value)
+    return tolerances
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check analysis scores against golden outputs")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def common(sub):
+        sub.add_argument("--corpus", default=os.path.join(GOLDEN_DIR, "corpus.json"))
+        sub.add_argument("--media-dir", help="Keep generated recordings here and reuse them (default: temporary)")
+        sub.add_argument("--tones", action="store_true", help="Use tones even if ffmpeg supports flite speech")
+        sub.add_argument("--repeat", type=int, default=1, help="Timed runs per case (fastest is reported)")
+        sub.add_argument("--warmup", type=int, default=1, help="Unmeasured runs before the first case")
+        sub.add_argument("--tolerance", action="append", metavar="FIELD=VALUE",
+                         help="Override a tolerance band, e.g. score=1 or breakdown=2")
+
+    record = subparsers.add_parser("record", help="Run the current pipeline and write the expected outputs")
+    common(record)
+    record.add_argument("--profile")
+    record.add_argument("--expected", default=os.path.join(GOLDEN_DIR, "expected.json"))
+
+    check = subparsers.add_parser("check", help="Compare the current pipeline with the expected outputs")
+    common(check)
+    check.add_argument("--expected", default=os.path.join(GOLDEN_DIR, "expected.json"))
+
+    compare = subparsers.add_parser("compare", help="Run a baseline and the current pipeline side by side")
+    common(compare)
+    compare.add_argument("--baseline-ref", help="Git ref of the baseline pipeline (default: working tree)")
+    compare.add_argument("--baseline-profile")
+    compare.add_argument("--candidate-profile")
+    compare.add_argument("--output", help="Write both runs and the drift report to this JSON file")
+
+    run = subparsers.add_parser("_run")  # child process of run_side
+    run.add_argument("--backend-dir", required=True)
+    run.add_argument("--manifest", required=True)
+    run.add_argument("--output", required=True)
+    run.add_argument("--profile")
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--warmup", type=int, default=1)
+
+    args = parser.parse_args()
+    if args.command == "_run":
+        run_pipeline(args.backend_dir, args.manifest, args.profile, args.repeat, args.warmup, args.output)
+        return
+
+    corpus = load_corpus(args.corpus)
+    tolerances = parse_tolerances(corpus, args.tolerance)
+    with tempfile.TemporaryDirectory() as work_dir:
+        media_dir = args.media_dir or work_dir
+        os.makedirs(media_dir, exist_ok=True)
+        cases = prepare_corpus(corpus, args.corpus, media_dir, tones=args.tones)
+        print(f"Corpus: {len(cases)} recording(s)")
+
+        if args.command == "record":
+            results, environment = run_side("current", BACKEND_DIR, cases, args.profile, args, work_dir)
+            expected = {
+                "commit": git_commit(),
+                "timestamp": datetime.now().isoformat(),
+                "profile": args.profile,
+                "environment": environment,
+                "cases": results,
+            }
+            with open(args.expected, "w") as f:
+                json.dump(expected, f, indent=2)
+            failures = [name for name, entry in results.items() if "error" in entry]
+            print(f"Expected outputs for {len(results)} case(s) written to {args.expected}")
+            for name in failures:
+                print(f"  {name} failed: {results[name]['error']}")
+            sys.exit(1 if failures else 0)
+
+        if args.command == "check":
+            if not os.path.exists(args.expected):
+                sys.exit(f"No expected outputs at {args.expected}; run `record` first")
+            with open(args.expected) as f:
+                expected = json.load(f)
+            results, environment = run_side("current", BACKEND_DIR, cases, expected.get("profile"), args, work_dir)
+            rows, failed = diff_results(expected["cases"], results, tolerances)
+            # Timings in the expected file come from whichever machine recorded it
+            print_report(rows, f"expected ({expected.get('commit')})", f"current ({git_commit()})")
+            differences = environment_differences(expected.get("environment"), environment)
+            if differences:
+                print("\nThe expected outputs were recorded in a different environment; drift may come from it:")
+                for name, recorded, current in differences:
+                    print(f"  {name}: {recorded} -> {current}")
+            sys.exit(1 if failed else 0)
+
+        if args.baseline_ref:
+            with GitWorktree(args.baseline_ref) as baseline_dir:
+                baseline, _ = run_side("baseline", baseline_dir, cases, args.baseline_profile, args, work_dir)
+        else:
+            baseline, _ = run_side("baseline", BACKEND_DIR, cases, args.baseline_profile, args, work_dir)
+        candidate, _ = run_side("candidate", BACKEND_DIR, cases, args.candidate_profile, args, work_dir)
+
+    rows, failed = diff_results(baseline, candidate, tolerances)
+    baseline_label = f"{args.baseline_ref or 'working tree'} ({args.baseline_profile or 'default'})"
+    candidate_label = f"working tree ({args.candidate_profile or 'default'})"
+    print_report(rows, baseline_label, candidate_label)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "timestamp": datetime.now().isoformat(),
+                "baseline": {"ref": args.baseline_ref, "profile": args.baseline_profile, "cases": baseline},
+                "candidate": {"commit": git_commit(), "profile": args.candidate_profile, "cases": candidate},
+                "tolerances": tolerances,
+                "report": [{**row, "violations": [list(v) for v in row["violations"]]} for row in rows],
+            }, f, indent=2)
+        print(f"\nReport written to {args.output}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
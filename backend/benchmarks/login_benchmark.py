@@ -0,0 +1,112 @@
+"""Login throughput benchmark for picking the scrypt cost factor.
+
+Runs authenticate_user_async against a throwaway users file under
+concurrency, once per candidate cost, and reports throughput and latency
+percentiles. The recommended cost is the largest one whose p99 stays within
+the budget.
+
+Usage (from backend/):
+    python -m benchmarks.login_benchmark --costs 13,14,15,16 --concurrency 16 --requests 200 --budget-ms 250
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.stats import percentile
+from utils import user_manager
+
+
+async def run_cost(log_n: int, concurrency: int, total_requests: int, users: int):
+    """Benchmark one cost factor (N = 2**log_n) and return its stats"""
+    user_manager.SCRYPT_N = 2 ** log_n
+
+    # Seed users with hashes at the cost under test so no rehash happens
+    accounts = [(f"bench{i}@example.com", f"password-{i}") for i in range(users)]
+    for email, password in accounts:
+        await user_manager.create_user_async("Bench User", email, password)
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_login(i):
+        email, password = accounts[i % len(accounts)]
+        async with semaphore:
+            started = time.perf_counter()
+            user = await user_manager.authenticate_user_async(email, password)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if user is None:
+                raise RuntimeError(f"Login failed for {email}")
+
+    # Track event-loop responsiveness while logins are in flight
+    loop_lag = []
+    stop = asyncio.Event()
+
+    async def probe_loop():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            loop_lag.append((time.perf_counter() - started - 0.01) * 1000)
+
+    probe = asyncio.create_task(probe_loop())
+    started = time.perf_counter()
+    await asyncio.gather(*(one_login(i) for i in range(total_requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    return {
+        "log2_n": log_n,
+        "n": 2 ** log_n,
+        "requests": total_requests,
+        "concurrency": concurrency,
+        "workers": user_manager.PASSWORD_HASH_WORKERS,
+        "throughput_rps": round(total_requests / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_loop_lag_ms": round(max(loop_lag) if loop_lag else 0.0, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /auth/login KDF cost factors")
+    parser.add_argument("--costs", default="13,14,15,16", help="Comma-separated log2(N) values")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="p99 latency budget for /auth/login")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for log_n in [int(c) for c in args.costs.split(",") if c.strip()]:
+            # Fresh data files per cost so runs don't interfere
+            user_manager.USERS_FILE = os.path.join(tmp_dir, f"users_{log_n}.json")
+            user_manager.SESSIONS_FILE = os.path.join(tmp_dir, f"sessions_{log_n}.json")
+            stats = asyncio.run(run_cost(log_n, args.concurrency, args.requests, args.users))
+            stats["within_budget"] = stats["p99_ms"] <= args.budget_ms
+            results.append(stats)
+            print(f"N=2^{log_n:<3} {stats['throughput_rps']:>8} req/s  "
+                  f"p50={stats['p50_ms']}ms p95={stats['p95_ms']}ms p99={stats['p99_ms']}ms  "
+                  f"loop lag max={stats['max_loop_lag_ms']}ms  "
+                  f"{'OK' if stats['within_budget'] else 'over budget'}")
+
+    within = [r for r in results if r["within_budget"]]
+    recommended = max(within, key=lambda r: r["log2_n"]) if within else None
+    if recommended:
+        print(f"Recommended: PASSWORD_SCRYPT_N={recommended['n']} (2^{recommended['log2_n']})")
+    else:
+        print("No cost factor met the p99 budget; raise PASSWORD_HASH_WORKERS or the budget")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"budget_ms": args.budget_ms, "results": results,
+                       "recommended_n": recommended["n"] if recommended else None}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
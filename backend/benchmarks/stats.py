@@ -0,0 +1,10 @@
+"""Statistics shared by the benchmarks."""
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0-100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(q / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
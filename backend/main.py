@@ -1,18 +1,77 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request, Query, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import tempfile
-import shutil
-import os
-from utils.analyze import final_confidence_score
-from utils.user_manager import create_user, authenticate_user, get_user_by_id, add_session, get_user_sessions, get_user_stats
+import hmac
 import json
+import os
+import shutil
+import time
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from utils.analyze import final_confidence_score, model_cache, warm_up
+from utils.user_manager import create_user_async, authenticate_user_async, get_user_by_id, add_session, add_sessions, get_user_sessions, get_user_stats, cohort_index, archive_old_sessions
+from utils.question_bank import question_bank, is_not_modified
+from utils.tracing import Trace
+from utils.profiles import get_profile, select_profile
+from utils.media_index import discard_index
+from utils import admission
+from utils.admission import AdmissionError
+from utils.job_queue import JOB_SPOOL_DIR, open_queue
+from utils.interview_report import build_interview_report, is_scored
+from utils.uploads import UPLOAD_CHUNK_MAX_BYTES, UploadError, UploadStore
+from utils import metrics
+from utils import profiling
 
 # Server startup information
 
+# Each analysis already fans out to its own threads, so keep this small
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+# inline: analyze in this process; queue: enqueue for worker.py nodes
+ANALYSIS_MODE = os.getenv("ANALYSIS_MODE", "inline").lower()
+# In queue mode, how long /analyze waits for the result before answering 202
+ANALYZE_WAIT_SECONDS = float(os.getenv("ANALYZE_WAIT_SECONDS", "300"))
+JOB_POLL_SECONDS = 0.5
+# Most answer videos one /interviews/analyze request may carry
+INTERVIEW_MAX_ANSWERS = int(os.getenv("INTERVIEW_MAX_ANSWERS", "12"))
+# Shared secret for /admin routes and the X-Profile header; unset disables both
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+# Load and exercise every model at startup so the first analysis isn't slow;
+# /ready answers 503 until that has finished. Pose models are warmed for the
+# pose complexities of MODEL_WARMUP_PROFILES.
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true", "yes")
+MODEL_WARMUP_PROFILES = [name.strip() for name in os.getenv("MODEL_WARMUP_PROFILES", "fast,balanced").split(",")
+                         if name.strip()]
+MODEL_WARMUP_POSE_COMPLEXITIES = sorted({get_profile(name).pose_complexity for name in MODEL_WARMUP_PROFILES})
+# How often old sessions are moved to the archive (0 = only via /admin/sessions/archive)
+SESSION_ARCHIVE_INTERVAL_HOURS = float(os.getenv("SESSION_ARCHIVE_INTERVAL_HOURS", "24"))
+job_queue = open_queue() if ANALYSIS_MODE == "queue" else None
+upload_store = UploadStore()
+
+metrics.register_model_cache(model_cache)
+if job_queue is not None:
+    metrics.register_job_queue(job_queue)
+
 app = FastAPI()
 
+def _upload_body_limit(method: str, path: str) -> Optional[int]:
+    """Request body limit of upload routes (None for everything else)"""
+    if method == "POST" and path == "/analyze":
+        return admission.body_limit()
+    if method == "POST" and path == "/interviews/analyze":
+        return admission.body_limit(INTERVIEW_MAX_ANSWERS)
+    if method == "PATCH" and path.startswith("/uploads/") and path.count("/") == 2:
+        return UPLOAD_CHUNK_MAX_BYTES
+    return None
+
+# Inside CORS so browsers can read the 413
+app.add_middleware(admission.BodyLimitMiddleware, limits=_upload_body_limit)
+
 # Enable CORS so frontend can call backend
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +81,72 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so /auth/user/{user_id} is one series
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_DURATION.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
+
+@app.get("/metrics")
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+def _is_admin(token: Optional[str]) -> bool:
+    return bool(ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, ADMIN_TOKEN)
+
+def _require_admin(token: Optional[str]):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin API is disabled (set ADMIN_TOKEN)")
+    if not _is_admin(token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+class ProfilingSettings(BaseModel):
+    sample_rate: Optional[float] = None
+    next_runs: Optional[int] = None
+
+@app.get("/admin/profiling")
+async def get_profiling(x_admin_token: Optional[str] = Header(None)):
+    _require_admin(x_admin_token)
+    return {**profiling.get_settings(), "recent": profiling.list_profiles()}
+
+@app.put("/admin/profiling")
+async def set_profiling(settings: ProfilingSettings, x_admin_token: Optional[str] = Header(None)):
+    """Profile a fraction of analyses (sample_rate 0-1) and/or the next next_runs analyses"""
+    _require_admin(x_admin_token)
+    return profiling.configure(settings.sample_rate, settings.next_runs)
+
+@app.post("/admin/sessions/archive")
+async def archive_sessions(older_than_days: Optional[float] = Query(None, ge=0),
+                           x_admin_token: Optional[str] = Header(None)):
+    """Archive sessions older than older_than_days (default SESSION_ARCHIVE_AFTER_DAYS) now"""
+    _require_admin(x_admin_token)
+    return await asyncio.get_running_loop().run_in_executor(None, archive_old_sessions, older_than_days)
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile_output(profile_id: str, format: str = Query("summary"),
+                             x_admin_token: Optional[str] = Header(None)):
+    """A stored analysis profile: summary with the top functions, or format=collapsed for flamegraph tools"""
+    _require_admin(x_admin_token)
+    path = profiling.profile_path(profile_id, collapsed=format == "collapsed")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    with open(path) as f:
+        if format == "collapsed":
+            return PlainTextResponse(f.read())
+        return JSONResponse(json.load(f))
+
 # Pydantic models for request/response
 class UserCreate(BaseModel):
     name: str
@@ -44,7 +169,7 @@ class SessionCreate(BaseModel):
 @app.post("/auth/signup")
 async def signup(user_data: UserCreate):
     try:
-        user = create_user(user_data.name, user_data.email, user_data.password)
+        user = await create_user_async(user_data.name, user_data.email, user_data.password)
         return {"success": True, "user": user}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -53,7 +178,7 @@ async def signup(user_data: UserCreate):
 
 @app.post("/auth/login")
 async def login(login_data: UserLogin):
-    user = authenticate_user(login_data.email, login_data.password)
+    user = await authenticate_user_async(login_data.email, login_data.password)
     if user:
         return {"success": True, "user": user}
     else:
@@ -85,8 +210,15 @@ async def create_session(session_data: SessionCreate):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 @app.get("/auth/user/{user_id}/sessions")
-async def get_sessions(user_id: str):
-    sessions = get_user_sessions(user_id)
+async def get_sessions(user_id: str, details: bool = Query(True), since: Optional[str] = Query(None),
+                       until: Optional[str] = Query(None)):
+    """A user's sessions, newest first; since/until (ISO timestamps) bound the range.
+
+    Archived sessions' detailed_metrics are read from the archive when
+    details is true; details=false returns summary fields only.
+    """
+    sessions = await asyncio.get_running_loop().run_in_executor(None, get_user_sessions, user_id, details,
+                                                                 since, until)
     return {"success": True, "sessions": sessions}
 
 @app.get("/auth/user/{user_id}/stats")
@@ -94,70 +226,486 @@ async def get_stats(user_id: str):
     stats = get_user_stats(user_id)
     return {"success": True, "stats": stats}
 
+@app.get("/cohort/percentile")
+async def get_percentile(
+    value: float = Query(..., ge=0, le=100),
+    metric: str = Query("score"),
+    topic: Optional[str] = Query(None),
+):
+    """Percent of stored sessions (optionally of one topic) scoring below value on metric.
+
+    metric is score, a component (facial_confidence, ...) or a breakdown
+    metric (eye_contact, pace_score, posture, ...).
+    """
+    return {"success": True, **cohort_index.percentile(value, metric, topic)}
+
+def run_analysis(video_path: str, profile, audio_path: Optional[str] = None, profiled: bool = False):
+    """Run one analysis on an executor thread, tracking queue depth and stage metrics"""
+    metrics.ANALYSIS_QUEUE_DEPTH.dec()
+    trace = Trace()
+    if profiled:
+        profiling.start(trace)
+    try:
+        result = final_confidence_score(video_path, trace=trace, profile=profile, audio_path=audio_path)
+    finally:
+        summary = profiling.finish(trace) if profiled else None
+    metrics.observe_trace(trace)
+    if summary is not None and isinstance(result, dict) and "performance" in result:
+        result["performance"]["profiling"] = summary
+    return result
+
 @app.post("/analyze")
-async def analyze(file: UploadFile = File(...)):
-    # Get the original file extension
-    original_filename = file.filename or "video"
-    file_extension = os.path.splitext(original_filename)[1] or ".mp4"
-    
-    # Save uploaded video temporarily with original extension
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as tmp:
-        shutil.copyfileobj(file.file, tmp)
-        tmp_path = tmp.name
-    
-    # Ensure file is closed before processing
-    file.file.close()
-
-    try:
-        # Direct function call
-        result = final_confidence_score(tmp_path)
+async def analyze(
+    file: Optional[UploadFile] = File(None),
+    audio: Optional[UploadFile] = File(None),
+    frames: Optional[UploadFile] = File(None),
+    profile: Optional[str] = Query(None),
+    wait: bool = Query(True),
+    x_profile: Optional[str] = Header(None),
+):
+    """Analyze an interview recording.
+
+    file is the recording. Clients may instead send a reduced form: a
+    low-FPS, downscaled file plus audio (16 kHz mono WAV), or frames (zip of
+    <milliseconds>.jpg/.png images) plus audio; the server then skips audio
+    extraction and samples frames at the profile's rate in time.
+
+    profile selects the quality/latency trade-off: fast, balanced, thorough or
+    auto (chosen from the current analysis backlog). In queue mode the job
+    runs on a worker node; with wait=false (or once ANALYZE_WAIT_SECONDS pass)
+    the response is 202 with a job_id to poll at /jobs/{job_id}.
+
+    An X-Profile header carrying the admin token records a sampling profile
+    of the run, linked from performance.profiling.
+    """
+    if (file is None) == (frames is None):
+        raise HTTPException(status_code=400, detail="Send either file or frames")
+    if frames is not None and audio is None:
+        raise HTTPException(status_code=400, detail="frames need an audio track")
+    with metrics.ANALYZE_IN_FLIGHT.track_inprogress():
+        jobs_ahead = int(metrics.ANALYZE_IN_FLIGHT.get()) - 1
+        try:
+            analysis_profile = select_profile(profile, jobs_ahead, ANALYSIS_WORKERS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        try:
+            profiled = profiling.should_profile(_is_admin(x_profile))
+            if job_queue is not None:
+                return await _enqueue_upload(file, audio, frames, analysis_profile, wait, profiled)
+            return await _analyze_upload(file, audio, frames, analysis_profile, profiled)
+        except AdmissionError as e:
+            metrics.ADMISSION_REJECTIONS.inc(reason=e.reason)
+            raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+def _spool_upload(file: UploadFile, directory: Optional[str] = None, allowed=None) -> str:
+    """Save the upload (original extension, size limit enforced) and return its path"""
+    # Only known video containers (or the given extensions) are accepted
+    file_extension = admission.check_extension(file.filename, allowed=allowed)
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension, dir=directory)
+    try:
+        with tmp:
+            admission.copy_limited(file.file, tmp)
+    except BaseException:
+        _remove_upload(tmp.name)
+        raise
+    finally:
+        # Ensure file is closed before processing
+        file.file.close()
+    return tmp.name
+
+def _spool_inputs(file: Optional[UploadFile], audio: Optional[UploadFile], frames: Optional[UploadFile],
+                  directory: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """Spool a recording or a client-reduced upload; returns (video file or frames directory, audio or None)"""
+    spooled = []
+    try:
+        if frames is not None:
+            archive_path = _spool_upload(frames, directory, allowed={".zip"})
+            try:
+                video_path = tempfile.mkdtemp(prefix="frames-", dir=directory)
+                spooled.append(video_path)
+                admission.extract_frames(archive_path, video_path)
+            finally:
+                _remove_upload(archive_path)
+        else:
+            video_path = _spool_upload(file, directory)
+            spooled.append(video_path)
+        audio_path = _spool_upload(audio, directory, allowed={".wav"}) if audio is not None else None
+    except BaseException:
+        for path in spooled:
+            _remove_upload(path)
+        raise
+    return video_path, audio_path
+
+def _remove_upload(tmp_path: str):
+    # Clean up temp file (and its cached frame index) with retry mechanism
+    if os.path.isdir(tmp_path):
+        shutil.rmtree(tmp_path, ignore_errors=True)  # client-extracted frames
+        return
+    discard_index(tmp_path)
+    try:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    except PermissionError:
+        # File might still be in use, try again after a short delay
+        time.sleep(0.1)
+        try:
+            os.remove(tmp_path)
+        except:
+            pass  # Give up if still can't delete
+
+async def _analyze_upload(file: Optional[UploadFile], audio: Optional[UploadFile], frames: Optional[UploadFile],
+                          analysis_profile, profiled: bool = False):
+    video_path, audio_path = _spool_inputs(file, audio, frames)
+    return await _analyze_spooled(video_path, analysis_profile, audio_path, profiled)
+
+async def _analyze_spooled(tmp_path: str, analysis_profile, audio_path: Optional[str] = None,
+                           profiled: Optional[bool] = None):
+    """Inline mode: analyze a spooled upload (and its pre-extracted audio) on this process's pool, then delete it.
+
+    profiled None leaves the profiling decision to the configured sampling rate.
+    """
+    queued = False
+    try:
+        # Probe duration/resolution (rejects over-long recordings) and wait
+        # until the job's estimated cost and memory fit
+        loop = asyncio.get_running_loop()
+        estimate = await loop.run_in_executor(None, admission.probe_input, tmp_path, audio_path)
+        metrics.ANALYSIS_QUEUE_DEPTH.inc()
+        queued = True
+        async with admission.limiter.reserve(estimate.amounts):
+            # Run on the analysis pool so the event loop keeps serving other routes
+            queued = False
+            if profiled is None:
+                profiled = profiling.should_profile()
+            result = await loop.run_in_executor(analysis_executor, run_analysis, tmp_path, analysis_profile,
+                                                audio_path, profiled)
+        if isinstance(result, dict) and "performance" in result:
+            result["performance"]["admission"] = estimate.to_dict()
         return result
 
+    except AdmissionError:
+        raise
     except Exception as e:
         return {"error": "Analysis failed", "details": str(e)}
     finally:
-        # Clean up temp file with retry mechanism
+        if queued:
+            metrics.ANALYSIS_QUEUE_DEPTH.dec()
+        _remove_upload(tmp_path)
+        if audio_path is not None:
+            _remove_upload(audio_path)
+
+async def _enqueue_upload(file: Optional[UploadFile], audio: Optional[UploadFile], frames: Optional[UploadFile],
+                          analysis_profile, wait: bool, profiled: bool = False):
+    """Queue mode: spool to shared storage, enqueue, and optionally wait for a worker's result"""
+    os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+    video_path, audio_path = _spool_inputs(file, audio, frames, JOB_SPOOL_DIR)
+    job_id, result = await _run_queued(video_path, analysis_profile, wait, audio_path, profiled)
+    if result is None:
+        return JSONResponse({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}, status_code=202)
+    return result
+
+async def _run_queued(tmp_path: str, analysis_profile, wait: bool, audio_path: Optional[str] = None,
+                      profiled: Optional[bool] = None) -> Tuple[str, Optional[Dict]]:
+    """Enqueue a spooled upload; returns (job_id, result), result None if not finished in time"""
+    loop = asyncio.get_running_loop()
+    try:
+        estimate = await loop.run_in_executor(None, admission.probe_input, tmp_path, audio_path)
+        # Workers reserve the amounts against their own limiter before running the job
+        payload = {"video_path": tmp_path, "profile": analysis_profile.name,
+                   "admission": dict(estimate.to_dict(), amounts=estimate.amounts)}
+        if audio_path is not None:
+            payload["audio_path"] = audio_path
+        if profiled if profiled is not None else profiling.should_profile():
+            payload["profiling"] = True
+        job = await loop.run_in_executor(None, job_queue.enqueue, "analyze", payload)
+    except BaseException:
+        # Until the job is queued the upload is ours to delete
+        _remove_upload(tmp_path)
+        if audio_path is not None:
+            _remove_upload(audio_path)
+        raise
+
+    if wait:
+        waited_until = time.monotonic() + ANALYZE_WAIT_SECONDS
+        while time.monotonic() < waited_until:
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            current = await loop.run_in_executor(None, job_queue.get, job.id)
+            if current is None:
+                break
+            if current.status == "succeeded":
+                return job.id, current.result
+            if current.status == "failed":
+                return job.id, {"error": "Analysis failed", "details": current.error}
+    return job.id, None
+
+@app.post("/interviews/analyze")
+async def analyze_interview(
+    files: List[UploadFile] = File(...),
+    questions: List[str] = Form([]),
+    user_id: Optional[str] = Form(None),
+    topic: str = Form("Mock Interview"),
+    profile: Optional[str] = Query(None),
+):
+    """Analyze every answer of one mock interview in a single request.
+
+    files[i] answers questions[i]. Answers are analysed concurrently (subject
+    to the same admission limits as /analyze) and, when user_id is given,
+    every scored answer is saved as a session in one write. The response
+    carries each answer's result and a combined interview report.
+    """
+    if len(files) > INTERVIEW_MAX_ANSWERS:
+        raise HTTPException(status_code=400, detail=f"At most {INTERVIEW_MAX_ANSWERS} answers per interview")
+    if questions and len(questions) != len(files):
+        raise HTTPException(status_code=400, detail="questions must have one entry per file")
+    if user_id is not None and get_user_by_id(user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+    metrics.ANALYZE_IN_FLIGHT.inc(len(files))
+    spooled = []
+    try:
+        jobs_ahead = int(metrics.ANALYZE_IN_FLIGHT.get()) - len(files)
         try:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-        except PermissionError:
-            # File might still be in use, try again after a short delay
-            import time
-            time.sleep(0.1)
-            try:
-                os.remove(tmp_path)
-            except:
-                pass  # Give up if still can't delete
+            analysis_profile = select_profile(profile, jobs_ahead, ANALYSIS_WORKERS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Reject the whole interview up front if any file is the wrong type or too large
+        directory = None
+        if job_queue is not None:
+            os.makedirs(JOB_SPOOL_DIR, exist_ok=True)
+            directory = JOB_SPOOL_DIR
+        try:
+            for file in files:
+                spooled.append(_spool_upload(file, directory))
+        except BaseException as e:
+            for tmp_path in spooled:
+                _remove_upload(tmp_path)
+            if isinstance(e, AdmissionError):
+                metrics.ADMISSION_REJECTIONS.inc(reason=e.reason)
+                raise HTTPException(status_code=e.status_code, detail=f"{e.detail} ({file.filename})")
+            raise
+
+        results = await asyncio.gather(*(_analyze_answer(tmp_path, analysis_profile) for tmp_path in spooled))
+    finally:
+        metrics.ANALYZE_IN_FLIGHT.dec(len(files))
+
+    interview_id = str(uuid.uuid4())
+    answers = [{"index": i, "question": questions[i] if questions else None, "result": result}
+               for i, result in enumerate(results)]
+    report = build_interview_report(answers)
+
+    # Like the single-answer flow, only answers with a positive score become sessions
+    sessions = []
+    to_save = [answer for answer in answers if is_scored(answer["result"]) and answer["result"]["score"] > 0]
+    if user_id is not None and to_save:
+        entries = [{
+            "topic": topic,
+            "score": answer["result"]["score"],
+            "duration": round(answer["result"].get("video_duration") or 0),
+            "question": answer["question"],
+            "detailed_metrics": answer["result"],
+        } for answer in to_save]
+        try:
+            sessions = add_sessions(user_id, entries, interview_id=interview_id)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        for answer, session in zip(to_save, sessions):
+            answer["session_id"] = session["id"]
+
+    return {"interview_id": interview_id, "report": report, "answers": answers,
+            "sessions_saved": len(sessions)}
+
+async def _analyze_answer(tmp_path: str, analysis_profile) -> Dict:
+    """One answer of an interview; admission problems become that answer's error"""
+    try:
+        if job_queue is not None:
+            job_id, result = await _run_queued(tmp_path, analysis_profile, wait=True)
+            if result is None:
+                return {"error": "Analysis still running", "job_id": job_id, "status_url": f"/jobs/{job_id}"}
+            return result
+        return await _analyze_spooled(tmp_path, analysis_profile)
+    except AdmissionError as e:
+        metrics.ADMISSION_REJECTIONS.inc(reason=e.reason)
+        return {"error": "Upload rejected", "details": e.detail}
+
+# Resumable uploads: POST /uploads, PATCH chunks at Upload-Offset, then finalize
+class UploadCreate(BaseModel):
+    filename: str
+    length: Optional[int] = None
+    sha256: Optional[str] = None
+
+def _upload_http_error(e: Exception) -> HTTPException:
+    if isinstance(e, AdmissionError):
+        metrics.ADMISSION_REJECTIONS.inc(reason=e.reason)
+    return HTTPException(status_code=e.status_code, detail=e.detail)
+
+@app.post("/uploads", status_code=201)
+async def create_upload(upload: UploadCreate):
+    """Start a resumable upload; length (bytes) and sha256 of the whole file are optional"""
+    try:
+        session = await asyncio.get_running_loop().run_in_executor(
+            None, upload_store.create, upload.filename, upload.length, upload.sha256)
+    except (AdmissionError, UploadError) as e:
+        raise _upload_http_error(e)
+    return session.to_dict()
+
+@app.get("/uploads/{upload_id}")
+async def get_upload(upload_id: str):
+    """Offset to resume from after a dropped connection"""
+    try:
+        session = upload_store.get(upload_id)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    return JSONResponse(session.to_dict(), headers={"Upload-Offset": str(session.offset)})
+
+@app.patch("/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    upload_checksum: Optional[str] = Header(None, alias="Upload-Checksum"),
+):
+    """Append the raw request body at Upload-Offset (409 with the current offset if it doesn't match)"""
+    # BodyLimitMiddleware stops bodies over UPLOAD_CHUNK_MAX_BYTES while they arrive
+    data = await request.body()
+    try:
+        session = await asyncio.get_running_loop().run_in_executor(
+            None, upload_store.append, upload_id, upload_offset, data, upload_checksum)
+    except (AdmissionError, UploadError) as e:
+        raise _upload_http_error(e)
+    return JSONResponse(session.to_dict(), headers={"Upload-Offset": str(session.offset)})
+
+@app.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, profile: Optional[str] = Query(None), wait: bool = Query(True),
+                          x_profile: Optional[str] = Header(None)):
+    """Verify the complete upload and analyze it; responds like /analyze"""
+    with metrics.ANALYZE_IN_FLIGHT.track_inprogress():
+        jobs_ahead = int(metrics.ANALYZE_IN_FLIGHT.get()) - 1
+        try:
+            analysis_profile = select_profile(profile, jobs_ahead, ANALYSIS_WORKERS)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        loop = asyncio.get_running_loop()
+        profiled = profiling.should_profile(_is_admin(x_profile))
+        try:
+            if job_queue is not None:
+                video_path, audio_path = await loop.run_in_executor(
+                    None, upload_store.finalize, upload_id, JOB_SPOOL_DIR)
+                job_id, result = await _run_queued(video_path, analysis_profile, wait, audio_path, profiled)
+                if result is None:
+                    return JSONResponse({"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"},
+                                        status_code=202)
+                return result
+            video_path, audio_path = await loop.run_in_executor(None, upload_store.finalize, upload_id)
+            return await _analyze_spooled(video_path, analysis_profile, audio_path, profiled)
+        except (AdmissionError, UploadError) as e:
+            raise _upload_http_error(e)
+
+@app.delete("/uploads/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str):
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, upload_store.discard, upload_id)
+    except UploadError as e:
+        raise _upload_http_error(e)
+    return Response(status_code=204)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status (and result, once finished) of a queued analysis"""
+    if job_queue is None:
+        raise HTTPException(status_code=404, detail="Job queue is not enabled (ANALYSIS_MODE=inline)")
+    job = await asyncio.get_running_loop().run_in_executor(None, job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+warmup_task = None
+
+@app.on_event("startup")
+async def start_model_warmup():
+    global warmup_task
+    # In queue mode the models run on the workers, which warm up themselves
+    if MODEL_WARMUP and job_queue is None:
+        warmup_task = asyncio.get_running_loop().run_in_executor(None, warm_up, MODEL_WARMUP_POSE_COMPLEXITIES)
+
+@app.get("/ready")
+async def ready():
+    """Readiness for load balancers: 503 until the models are warm (or if warm-up failed)"""
+    if warmup_task is None:
+        # Warm-up disabled (models load on first use) or not needed in queue mode
+        return {"models": model_cache.model_status(), "warm_up": None, "ready": True}
+    # The models warm-up loads, not every model an analysis might use
+    body = {"models": model_cache.model_status(MODEL_WARMUP_POSE_COMPLEXITIES), "warm_up": None}
+    if not warmup_task.done():
+        body.update(ready=False, warm_up={"status": "running"})
+        return JSONResponse(body, status_code=503)
+    try:
+        state = warmup_task.result()
+    except Exception as e:
+        state = {"ready": False, "error": str(e)}
+    body.update(ready=state["ready"], warm_up=state)
+    return body if state["ready"] else JSONResponse(body, status_code=503)
+
+async def _archive_periodically():
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, archive_old_sessions)
+        except Exception as e:
+            print(f"Session archival failed: {e}")
+        await asyncio.sleep(SESSION_ARCHIVE_INTERVAL_HOURS * 3600)
+
+@app.on_event("startup")
+async def start_session_archival():
+    if SESSION_ARCHIVE_INTERVAL_HOURS > 0:
+        asyncio.get_running_loop().create_task(_archive_periodically())
 
 # Questions endpoints
+@app.on_event("startup")
+async def preload_question_banks():
+    question_bank.preload()
+
 @app.get("/questions/{interview_type}")
-async def get_questions(interview_type: str):
-    """Get questions for a specific interview type"""
-    try:
-        # Map interview types to file names
-        type_mapping = {
-            "hr": "hr_questions.json",
-            "technical": "technical_questions.json", 
-            "behavioral": "behavioral_questions.json"
-        }
-        
-        if interview_type not in type_mapping:
-            raise HTTPException(status_code=400, detail="Invalid interview type")
-        
-        # Get the project root directory (go up from backend/main.py to project root)
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        file_path = os.path.join(project_root, "data", "questions", type_mapping[interview_type])
-        
-        if not os.path.exists(file_path):
-            raise HTTPException(status_code=404, detail="Questions file not found")
-        
-        with open(file_path, 'r', encoding='utf-8') as f:
-            questions_data = json.load(f)
-        
-        return questions_data
+async def get_questions(
+    interview_type: str,
+    request: Request,
+    difficulty: Optional[str] = None,
+    category: Optional[str] = None,
+    sample: Optional[int] = Query(None, ge=1),
+):
+    """Get questions for a specific interview type, optionally filtered or sampled"""
+    if not question_bank.is_valid_type(interview_type):
+        raise HTTPException(status_code=400, detail="Invalid interview type")
+
+    try:
+        entry = question_bank.get(interview_type)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Questions file not found")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading questions: {str(e)}")
 
+    # Random samples differ per request, so they are never cached
+    if sample is not None:
+        payload = question_bank.sample(interview_type, sample, difficulty, category)
+        return JSONResponse(payload, headers={"Cache-Control": "no-store"})
+
+    if difficulty or category:
+        body, etag = entry.filtered_body(difficulty, category)
+    else:
+        body, etag = entry.body, entry.etag
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": entry.last_modified,
+        "Cache-Control": "no-cache",
+    }
+    if is_not_modified(etag, entry.last_modified,
+                       request.headers.get("if-none-match"),
+                       request.headers.get("if-modified-since")):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
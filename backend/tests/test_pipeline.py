@@ -0,0 +1,45 @@
+from utils.deadline import Deadline
+from utils.pipeline import AnalyzerRegistry, DagScheduler
+from utils.tracing import Trace
+
+
+def _run(registry, values=None):
+    return DagScheduler(grace_seconds=0.5).run(registry, values or {}, Trace(), None, Deadline(None))
+
+
+def test_analyzer_reported_timeout_is_kept():
+    registry = AnalyzerRegistry()
+    registry.analyzer("facial")(lambda ctx: {"status": "timeout", "coverage": 0.4})
+    registry.analyzer("speech")(lambda ctx: {"status": "ok", "score": 70})
+    registry.analyzer("report", inputs=("facial",))(lambda ctx, facial: {"score": 1})
+
+    outputs, statuses = _run(registry)
+
+    assert statuses["facial"] == {"status": "timeout", "coverage": 0.4}
+    assert statuses["speech"]["status"] == "ok"
+    # Dependents of a timed-out analyzer don't run on its output
+    assert statuses["report"]["status"] == "timeout"
+    assert "report" not in outputs
+
+
+def test_analyzer_reported_error_is_kept():
+    registry = AnalyzerRegistry()
+    registry.analyzer("body")(lambda ctx: {"status": "error", "error": "no landmarks"})
+
+    _, statuses = _run(registry)
+
+    assert statuses["body"] == {"status": "error", "error": "no landmarks"}
+
+
+def test_unknown_or_missing_status_counts_as_ok():
+    registry = AnalyzerRegistry()
+    registry.analyzer("custom")(lambda ctx: {"status": "done"})
+    registry.analyzer("plain")(lambda ctx: 42)
+    registry.analyzer("partial")(lambda ctx: {"status": "partial", "coverage": 0.9})
+
+    outputs, statuses = _run(registry)
+
+    assert statuses["custom"]["status"] == "ok"
+    assert statuses["plain"]["status"] == "ok"
+    assert outputs["plain"] == 42
+    assert statuses["partial"] == {"status": "partial", "coverage": 0.9}
@@ -0,0 +1,366 @@
+import os
+import wave
+import shutil
+import asyncio
+import zipfile
+import threading
+import subprocess
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+from utils.decode import DECODE_BACKEND, DECODE_QUEUE_FRAMES, probe_video
+from utils.media_index import FRAME_FILE, load_frame_sequence
+from utils import metrics
+
+# Upload limits, checked before any model runs
+UPLOAD_MAX_BYTES = int(float(os.getenv("UPLOAD_MAX_MB", "500")) * 1024 * 1024)
+UPLOAD_MAX_DURATION_SECONDS = float(os.getenv("UPLOAD_MAX_DURATION_SECONDS", "1800"))
+ALLOWED_EXTENSIONS = {
+    ext.strip().lower() for ext in os.getenv("UPLOAD_ALLOWED_EXTENSIONS", ".webm,.mp4,.mov,.mkv,.m4v,.avi").split(",")
+    if ext.strip()
+}
+
+# Client-reduced uploads: 16 kHz mono WAV next to a low-FPS video, or a zip
+# of frames named <milliseconds>.jpg/.png instead of the video
+REDUCED_AUDIO_RATE = 16000
+UPLOAD_MAX_FRAMES = int(os.getenv("UPLOAD_MAX_FRAMES", "7200"))
+# Client frames are charged as this resolution (they are sent downscaled)
+FRAME_SEQUENCE_SIZE = (640, 360)
+
+# Concurrent analysis is limited by estimated cost rather than request count.
+# Cost is video seconds x megapixels (a 5 minute 720p answer is ~280).
+ANALYSIS_COST_CAPACITY = float(os.getenv("ANALYSIS_COST_CAPACITY", "1200"))
+# Memory the running analyses may use together (models are shared and not counted)
+ANALYSIS_MEMORY_BUDGET_MB = float(os.getenv("ANALYSIS_MEMORY_BUDGET_MB", "4096"))
+# Working memory of one analysis besides decoded frames (audio blocks, Vosk, scoring)
+JOB_BASE_MEMORY_MB = 300
+# Cost charged when ffprobe can't read the upload's duration or resolution
+UNKNOWN_COST = float(os.getenv("ANALYSIS_UNKNOWN_COST", str(ANALYSIS_COST_CAPACITY / 2)))
+
+
+class AdmissionError(Exception):
+    """Upload rejected before analysis; status_code is the HTTP status to return"""
+
+    def __init__(self, status_code: int, detail: str, reason: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.reason = reason
+
+
+def check_extension(filename: Optional[str], default: str = ".mp4", allowed=None) -> str:
+    """Validated lower-case extension of an uploaded file name (allowed defaults to the video types)"""
+    allowed = allowed or ALLOWED_EXTENSIONS
+    extension = os.path.splitext(filename or "")[1].lower() or default
+    if extension not in allowed:
+        raise AdmissionError(415, f"Unsupported file type '{extension}'. Allowed: {', '.join(sorted(allowed))}",
+                             "extension")
+    return extension
+
+
+def body_limit(files: int = 1) -> int:
+    """Most request body bytes an upload of up to files files may send"""
+    return UPLOAD_MAX_BYTES * files + 64 * 1024  # allow for multipart framing
+
+
+def _too_large(limit: int) -> str:
+    return f"Upload exceeds the {limit // (1024 * 1024)} MB limit"
+
+
+def check_declared_size(content_length: Optional[str], limit: Optional[int] = None):
+    """Reject early when the request body is already known to be too large"""
+    limit = limit or body_limit()
+    try:
+        size = int(content_length) if content_length else None
+    except ValueError:
+        size = None
+    if size is not None and size > limit:
+        raise AdmissionError(413, _too_large(limit), "size")
+
+
+class BodyTooLarge(HTTPException):
+    """Raised from the request's receive channel once the body passes its limit"""
+
+    def __init__(self, limit: int):
+        super().__init__(413, _too_large(limit))
+
+
+class BodyLimitMiddleware:
+    """ASGI middleware enforcing upload body limits while the body arrives.
+
+    limits(method, path) returns the limit in bytes (None: unlimited).
+    Content-Length is checked up front; chunked bodies are counted as they
+    are received and the request fails with 413 as soon as the count passes
+    the limit, before the multipart parser has spooled the rest to disk.
+    """
+
+    def __init__(self, app, limits: Callable[[str, str], Optional[int]]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or [])
+        try:
+            check_declared_size(headers.get(b"content-length", b"").decode("latin-1"), limit)
+        except AdmissionError as e:
+            metrics.ADMISSION_REJECTIONS.inc(reason=e.reason)
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code)(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    metrics.ADMISSION_REJECTIONS.inc(reason="size")
+                    raise BodyTooLarge(limit)
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        # Form parsing re-raises HTTPExceptions, so routes answer 413 on their
+        # own; this catches routes that read the stream without that handling
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except BodyTooLarge as e:
+            if response_started:
+                raise
+            await JSONResponse({"detail": e.detail}, status_code=e.status_code)(scope, receive, send)
+
+
+def copy_limited(source, destination, limit: int = UPLOAD_MAX_BYTES, chunk_size: int = 1024 * 1024) -> int:
+    """Copy a file object, failing as soon as more than limit bytes arrive"""
+    copied = 0
+    while True:
+        chunk = source.read(chunk_size)
+        if not chunk:
+            return copied
+        copied += len(chunk)
+        if copied > limit:
+            raise AdmissionError(413, _too_large(limit), "size")
+        destination.write(chunk)
+
+
+class JobEstimate:
+    """Probed facts about an upload and the resources its analysis is charged"""
+
+    def __init__(self, duration: Optional[float], width: Optional[int], height: Optional[int]):
+        self.duration = duration
+        self.width = width
+        self.height = height
+        if duration and width and height:
+            self.cost = duration * width * height / 1e6
+        else:
+            self.cost = UNKNOWN_COST
+        frame_mb = (width or 1280) * (height or 720) * 3 / (1024 * 1024)
+        buffered_frames = DECODE_QUEUE_FRAMES * 2 if DECODE_BACKEND == "ffmpeg-shared" else 16
+        self.memory_mb = JOB_BASE_MEMORY_MB + frame_mb * buffered_frames
+
+    @property
+    def amounts(self) -> Dict[str, float]:
+        return {"cost": self.cost, "memory_mb": self.memory_mb}
+
+    def to_dict(self) -> Dict:
+        return {
+            "duration_seconds": round(self.duration, 2) if self.duration else None,
+            "resolution": f"{self.width}x{self.height}" if self.width and self.height else None,
+            "cost": round(self.cost, 1),
+            "memory_mb": round(self.memory_mb),
+        }
+
+
+def _check_duration(duration: Optional[float]):
+    if duration is not None and duration > UPLOAD_MAX_DURATION_SECONDS:
+        raise AdmissionError(413, f"Recording is {duration:.0f}s long; the limit is {UPLOAD_MAX_DURATION_SECONDS:.0f}s",
+                             "duration")
+
+
+def check_audio(path: str) -> float:
+    """Validate a client-extracted audio track (16 kHz mono 16-bit WAV); returns its duration"""
+    try:
+        with wave.open(path, "rb") as wf:
+            supported = (wf.getnchannels() == 1 and wf.getsampwidth() == 2
+                         and wf.getframerate() == REDUCED_AUDIO_RATE)
+            duration = wf.getnframes() / wf.getframerate() if wf.getframerate() else 0.0
+    except (wave.Error, EOFError) as e:
+        raise AdmissionError(415, f"Audio must be a WAV file: {e}", "audio_format")
+    if not supported:
+        raise AdmissionError(415, "Audio must be 16 kHz mono 16-bit PCM WAV", "audio_format")
+    _check_duration(duration)
+    return duration
+
+
+def extract_frames(archive_path: str, directory: str) -> int:
+    """Unpack a zip of <ms>.jpg/.png frames into directory, enforcing count and size limits"""
+    try:
+        archive = zipfile.ZipFile(archive_path)
+    except zipfile.BadZipFile:
+        raise AdmissionError(422, "Frames must be a zip archive", "unreadable")
+    with archive:
+        members = [member for member in archive.infolist() if not member.is_dir()]
+        if len(members) > UPLOAD_MAX_FRAMES:
+            raise AdmissionError(413, f"At most {UPLOAD_MAX_FRAMES} frames per upload", "frames")
+        # Declared sizes, so a zip bomb is refused before anything is written
+        if sum(member.file_size for member in members) > UPLOAD_MAX_BYTES:
+            raise AdmissionError(413, f"Frames exceed the {UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit", "size")
+        for member in members:
+            name = os.path.basename(member.filename)
+            if not FRAME_FILE.match(name):
+                raise AdmissionError(422, f"Unexpected file '{member.filename}' in frames archive "
+                                          "(expected <milliseconds>.jpg or .png)", "unreadable")
+            with archive.open(member) as source, open(os.path.join(directory, name), "wb") as target:
+                shutil.copyfileobj(source, target)
+    if not members:
+        raise AdmissionError(422, "Frames archive is empty", "unreadable")
+    return len(members)
+
+
+def probe_input(path: str, audio_path: Optional[str] = None) -> JobEstimate:
+    """Estimate for a spooled upload: a video file or a directory of frames, plus optional audio"""
+    audio_duration = check_audio(audio_path) if audio_path is not None else None
+    if os.path.isdir(path):
+        _, index = load_frame_sequence(path)
+        _check_duration(index.duration)
+        return JobEstimate(index.duration, *FRAME_SEQUENCE_SIZE)
+    estimate = probe_upload(path)
+    if estimate.duration is None and audio_duration is not None:
+        # Browser-recorded webm carries no duration; the audio track has the same length
+        estimate = JobEstimate(audio_duration, estimate.width, estimate.height)
+    return estimate
+
+
+def probe_upload(path: str) -> JobEstimate:
+    """ffprobe the spooled upload and enforce the duration limit"""
+    try:
+        info = probe_video(path)
+    except FileNotFoundError:
+        print("ffprobe not available; admitting upload without a duration check")
+        return JobEstimate(None, None, None)
+    except (subprocess.CalledProcessError, RuntimeError, ValueError, KeyError) as e:
+        raise AdmissionError(422, f"Unreadable video: {e}", "unreadable")
+    duration = info["duration"]
+    if duration is None and info["fps"] and info["frames"]:
+        duration = info["frames"] / info["fps"]
+    _check_duration(duration)
+    return JobEstimate(duration, info["width"], info["height"])
+
+
+class CostLimiter:
+    """FIFO admission against several capacities (estimated cost and memory).
+
+    A job larger than a capacity is clamped to it, so it still runs, alone.
+    """
+
+    def __init__(self, capacities: Dict[str, float]):
+        self.capacities = capacities
+        self.in_use = {name: 0.0 for name in capacities}
+        self._waiters = deque()
+
+    def _fits(self, amounts: Dict[str, float]) -> bool:
+        return all(self.in_use[name] + amount <= self.capacities[name] + 1e-9 for name, amount in amounts.items())
+
+    def _take(self, amounts: Dict[str, float]):
+        for name, amount in amounts.items():
+            self.in_use[name] += amount
+            metrics.ANALYSIS_RESOURCES_IN_USE.set(self.in_use[name], resource=name)
+
+    def _release(self, amounts: Dict[str, float]):
+        for name, amount in amounts.items():
+            self.in_use[name] = max(0.0, self.in_use[name] - amount)
+            metrics.ANALYSIS_RESOURCES_IN_USE.set(self.in_use[name], resource=name)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._fits(self._waiters[0][0]):
+            amounts, future = self._waiters.popleft()
+            if future.cancelled():
+                continue
+            self._take(amounts)
+            future.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @asynccontextmanager
+    async def reserve(self, amounts: Dict[str, float]):
+        amounts = {name: min(amount, self.capacities[name]) for name, amount in amounts.items()}
+        if self._waiters or not self._fits(amounts):
+            entry = (amounts, asyncio.get_running_loop().create_future())
+            self._waiters.append(entry)
+            try:
+                await entry[1]
+            except asyncio.CancelledError:
+                if entry[1].done() and not entry[1].cancelled():
+                    self._release(amounts)  # granted just as the client went away
+                elif entry in self._waiters:
+                    self._waiters.remove(entry)
+                    self._wake()
+                raise
+        else:
+            self._take(amounts)
+        try:
+            yield
+        finally:
+            self._release(amounts)
+
+
+class ThreadCostLimiter(CostLimiter):
+    """CostLimiter for threads rather than coroutines (the queue workers' job slots)"""
+
+    def __init__(self, capacities: Dict[str, float]):
+        super().__init__(capacities)
+        self._condition = threading.Condition()
+
+    def _wake(self):
+        self._condition.notify_all()
+
+    @contextmanager
+    def reserve(self, amounts: Dict[str, float], cancelled: Optional[threading.Event] = None):
+        """Yields True once amounts are reserved, or False if cancelled was set while waiting"""
+        amounts = {name: min(amount, self.capacities[name]) for name, amount in amounts.items()}
+        entry = object()
+        granted = False
+        with self._condition:
+            self._waiters.append(entry)
+            try:
+                while cancelled is None or not cancelled.is_set():
+                    if self._waiters[0] is entry and self._fits(amounts):
+                        self._take(amounts)
+                        granted = True
+                        break
+                    # Timed so a cancellation is noticed without a notify
+                    self._condition.wait(timeout=1.0)
+            finally:
+                self._waiters.remove(entry)
+                self._condition.notify_all()
+        try:
+            yield granted
+        finally:
+            if granted:
+                with self._condition:
+                    self._release(amounts)
+
+
+def cost_capacities() -> Dict[str, float]:
+    """Capacities of one node's analyses (API process or queue worker)"""
+    return {"cost": ANALYSIS_COST_CAPACITY, "memory_mb": ANALYSIS_MEMORY_BUDGET_MB}
+
+
+limiter = CostLimiter(cost_capacities())
@@ -0,0 +1,226 @@
+import math
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Online aggregators for per-frame scores and audio features. Analyzers push
+# values as they go instead of keeping every value in a list, so memory stays
+# bounded for hour-long recordings.
+
+
+class RunningStats:
+    """Count, mean, variance (Welford), min and max in constant memory"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def push(self, value: float):
+        if value is None or math.isnan(value):
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def push_many(self, values: np.ndarray):
+        """Merge a batch (Chan et al. parallel variance); NaNs are dropped"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return
+        batch_mean = float(values.mean())
+        batch_m2 = float(np.square(values - batch_mean).sum())
+        total = self.count + values.size
+        delta = batch_mean - self.mean
+        self.mean += delta * values.size / total
+        self._m2 += batch_m2 + delta * delta * self.count * values.size / total
+        self.count = total
+        low, high = float(values.min()), float(values.max())
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    @property
+    def variance(self) -> float:
+        """Population variance (matches np.var)"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": round(self.mean, 4) if self.count else None,
+            "std": round(self.std, 4) if self.count else None,
+            "min": round(self.min, 4) if self.min is not None else None,
+            "max": round(self.max, 4) if self.max is not None else None,
+        }
+
+
+class QuantileSketch:
+    """Approximate quantiles from a compacting sketch (KLL-style).
+
+    Level i holds items that each stand for 2**i values; a full level is
+    sorted and every other item moves up. Memory is about
+    capacity * log2(n / capacity) items.
+    """
+
+    def __init__(self, capacity: int = 128):
+        self.capacity = capacity
+        self.levels: List[List[float]] = [[]]
+        self.count = 0
+        self._offset = 0
+
+    def push(self, value: float):
+        if value is None or math.isnan(value):
+            return
+        self.levels[0].append(value)
+        self.count += 1
+        level = 0
+        while len(self.levels[level]) >= self.capacity:
+            items = sorted(self.levels[level])
+            self.levels[level] = []
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            # Alternate which half survives so the error doesn't drift one way
+            self.levels[level + 1].extend(items[self._offset::2])
+            self._offset ^= 1
+            level += 1
+
+    def push_many(self, values):
+        for value in np.asarray(values, dtype=np.float64).ravel():
+            self.push(float(value))
+
+    def quantiles(self, qs: Tuple[float, ...]) -> Dict[float, Optional[float]]:
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.levels) for value in items)
+        if not weighted:
+            return {q: None for q in qs}
+        total = sum(weight for _, weight in weighted)
+        result = {}
+        for q in qs:
+            target, running = q * total, 0
+            for value, weight in weighted:
+                running += weight
+                if running >= target:
+                    result[q] = value
+                    break
+            else:
+                result[q] = weighted[-1][0]
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        return self.quantiles((q,))[q]
+
+
+class FixedHistogram:
+    """Counts over equal-width bins between low and high (outliers go to the end bins)"""
+
+    def __init__(self, low: float, high: float, bins: int = 10):
+        self.low = low
+        self.high = high
+        self.counts = [0] * bins
+
+    def push(self, value: float):
+        if value is None or math.isnan(value):
+            return
+        bins = len(self.counts)
+        index = int((value - self.low) / (self.high - self.low) * bins)
+        self.counts[max(0, min(bins - 1, index))] += 1
+
+    def to_dict(self) -> Dict:
+        width = (self.high - self.low) / len(self.counts)
+        return {"edges": [round(self.low + i * width, 4) for i in range(len(self.counts) + 1)],
+                "counts": list(self.counts)}
+
+
+class TimeRollup:
+    """Count/mean/min/max per time bucket (per minute by default)"""
+
+    def __init__(self, bucket_seconds: float = 60.0):
+        self.bucket_seconds = bucket_seconds
+        self._buckets: Dict[int, List[float]] = {}
+
+    def push(self, value: float, t: float):
+        if value is None or t is None or math.isnan(value):
+            return
+        bucket = self._buckets.setdefault(int(t // self.bucket_seconds), [0, 0.0, value, value])
+        bucket[0] += 1
+        bucket[1] += value
+        bucket[2] = min(bucket[2], value)
+        bucket[3] = max(bucket[3], value)
+
+    def to_list(self) -> List[Dict]:
+        return [{"start_sec": index * self.bucket_seconds, "count": count, "mean": round(total / count, 4),
+                 "min": round(low, 4), "max": round(high, 4)}
+                for index, (count, total, low, high) in sorted(self._buckets.items())]
+
+
+class StreamingSeries:
+    """Everything an analyzer keeps about one per-frame signal.
+
+    Running moments always; quantiles, a histogram (when a value range is
+    given) and a timeline (when values come with timestamps) on top.
+    """
+
+    QUANTILES = (0.1, 0.5, 0.9)
+
+    def __init__(self, value_range: Optional[Tuple[float, float]] = None, bins: int = 10,
+                 bucket_seconds: float = 60.0):
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+        self.histogram = FixedHistogram(value_range[0], value_range[1], bins) if value_range else None
+        self.timeline = TimeRollup(bucket_seconds)
+
+    def push(self, value: float, t: Optional[float] = None):
+        value = float(value)
+        self.stats.push(value)
+        self.sketch.push(value)
+        if self.histogram is not None:
+            self.histogram.push(value)
+        if t is not None:
+            self.timeline.push(value, t)
+
+    def push_many(self, values, start: Optional[float] = None, step: Optional[float] = None):
+        """Push a batch; with start/step each value gets timestamp start + i * step"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.stats.push_many(values)
+        self.sketch.push_many(values)
+        for i, value in enumerate(values):
+            if self.histogram is not None:
+                self.histogram.push(value)
+            if start is not None and step is not None:
+                self.timeline.push(value, start + i * step)
+
+    @property
+    def count(self) -> int:
+        return self.stats.count
+
+    @property
+    def mean(self) -> float:
+        return self.stats.mean
+
+    @property
+    def std(self) -> float:
+        return self.stats.std
+
+    def mean_or(self, default: float) -> float:
+        return self.stats.mean if self.stats.count else default
+
+    def to_dict(self) -> Dict:
+        result = self.stats.to_dict()
+        quantiles = self.sketch.quantiles(self.QUANTILES)
+        for q in self.QUANTILES:
+            value = quantiles[q]
+            result[f"p{int(q * 100)}"] = round(value, 4) if value is not None else None
+        if self.histogram is not None:
+            result["histogram"] = self.histogram.to_dict()
+        timeline = self.timeline.to_list()
+        if timeline:
+            result["per_minute"] = timeline
+        return result
@@ -2,10 +2,10 @@ import sys
 import json
 import os
 import time
+import tempfile
 import wave
 import cv2
 import numpy as np
-import re
 try:
     from deepface import DeepFace
     DEEPFACE_AVAILABLE = True
@@ -22,9 +22,39 @@ try:
 except ImportError:
     MEDIAPIPE_AVAILABLE = False
     print("Warning: MediaPipe not available. Body language analysis will be disabled.")
-from functools import lru_cache
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from utils.tracing import Trace
+from utils.profiles import REFERENCE_FACE_SAMPLES_PER_SECOND, frame_interval, get_profile
+from utils.deadline import Deadline, NO_DEADLINE
+from utils.decode import DECODE_BACKEND, ImageSequenceFrameSource, SharedDecode, open_frame_source
+from utils.media_index import PreparedMedia, load_frame_sequence, prepare_media
+from utils.pipeline import AnalyzerRegistry, DagScheduler
+from utils.aggregators import RunningStats, StreamingSeries
+from utils.disfluency import scan_transcript, scan_words
+from utils.vad import VAD_ENABLED, detect_voice_activity, voiced_samples
+
+def _env_seconds(name, default=None):
+    value = os.getenv(name)
+    return float(value) if value else default
+
+# Time budgets (seconds). The overall deadline bounds the whole analysis;
+# per-component budgets default to the overall deadline. Analyzers stop at
+# their budget and return a partial estimate; the grace period covers a
+# single stalled decode call before the component is marked as timed out.
+ANALYSIS_DEADLINE_SECONDS = _env_seconds("ANALYSIS_DEADLINE_SECONDS", 180.0)
+COMPONENT_BUDGETS = {
+    "facial": _env_seconds("ANALYSIS_FACIAL_BUDGET_SECONDS"),
+    "speech": _env_seconds("ANALYSIS_SPEECH_BUDGET_SECONDS"),
+    "body": _env_seconds("ANALYSIS_BODY_BUDGET_SECONDS"),
+}
+ANALYSIS_GRACE_SECONDS = _env_seconds("ANALYSIS_GRACE_SECONDS", 5.0)
+
+# Weights of each component in the final score
+COMPONENT_WEIGHTS = {"facial": 0.4, "speech": 0.4, "body": 0.2}
+
+# MediaPipe Pose model_complexity -> model name used in cache stats
+POSE_MODEL_NAMES = {0: "pose_lite", 1: "pose_full", 2: "pose_heavy"}
 
 # Model Caching System
 class ModelCache:
@@ -32,48 +62,211 @@ class ModelCache:
         self._vosk_model = None
         self._face_cascade = None
         self._eye_cascade = None
-        self._pose_model = None
+        # Idle Pose instances per model_complexity (see pose_model)
+        self._pose_pools = {}
+        # Pose model_complexity values warmed up or used so far
+        self._pose_complexities = set()
         self._lock = threading.Lock()
+        # Seconds spent loading each model, keyed by model name
+        self._load_times = {}
+        # Lookup counters for metrics: served from cache vs loaded
+        self._hits = {}
+        self._loads = {}
     
-    def get_vosk_model(self):
-        if self._vosk_model is None:
+    def _get(self, name, attr, loader):
+        model = getattr(self, attr)
+        if model is None:
             with self._lock:
-                if self._vosk_model is None:
-                    self._vosk_model = Model("vosk-model")
-        return self._vosk_model
+                model = getattr(self, attr)
+                if model is None:
+                    start = time.perf_counter()
+                    model = loader()
+                    self._load_times[name] = round(time.perf_counter() - start, 3)
+                    self._loads[name] = self._loads.get(name, 0) + 1
+                    setattr(self, attr, model)
+                    return model
+        self._hits[name] = self._hits.get(name, 0) + 1
+        return model
+    
+    def is_loaded(self, name):
+        return name in self._load_times
+    
+    def record_load(self, name, seconds):
+        """Note a model loaded outside the cache (e.g. inside DeepFace) on its first use"""
+        with self._lock:
+            if name not in self._load_times:
+                self._load_times[name] = round(seconds, 3)
+                self._loads[name] = self._loads.get(name, 0) + 1
+    
+    def expect_pose(self, complexities):
+        """Note Pose complexities that will be used, so model_status lists them before they load"""
+        with self._lock:
+            self._pose_complexities.update(complexities)
+    
+    def model_status(self, pose_complexities=None):
+        """Load state and load time of every cached model.
+
+        Pose models are listed for pose_complexities (default: those warmed
+        up or used so far) and only when MediaPipe is available.
+        """
+        names = ["vosk", "face_cascade", "eye_cascade"]
+        if DEEPFACE_AVAILABLE:
+            names.append(DEEPFACE_MODEL_NAME)
+        if MEDIAPIPE_AVAILABLE:
+            if pose_complexities is None:
+                pose_complexities = self._pose_complexities
+            names += [POSE_MODEL_NAMES.get(complexity, f"pose_c{complexity}")
+                      for complexity in sorted(set(pose_complexities))]
+        names += [name for name in self._load_times if name not in names]
+        return {
+            name: {"loaded": name in self._load_times, "load_time_seconds": self._load_times.get(name)}
+            for name in names
+        }
+    
+    def hit_counts(self):
+        return dict(self._hits)
+    
+    def load_counts(self):
+        return dict(self._loads)
+    
+    def get_vosk_model(self):
+        return self._get("vosk", "_vosk_model", lambda: Model("vosk-model"))
     
     def get_face_cascade(self):
-        if self._face_cascade is None:
-            with self._lock:
-                if self._face_cascade is None:
-                    self._face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        return self._face_cascade
+        return self._get("face_cascade", "_face_cascade", lambda: cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'))
     
     def get_eye_cascade(self):
-        if self._eye_cascade is None:
-            with self._lock:
-                if self._eye_cascade is None:
-                    self._eye_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml')
-        return self._eye_cascade
+        return self._get("eye_cascade", "_eye_cascade", lambda: cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_eye.xml'))
     
-    def get_pose_model(self):
+    @contextmanager
+    def pose_model(self, complexity=1):
+        """Check out a Pose instance for one video and return it to the pool afterwards.
+
+        Pose tracks landmarks across consecutive frames, so concurrent analyses
+        must not share an instance; the pool grows to the peak concurrency.
+        """
         if not MEDIAPIPE_AVAILABLE:
-            return None
-        if self._pose_model is None:
+            yield None
+            return
+        name = POSE_MODEL_NAMES.get(complexity, f"pose_c{complexity}")
+        with self._lock:
+            self._pose_complexities.add(complexity)
+            pool = self._pose_pools.setdefault(complexity, [])
+            model = pool.pop() if pool else None
+            if model is not None:
+                self._hits[name] = self._hits.get(name, 0) + 1
+        if model is None:
+            start = time.perf_counter()
+            model = mp.solutions.pose.Pose(
+                static_image_mode=False,
+                model_complexity=complexity,
+                enable_segmentation=False,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+            with self._lock:
+                self._load_times[name] = round(time.perf_counter() - start, 3)
+                self._loads[name] = self._loads.get(name, 0) + 1
+        try:
+            yield model
+        finally:
             with self._lock:
-                if self._pose_model is None:
-                    self._pose_model = mp.solutions.pose.Pose(
-                        static_image_mode=False,
-                        model_complexity=1,
-                        enable_segmentation=False,
-                        min_detection_confidence=0.5,
-                        min_tracking_confidence=0.5
-                    )
-        return self._pose_model
+                self._pose_pools[complexity].append(model)
 
 # Global model cache instance
 model_cache = ModelCache()
 
+# DeepFace loads its emotion model lazily on the first analyze call; that
+# call is recorded as the model's load in model_cache
+DEEPFACE_MODEL_NAME = "deepface_emotion"
+
+
+def deepface_emotions(face_roi):
+    """DeepFace emotion distribution of a face crop"""
+    warm = model_cache.is_loaded(DEEPFACE_MODEL_NAME)
+    start = time.perf_counter()
+    result = DeepFace.analyze(face_roi, actions=['emotion'], enforce_detection=False)
+    if not warm:
+        model_cache.record_load(DEEPFACE_MODEL_NAME, time.perf_counter() - start)
+    return result[0]['emotion']
+
+
+# Result of the last warm_up() (None until one has run)
+warmup_state = None
+
+
+def _warmup_audio(path, seconds=1.0, rate=16000):
+    """Write a short quiet noise WAV in the format the speech analysis reads"""
+    samples = (np.random.default_rng(0).standard_normal(int(seconds * rate)) * 300).astype(np.int16)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(samples.tobytes())
+
+
+def _warm_audio_features(path):
+    # analyze_audio_features reports failure as None rather than raising
+    if analyze_audio_features(path, full=True) is None:
+        raise RuntimeError("audio feature extraction failed")
+
+
+def _warm_pose(complexity, frame):
+    with model_cache.pose_model(complexity) as pose:
+        if pose is not None:
+            pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+
+def warm_up(pose_complexities=(1,)):
+    """Load every model and push a dummy frame and audio buffer through it.
+
+    Runs the same calls the analyzers make, so lazy initialisation inside
+    the libraries (DeepFace's emotion model, librosa's compiled kernels)
+    happens here rather than on the first request. Returns and stores in
+    warmup_state {"ready", "seconds", "steps": {name: {"ok", "seconds", "error"}}}.
+    """
+    global warmup_state
+    started = time.perf_counter()
+    frame = np.zeros((360, 640, 3), dtype=np.uint8)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    audio_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    audio_file.close()
+    _warmup_audio(audio_file.name)
+
+    steps = [
+        ("face_cascade", lambda: model_cache.get_face_cascade().detectMultiScale(gray, 1.1, 5)),
+        ("eye_cascade", lambda: model_cache.get_eye_cascade().detectMultiScale(gray, 1.1, 5)),
+        ("vosk", lambda: get_transcript_with_timing(audio_file.name)),
+        ("audio_features", lambda: _warm_audio_features(audio_file.name)),
+    ]
+    if DEEPFACE_AVAILABLE:
+        steps.append((DEEPFACE_MODEL_NAME, lambda: deepface_emotions(frame[:224, :224])))
+    if MEDIAPIPE_AVAILABLE:
+        model_cache.expect_pose(pose_complexities)
+        for complexity in sorted(set(pose_complexities)):
+            steps.append((POSE_MODEL_NAMES.get(complexity, f"pose_c{complexity}"),
+                          lambda complexity=complexity: _warm_pose(complexity, frame)))
+
+    report = {}
+    try:
+        for name, step in steps:
+            step_start = time.perf_counter()
+            try:
+                step()
+                report[name] = {"ok": True, "seconds": round(time.perf_counter() - step_start, 3)}
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+                report[name] = {"ok": False, "seconds": round(time.perf_counter() - step_start, 3), "error": str(e)}
+    finally:
+        os.remove(audio_file.name)
+
+    warmup_state = {
+        "ready": all(step["ok"] for step in report.values()),
+        "seconds": round(time.perf_counter() - started, 3),
+        "steps": report,
+    }
+    return warmup_state
+
 # Video path validation (only when run as script)
 def validate_video_path():
     if len(sys.argv) < 2:
@@ -84,22 +277,37 @@ def validate_video_path():
     if not os.path.exists(video_path):
         print(json.dumps({"error": "Video file not found"}))
         sys.exit(1)
-        return video_path
+    return video_path
 
 # Confidence-focused Facial Analysis
-def analyze_confidence_emotions(video_path):
-    """Analyze facial confidence indicators instead of basic emotions"""
-    cap = cv2.VideoCapture(video_path)
-    frame_interval = 15  # More frequent analysis for better accuracy
+def analyze_confidence_emotions(video_path, trace=None, profile=None, deadline=NO_DEADLINE, frames=None):
+    """Analyze facial confidence indicators instead of basic emotions
+
+    Stops early when deadline expires and scores the frames seen so far
+    (status "partial"). frames may supply an already-open FrameSource
+    (e.g. from a shared decode); otherwise one is opened for video_path.
+    """
+    if trace is None:
+        trace = Trace()
+    if profile is None:
+        profile = get_profile()
+    stage = trace.stage("facial")
+    stage.set_attribute("model", "warm" if model_cache.is_loaded("face_cascade") and model_cache.is_loaded("eye_cascade") else "cold")
+    deepface_stage = trace.stage("facial.deepface")
+    deepface_stage.set_attribute("model", "warm" if model_cache.is_loaded(DEEPFACE_MODEL_NAME) else "cold")
+    deepface_stage.set_attribute("enabled", profile.run_deepface)
+    
+    if frames is None:
+        frames = open_frame_source(video_path, profile.face_frame_interval, profile.max_frame_width)
     frame_count = 0
-    frame_num = 0
+    frames_sampled = 0
+    partial = False
     
-    # Confidence indicators
-    eye_contact_scores = []
-    facial_tension_scores = []
-    head_movement_scores = []
-    smile_authenticity_scores = []
-    blink_rates = []
+    # Confidence indicators (streaming aggregates, constant memory per signal)
+    eye_contact_scores = StreamingSeries(value_range=(0, 100))
+    facial_tension_scores = StreamingSeries(value_range=(0, 100))
+    head_movement_scores = StreamingSeries(value_range=(0, 100))
+    smile_authenticity_scores = StreamingSeries(value_range=(0, 100))
     
     # Initialize face detection using cached models
     face_cascade = model_cache.get_face_cascade()
@@ -109,68 +317,91 @@ def analyze_confidence_emotions(video_path):
     blink_count = 0
     eyes_closed_frames = 0
     
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
+    frame_iter = iter(frames)
+    while True:
+        if deadline.expired():
+            partial = True
             break
-            
-        if frame_num % frame_interval == 0:
-            try:
-                # Convert to grayscale for face detection
+        with trace.span("facial.decode"):
+            item = next(frame_iter, None)
+        if item is None:
+            break
+        frame_index, frame = item
+        scale = frames.scale
+        t = frames.timestamp(frame_index)
+        
+        stage.increment("frames_sampled")
+        frames_sampled += 1
+        try:
+            # Convert to grayscale for face detection
+            with trace.span("facial.face_detection"):
                 gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
                 faces = face_cascade.detectMultiScale(gray, 1.1, 4)
+            
+            if len(faces) > 0:
+                stage.increment("frames_with_faces")
+                # Take the largest face
+                face = max(faces, key=lambda x: x[2] * x[3])
+                x, y, w, h = face
+                face_roi = gray[y:y+h, x:x+w]
                 
-                if len(faces) > 0:
-                    # Take the largest face
-                    face = max(faces, key=lambda x: x[2] * x[3])
-                    x, y, w, h = face
-                    face_roi = gray[y:y+h, x:x+w]
-                    
-                    # Analyze confidence indicators
-                    eye_contact = analyze_eye_contact(face_roi, eye_cascade)
-                    facial_tension = analyze_facial_tension(face_roi)
-                    head_movement = analyze_head_movement(face, prev_face_center)
-                    smile_auth = analyze_smile_authenticity(face_roi)
+                # Analyze confidence indicators
+                with trace.span("facial.eye_detection"):
+                    eye_contact = analyze_eye_contact(face_roi, eye_cascade, scale)
                     blink_detected = detect_blink(face_roi, eye_cascade)
-                    
-                    # Store scores
-                    eye_contact_scores.append(eye_contact)
-                    facial_tension_scores.append(facial_tension)
-                    head_movement_scores.append(head_movement)
-                    smile_authenticity_scores.append(smile_auth)
-                    
-                    # Track blinks
-                    if blink_detected:
+                facial_tension = analyze_facial_tension(face_roi)
+                head_movement = analyze_head_movement(face, prev_face_center, scale)
+                if profile.run_deepface:
+                    with trace.span("facial.deepface"):
+                        smile_auth = analyze_smile_authenticity(face_roi)
+                else:
+                    smile_auth = 50.0  # Neutral, same as when DeepFace is unavailable
+                
+                # Store scores
+                eye_contact_scores.push(eye_contact, t)
+                facial_tension_scores.push(facial_tension, t)
+                head_movement_scores.push(head_movement, t)
+                smile_authenticity_scores.push(smile_auth, t)
+                
+                # Track blinks
+                if blink_detected:
+                    blink_count += 1
+                    eyes_closed_frames = 0
+                else:
+                    eyes_closed_frames += 1
+                    if eyes_closed_frames > 3:  # Eyes closed for too long
                         blink_count += 1
-                        eyes_closed_frames = 0
-                    else:
-                        eyes_closed_frames += 1
-                        if eyes_closed_frames > 3:  # Eyes closed for too long
-                            blink_count += 1
-                    
-                    prev_face_center = (x + w//2, y + h//2)
-                    frame_count += 1
-                    
-            except Exception as e:
-                print(f"Frame analysis error: {e}")
-                pass
                 
-        frame_num += 1
+                prev_face_center = (x + w//2, y + h//2)
+                frame_count += 1
+                
+        except Exception as e:
+            print(f"Frame analysis error: {e}")
+            pass
     
-    cap.release()
+    frames.close()
+    frame_num = frames.frames_read
+    stage.set_attribute("frames_decoded", frame_num)
+    coverage = round(min(1.0, frame_num / frames.total_frames), 3) if frames.total_frames > 0 else None
     
     if frame_count == 0:
+        if partial:
+            return {"status": "timeout", "coverage": coverage}
         return 0
     
     # Calculate average confidence scores
-    avg_eye_contact = np.mean(eye_contact_scores) if eye_contact_scores else 50
-    avg_facial_tension = np.mean(facial_tension_scores) if facial_tension_scores else 50
-    avg_head_movement = np.mean(head_movement_scores) if head_movement_scores else 50
-    avg_smile_auth = np.mean(smile_authenticity_scores) if smile_authenticity_scores else 50
-    
-    # Calculate blink rate (blinks per minute)
-    video_duration = frame_num / cap.get(cv2.CAP_PROP_FPS) if cap.get(cv2.CAP_PROP_FPS) > 0 else 1
-    blink_rate = (blink_count / video_duration) * 60  # blinks per minute
+    avg_eye_contact = eye_contact_scores.mean_or(50)
+    avg_facial_tension = facial_tension_scores.mean_or(50)
+    avg_head_movement = head_movement_scores.mean_or(50)
+    avg_smile_auth = smile_authenticity_scores.mean_or(50)
+    
+    # Blink rate over the seconds actually sampled (real timestamps when the
+    # media index is available). blink_count grows with every sampled frame,
+    # so this follows the sampling density; the score uses the count per
+    # sample at the calibrated reference density instead, which doesn't
+    sampled_seconds = frames.duration_seconds() or frames_sampled / REFERENCE_FACE_SAMPLES_PER_SECOND
+    blinks_per_minute = blink_count / sampled_seconds * 60
+    blink_rate = blink_count / frames_sampled * REFERENCE_FACE_SAMPLES_PER_SECOND * 60
     blink_score = 100 - min(100, abs(blink_rate - 20) * 2)  # Optimal: 15-25 blinks/min
     
     # Combine confidence indicators
@@ -183,6 +414,8 @@ def analyze_confidence_emotions(video_path):
     )
     
     return {
+        "status": "partial" if partial else "ok",
+        "coverage": coverage,
         "confidence_score": round(confidence_score, 2),
         "breakdown": {
             "eye_contact": round(avg_eye_contact, 2),
@@ -194,20 +427,31 @@ def analyze_confidence_emotions(video_path):
         "metrics": {
             "total_frames_analyzed": frame_count,
             "blink_count": blink_count,
-            "blinks_per_minute": round(blink_rate, 2),
+            "blinks_per_minute": round(blinks_per_minute, 2),
+            "normalized_blink_rate": round(blink_rate, 2),
             "deepface_available": DEEPFACE_AVAILABLE
+        },
+        "statistics": {
+            "eye_contact": eye_contact_scores.to_dict(),
+            "facial_tension": facial_tension_scores.to_dict(),
+            "head_movement": head_movement_scores.to_dict(),
+            "smile_authenticity": smile_authenticity_scores.to_dict()
         }
     }
 
-def analyze_eye_contact(face_roi, eye_cascade):
-    """Analyze eye contact confidence (0-100)"""
+def analyze_eye_contact(face_roi, eye_cascade, scale=1.0):
+    """Analyze eye contact confidence (0-100)
+
+    scale is the factor the frame was resized by; areas are mapped back to
+    native-resolution pixels so the thresholds stay comparable.
+    """
     try:
         eyes = eye_cascade.detectMultiScale(face_roi, 1.1, 3)
         
         if len(eyes) >= 2:
             # Both eyes detected - good eye contact
             eye_areas = [w * h for (x, y, w, h) in eyes]
-            avg_eye_area = np.mean(eye_areas)
+            avg_eye_area = np.mean(eye_areas) / (scale * scale)
             
             # Larger eye areas indicate better eye contact
             if avg_eye_area > 500:
@@ -248,7 +492,7 @@ def analyze_facial_tension(face_roi):
     except Exception:
         return 50  # Default score
 
-def analyze_head_movement(face, prev_face_center):
+def analyze_head_movement(face, prev_face_center, scale=1.0):
     """Analyze head movement stability (0-100, higher = more stable = more confident)"""
     try:
         if prev_face_center is None:
@@ -256,7 +500,7 @@ def analyze_head_movement(face, prev_face_center):
         
         current_center = (face[0] + face[2]//2, face[1] + face[3]//2)
         movement = np.sqrt((current_center[0] - prev_face_center[0])**2 + 
-                          (current_center[1] - prev_face_center[1])**2)
+                          (current_center[1] - prev_face_center[1])**2) / scale
         
         # Less movement = more confident
         if movement < 5:
@@ -280,8 +524,7 @@ def analyze_smile_authenticity(face_roi):
     
     try:
         # Use DeepFace for emotion analysis but focus on smile confidence
-        result = DeepFace.analyze(face_roi, actions=['emotion'], enforce_detection=False)
-        emotions = result[0]['emotion']
+        emotions = deepface_emotions(face_roi)
         
         # Calculate smile confidence based on emotion distribution
         happy_score = emotions.get('happy', 0)
@@ -309,9 +552,21 @@ def detect_blink(face_roi, eye_cascade):
         return False
 
 # Body Language Analysis
-def analyze_body_confidence(video_path):
-    """Analyze body language confidence indicators"""
-    if not MEDIAPIPE_AVAILABLE:
+def analyze_body_confidence(video_path, trace=None, profile=None, deadline=NO_DEADLINE, frames=None):
+    """Analyze body language confidence indicators
+
+    Stops early when deadline expires and scores the frames seen so far
+    (status "partial"). frames may supply an already-open FrameSource.
+    """
+    if trace is None:
+        trace = Trace()
+    if profile is None:
+        profile = get_profile()
+    stage = trace.stage("body")
+    pose_name = POSE_MODEL_NAMES.get(profile.pose_complexity, f"pose_c{profile.pose_complexity}")
+    stage.set_attribute("model", "warm" if model_cache.is_loaded(pose_name) else "cold")
+    
+    if not MEDIAPIPE_AVAILABLE or not profile.run_body:
         return {
             "body_confidence": 50.0,  # Default neutral score
             "breakdown": {
@@ -322,36 +577,46 @@ def analyze_body_confidence(video_path):
             },
             "metrics": {
                 "total_frames_analyzed": 0,
-                "mediapipe_available": False
+                "mediapipe_available": MEDIAPIPE_AVAILABLE,
+                "skipped_by_profile": not profile.run_body
             }
         }
     
-    cap = cv2.VideoCapture(video_path)
-    frame_interval = 20  # Analyze every 20th frame for body language
+    if frames is None:
+        frames = open_frame_source(video_path, profile.body_frame_interval, profile.max_frame_width)
     frame_count = 0
-    frame_num = 0
+    partial = False
     
-    # Body confidence indicators
-    posture_scores = []
-    hand_gesture_scores = []
-    body_openness_scores = []
-    shoulder_alignment_scores = []
+    # Body confidence indicators (streaming aggregates, constant memory per signal)
+    posture_scores = StreamingSeries(value_range=(0, 100))
+    hand_gesture_scores = StreamingSeries(value_range=(0, 100))
+    body_openness_scores = StreamingSeries(value_range=(0, 100))
+    shoulder_alignment_scores = StreamingSeries(value_range=(0, 100))
     
-    # Initialize pose detection
-    pose_model = model_cache.get_pose_model()
-
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Initialize pose detection (one pooled instance per running video)
+    with model_cache.pose_model(profile.pose_complexity) as pose_model:
+        frame_iter = iter(frames)
+        while True:
+            if deadline.expired():
+                partial = True
+                break
+            with trace.span("body.decode"):
+                item = next(frame_iter, None)
+            if item is None:
+                break
+            # Landmarks are normalised, so downscaled frames don't shift the scores
+            frame_index, frame = item
+            t = frames.timestamp(frame_index)
             
-        if frame_num % frame_interval == 0:
+            stage.increment("frames_sampled")
             try:
                 # Convert BGR to RGB for MediaPipe
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                results = pose_model.process(rgb_frame)
+                with trace.span("body.pose"):
+                    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    results = pose_model.process(rgb_frame)
                 
                 if results.pose_landmarks:
+                    stage.increment("frames_with_pose")
                     # Analyze confidence indicators
                     posture = analyze_posture(results.pose_landmarks)
                     hand_gestures = analyze_hand_gestures(results.pose_landmarks)
@@ -359,29 +624,32 @@ def analyze_body_confidence(video_path):
                     shoulder_alignment = analyze_shoulder_alignment(results.pose_landmarks)
                     
                     # Store scores
-                    posture_scores.append(posture)
-                    hand_gesture_scores.append(hand_gestures)
-                    body_openness_scores.append(body_openness)
-                    shoulder_alignment_scores.append(shoulder_alignment)
+                    posture_scores.push(posture, t)
+                    hand_gesture_scores.push(hand_gestures, t)
+                    body_openness_scores.push(body_openness, t)
+                    shoulder_alignment_scores.push(shoulder_alignment, t)
                     
                 frame_count += 1
                     
             except Exception as e:
                 print(f"Body analysis error: {e}")
                 pass
-                
-        frame_num += 1
     
-    cap.release()
+    frames.close()
+    frame_num = frames.frames_read
+    stage.set_attribute("frames_decoded", frame_num)
+    coverage = round(min(1.0, frame_num / frames.total_frames), 3) if frames.total_frames > 0 else None
 
     if frame_count == 0:
+        if partial:
+            return {"status": "timeout", "coverage": coverage}
         return 0
 
     # Calculate average body confidence scores
-    avg_posture = np.mean(posture_scores) if posture_scores else 50
-    avg_hand_gestures = np.mean(hand_gesture_scores) if hand_gesture_scores else 50
-    avg_body_openness = np.mean(body_openness_scores) if body_openness_scores else 50
-    avg_shoulder_alignment = np.mean(shoulder_alignment_scores) if shoulder_alignment_scores else 50
+    avg_posture = posture_scores.mean_or(50)
+    avg_hand_gestures = hand_gesture_scores.mean_or(50)
+    avg_body_openness = body_openness_scores.mean_or(50)
+    avg_shoulder_alignment = shoulder_alignment_scores.mean_or(50)
     
     # Combine body confidence indicators
     body_confidence = (
@@ -392,6 +660,8 @@ def analyze_body_confidence(video_path):
     )
     
     return {
+        "status": "partial" if partial else "ok",
+        "coverage": coverage,
         "body_confidence": round(body_confidence, 2),
         "breakdown": {
             "posture": round(avg_posture, 2),
@@ -401,6 +671,12 @@ def analyze_body_confidence(video_path):
         },
         "metrics": {
             "total_frames_analyzed": frame_count
+        },
+        "statistics": {
+            "posture": posture_scores.to_dict(),
+            "hand_gestures": hand_gesture_scores.to_dict(),
+            "body_openness": body_openness_scores.to_dict(),
+            "shoulder_alignment": shoulder_alignment_scores.to_dict()
         }
     }
 
@@ -538,7 +814,7 @@ def analyze_shoulder_alignment(landmarks):
         return 50  # Default score
 
 # Enhanced Audio Extraction with FFmpeg (better for webm files)
-def extract_audio_from_video(video_path, output_audio="temp.wav"):
+def extract_audio_from_video(video_path, output_audio="temp.wav", timeout=None):
     try:
         # Try FFmpeg first (better for webm files)
         command = [
@@ -550,8 +826,10 @@ def extract_audio_from_video(video_path, output_audio="temp.wav"):
             "-ac", "1",
             output_audio
         ]
-        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout)
         return output_audio
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"Audio extraction timed out after {timeout:.1f}s")
     except (subprocess.CalledProcessError, FileNotFoundError):
         # Fallback to MoviePy if FFmpeg fails
         try:
@@ -562,17 +840,56 @@ def extract_audio_from_video(video_path, output_audio="temp.wav"):
     return output_audio
 
 # Confidence-focused Speech Analysis
-def calculate_speech_confidence(audio_path):
-    # Get transcript using Vosk
-    transcript_data = get_transcript_with_timing(audio_path)
+def calculate_speech_confidence(audio_path, trace=None, profile=None, deadline=NO_DEADLINE):
+    if trace is None:
+        trace = Trace()
+    if profile is None:
+        profile = get_profile()
+    
+    activity = detect_speech_activity(audio_path, trace)
+    transcript_data = transcribe(audio_path, trace, deadline, activity)
+    
+    # Analyze audio features for confidence indicators (skipped once out of
+    # budget; tone and clarity then fall back to their neutral defaults)
+    features_skipped = deadline.expired()
+    audio_features = None if features_skipped else extract_speech_features(audio_path, trace, profile, activity)
+    
+    return score_speech(transcript_data, audio_features, activity,
+                        partial=transcript_data.get("partial", False) or features_skipped)
+
+def detect_speech_activity(audio_path, trace):
+    """Voiced segments of the audio (None when VAD is off or the WAV isn't 16-bit mono)"""
+    if not VAD_ENABLED:
+        return None
+    with trace.span("speech.vad"):
+        activity = detect_voice_activity(audio_path)
+    if activity is not None:
+        trace.stage("speech.vad").set_attribute("voiced_sec", round(activity.voiced_seconds, 2))
+        trace.stage("speech.vad").set_attribute("duration_sec", round(activity.duration, 2))
+    return activity
+
+def transcribe(audio_path, trace, deadline=NO_DEADLINE, activity=None):
+    """Vosk transcript of the voiced audio, recorded as the speech.vosk stage"""
+    vosk_stage = trace.stage("speech.vosk")
+    vosk_stage.set_attribute("model", "warm" if model_cache.is_loaded("vosk") else "cold")
+    with trace.span("speech.vosk"):
+        transcript_data = get_transcript_with_timing(audio_path, deadline, activity)
+    vosk_stage.set_attribute("words", len(transcript_data["words"]))
+    return transcript_data
+
+def extract_speech_features(audio_path, trace, profile, activity=None):
+    """librosa features for tone and clarity, recorded as the speech.librosa stage"""
+    with trace.span("speech.librosa"):
+        return analyze_audio_features(audio_path, full=profile.full_audio_features, activity=activity)
+
+def score_speech(transcript_data, audio_features, activity=None, partial=False):
+    """Combine transcript and audio features into the speech confidence result"""
     transcript = transcript_data["transcript"]
     words = transcript_data["words"]
     
-    # Analyze audio features for confidence indicators
-    audio_features = analyze_audio_features(audio_path)
-    
-    # Calculate confidence indicators
-    hesitation_score = calculate_hesitation_score(transcript, words)
+    # Calculate confidence indicators (disfluencies are scanned once and shared)
+    disfluencies = scan_words(words)
+    hesitation_score = calculate_hesitation_score(transcript, words, disfluencies)
     tone_score = calculate_tone_confidence(audio_features)
     clarity_score = calculate_clarity_score(audio_features)
     pace_score = calculate_pace_confidence(words, transcript_data["duration"])
@@ -586,6 +903,8 @@ def calculate_speech_confidence(audio_path):
     )
     
     return {
+        "status": "partial" if partial else "ok",
+        "coverage": transcript_data.get("coverage"),
         "transcript": transcript or "[No clear speech detected]",
         "words_spoken": len(words),
         "duration_sec": round(transcript_data["duration"], 2),
@@ -597,126 +916,167 @@ def calculate_speech_confidence(audio_path):
             "clarity_score": round(clarity_score, 2),
             "pace_score": round(pace_score, 2)
         },
-        "hesitation_indicators": {
-            "filler_words": count_filler_words(transcript),
-            "pauses": count_long_pauses(words),
-            "repetitions": count_repetitions(words)
-        }
+        "hesitation_indicators": disfluencies.counts,
+        "disfluency_events": disfluencies.to_dict(),
+        "voice_activity": activity.to_dict() if activity is not None else None,
+        "audio_statistics": audio_feature_statistics(audio_features)
     }
 
-def get_transcript_with_timing(audio_path):
-    """Get transcript with word-level timing information"""
+def get_transcript_with_timing(audio_path, deadline=NO_DEADLINE, activity=None):
+    """Get transcript with word-level timing information
+
+    With a VoiceActivity only the voiced segments are fed to Vosk; word
+    timestamps are mapped back to the original audio, so gaps between words
+    still include the skipped silences. Stops feeding audio once deadline
+    expires; the transcript then covers only the audio processed so far
+    (partial=True).
+    """
     model = model_cache.get_vosk_model()
     wf = wave.open(audio_path, "rb")
-    rec = KaldiRecognizer(model, wf.getframerate())
+    rate = wf.getframerate()
+    rec = KaldiRecognizer(model, rate)
     rec.SetWords(True)
 
     full_text = ""
     words = []
-    start_time = time.time()
+    partial = False
+    total_frames = wf.getnframes()
+    # Fall back to the whole file when VAD found nothing (e.g. very quiet audio)
+    segments = activity.segments if activity is not None and activity.segments else [(0, total_frames / rate)]
+    position = 0
 
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
-            result = json.loads(rec.Result())
-            if result.get("result"):
-                for word_info in result["result"]:
-                    words.append(word_info)
-            full_text += " " + result.get("text", "")
-
-    final_result = json.loads(rec.FinalResult())
-    if final_result.get("result"):
-        for word_info in final_result["result"]:
+    def collect(result):
+        for word_info in result.get("result", []):
+            if activity is not None and activity.segments:
+                word_info["start"] = activity.to_original(word_info["start"])
+                word_info["end"] = activity.to_original(word_info["end"])
             words.append(word_info)
-    full_text += " " + final_result.get("text", "")
+        return " " + result.get("text", "")
 
-    duration = time.time() - start_time
+    for start, end in segments:
+        wf.setpos(min(total_frames, int(start * rate)))
+        position = wf.tell()
+        end_frame = min(total_frames, int(end * rate))
+        while position < end_frame:
+            if deadline.expired():
+                partial = True
+                break
+            data = wf.readframes(min(4000, end_frame - position))
+            if len(data) == 0:
+                break
+            position = wf.tell()
+            if rec.AcceptWaveform(data):
+                full_text += collect(json.loads(rec.Result()))
+        if partial:
+            break
+
+    full_text += collect(json.loads(rec.FinalResult()))
+
+    # Audio length, not processing time (pace/WPM depend on it)
+    duration = total_frames / rate if rate else 0
+    coverage = round(position / total_frames, 3) if total_frames > 0 else None
+    if not partial and total_frames > 0:
+        coverage = 1.0
     wf.close()
     
     return {
         "transcript": full_text.strip(),
         "words": words,
-        "duration": duration
+        "duration": duration,
+        "silences": activity.silences() if activity is not None else [],
+        "partial": partial,
+        "coverage": coverage
     }
 
-def analyze_audio_features(audio_path):
-    """Analyze audio features for confidence indicators"""
+AUDIO_FRAME_LENGTH = 2048
+AUDIO_HOP_LENGTH = 512
+AUDIO_BLOCK_FRAMES = 256  # frames per streamed block (~8 s at 16 kHz)
+
+def analyze_audio_features(audio_path, full=True, activity=None):
+    """Analyze audio features for confidence indicators
+
+    The file is streamed in blocks and every feature goes into a
+    StreamingSeries, so memory doesn't grow with the recording length.
+    MFCCs aren't used by any scorer, so they are only extracted when full=True.
+    With a VoiceActivity, pitch is tracked over the voiced segments only.
+    """
     try:
-        # Load audio file
-        y, sr = librosa.load(audio_path, sr=16000)
-        
-        # Extract features
+        sr = librosa.get_samplerate(audio_path)
+        hop_seconds = AUDIO_HOP_LENGTH / sr
         features = {
-            "pitch": librosa.yin(y, fmin=50, fmax=400),  # Fundamental frequency
-            "energy": librosa.feature.rms(y=y)[0],       # Energy/volume
-            "spectral_centroid": librosa.feature.spectral_centroid(y=y, sr=sr)[0],  # Brightness
-            "zero_crossing_rate": librosa.feature.zero_crossing_rate(y)[0],  # Roughness
-            "mfcc": librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)  # Mel-frequency cepstral coefficients
+            "pitch": StreamingSeries(),              # Fundamental frequency
+            "energy": StreamingSeries(),             # Energy/volume
+            "spectral_centroid": StreamingSeries(),  # Brightness
+            "zero_crossing_rate": StreamingSeries(), # Roughness
         }
+        if full:
+            features["mfcc"] = [RunningStats() for _ in range(13)]  # Mel-frequency cepstral coefficients
+        
+        # No fill_value: the last block is just shorter, so zero padding
+        # doesn't leak into the statistics or past the end of the timeline
+        stream = librosa.stream(audio_path, block_length=AUDIO_BLOCK_FRAMES, frame_length=AUDIO_FRAME_LENGTH,
+                                hop_length=AUDIO_HOP_LENGTH, mono=True)
+        block_start = 0.0
+        for y in stream:
+            if len(y) < AUDIO_FRAME_LENGTH:
+                break  # tail shorter than one frame (covered by the previous block's overlap)
+            frame_options = dict(frame_length=AUDIO_FRAME_LENGTH, hop_length=AUDIO_HOP_LENGTH, center=False)
+            features["energy"].push_many(librosa.feature.rms(y=y, **frame_options)[0], block_start, hop_seconds)
+            features["spectral_centroid"].push_many(
+                librosa.feature.spectral_centroid(y=y, sr=sr, n_fft=AUDIO_FRAME_LENGTH,
+                                                  hop_length=AUDIO_HOP_LENGTH, center=False)[0],
+                block_start, hop_seconds)
+            features["zero_crossing_rate"].push_many(
+                librosa.feature.zero_crossing_rate(y=y, **frame_options)[0], block_start, hop_seconds)
+            
+            voiced = voiced_samples(y, sr, activity, offset=block_start) if activity is not None else y
+            if len(voiced) >= AUDIO_FRAME_LENGTH:  # at least one yin frame
+                features["pitch"].push_many(librosa.yin(voiced, fmin=50, fmax=400, sr=sr, center=False))
+            if full:
+                mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13, n_fft=AUDIO_FRAME_LENGTH,
+                                            hop_length=AUDIO_HOP_LENGTH, center=False)
+                for stats, row in zip(features["mfcc"], mfcc):
+                    stats.push_many(row)
+            block_start += AUDIO_BLOCK_FRAMES * hop_seconds
         
         return features
     except Exception as e:
         print(f"Audio analysis error: {e}")
         return None
 
-def calculate_hesitation_score(transcript, words):
+def audio_feature_statistics(audio_features):
+    """Summaries of the streamed audio features for the result"""
+    if not audio_features:
+        return None
+    return {name: series.to_dict() for name, series in audio_features.items() if isinstance(series, StreamingSeries)}
+
+def calculate_hesitation_score(transcript, words, disfluencies=None):
     """Calculate confidence based on hesitation indicators (lower hesitation = higher confidence)"""
     if not transcript:
         return 0
     
     # Count hesitation indicators
-    filler_words = count_filler_words(transcript)
-    pauses = count_long_pauses(words)
-    repetitions = count_repetitions(words)
+    if disfluencies is None:
+        disfluencies = scan_words(words)
+    counts = disfluencies.counts
     
     # Calculate hesitation score (0-100, higher = less hesitation = more confident)
-    hesitation_penalty = (filler_words * 5) + (pauses * 3) + (repetitions * 4)
+    hesitation_penalty = (counts["filler_words"] * 5) + (counts["pauses"] * 3) + (counts["repetitions"] * 4)
     hesitation_score = max(0, 100 - hesitation_penalty)
     
     return min(100, hesitation_score)
 
 def count_filler_words(transcript):
     """Count filler words and hesitation sounds"""
-    filler_patterns = [
-        r'\b(um|uh|er|ah|like|you know|basically|actually|so|well)\b',
-        r'\b(um+|uh+|er+|ah+)\b',  # Repeated hesitations
-        r'\b(i mean|kind of|sort of)\b'
-    ]
-    
-    count = 0
-    for pattern in filler_patterns:
-        matches = re.findall(pattern, transcript.lower())
-        count += len(matches)
-    
-    return count
+    return len(scan_transcript(transcript).fillers)
 
 def count_long_pauses(words):
     """Count long pauses between words (indicating hesitation)"""
-    if len(words) < 2:
-        return 0
-    
-    long_pauses = 0
-    for i in range(1, len(words)):
-        if "end" in words[i-1] and "start" in words[i]:
-            pause_duration = words[i]["start"] - words[i-1]["end"]
-            if pause_duration > 1.0:  # Pause longer than 1 second
-                long_pauses += 1
-    
-    return long_pauses
+    return len(scan_words(words).pauses)
 
 def count_repetitions(words):
     """Count word repetitions (indicating uncertainty)"""
-    if len(words) < 3:
-        return 0
-    
-    repetitions = 0
-    for i in range(2, len(words)):
-        if (words[i]["word"].lower() == words[i-1]["word"].lower() == words[i-2]["word"].lower()):
-            repetitions += 1
-    
-    return repetitions
+    return len(scan_words(words).repetitions)
 
 def calculate_tone_confidence(audio_features):
     """Calculate confidence based on voice tone stability"""
@@ -727,16 +1087,13 @@ def calculate_tone_confidence(audio_features):
         pitch = audio_features["pitch"]
         energy = audio_features["energy"]
         
-        # Remove NaN values
-        pitch = pitch[~np.isnan(pitch)]
-        energy = energy[~np.isnan(energy)]
-        
-        if len(pitch) == 0 or len(energy) == 0:
+        # NaN values are dropped by the aggregators
+        if pitch.count == 0 or energy.count == 0:
             return 50
         
         # Calculate stability metrics
-        pitch_stability = 100 - (np.std(pitch) / np.mean(pitch) * 100) if np.mean(pitch) > 0 else 50
-        energy_stability = 100 - (np.std(energy) / np.mean(energy) * 100) if np.mean(energy) > 0 else 50
+        pitch_stability = 100 - (pitch.std / pitch.mean * 100) if pitch.mean > 0 else 50
+        energy_stability = 100 - (energy.std / energy.mean * 100) if energy.mean > 0 else 50
         
         # Confident voices have stable pitch and energy
         tone_score = (pitch_stability + energy_stability) / 2
@@ -754,17 +1111,14 @@ def calculate_clarity_score(audio_features):
         spectral_centroid = audio_features["spectral_centroid"]
         zero_crossing_rate = audio_features["zero_crossing_rate"]
         
-        # Remove NaN values
-        spectral_centroid = spectral_centroid[~np.isnan(spectral_centroid)]
-        zero_crossing_rate = zero_crossing_rate[~np.isnan(zero_crossing_rate)]
-        
-        if len(spectral_centroid) == 0 or len(zero_crossing_rate) == 0:
+        # NaN values are dropped by the aggregators
+        if spectral_centroid.count == 0 or zero_crossing_rate.count == 0:
             return 50
         
         # Clear speech has higher spectral centroid and moderate zero crossing rate
         clarity_score = (
-            (np.mean(spectral_centroid) / 1000) * 50 +  # Normalize spectral centroid
-            (1 - np.mean(zero_crossing_rate)) * 50       # Lower ZCR = clearer speech
+            (spectral_centroid.mean / 1000) * 50 +  # Normalize spectral centroid
+            (1 - zero_crossing_rate.mean) * 50       # Lower ZCR = clearer speech
         )
         
         return max(0, min(100, clarity_score))
@@ -789,75 +1143,231 @@ def calculate_pace_confidence(words, duration):
     else:
         return max(0, 100 - abs(wpm - 140) * 2)  # Penalty for very fast/slow
 
-# Enhanced Final Score with detailed breakdown and parallel processing
-def final_confidence_score(video_path):
+# Analysis DAG: each analyzer declares its inputs and runs as soon as they
+# are ready, on the pool for its resource type. Initial values provided by
+# final_confidence_score: video (seekable path), frames.facial, frames.body
+# (FrameSource or None), audio_target (WAV path to write) and shared_decode,
+# plus audio itself when the caller already has the 16 kHz mono WAV.
+ANALYZERS = AnalyzerRegistry()
+
+@ANALYZERS.analyzer("audio", inputs=("video", "audio_target", "shared_decode"), pool="io",
+                    component="speech", span="extraction")
+def _audio_node(ctx, video_path, audio_target, shared):
+    if shared is not None:
+        return shared.wait_audio(ctx.deadline.remaining())
+    return extract_audio_from_video(video_path, audio_target, timeout=ctx.deadline.remaining())
+
+@ANALYZERS.analyzer("voice_activity", inputs=("audio",), component="speech")
+def _voice_activity_node(ctx, audio_path):
+    return detect_speech_activity(audio_path, ctx.trace)
+
+@ANALYZERS.analyzer("transcript", inputs=("audio",), optional_inputs=("voice_activity",), pool="asr",
+                    component="speech")
+def _transcript_node(ctx, audio_path, activity):
+    return transcribe(audio_path, ctx.trace, ctx.deadline, activity)
+
+@ANALYZERS.analyzer("audio_features", inputs=("audio",), optional_inputs=("voice_activity",),
+                    component="speech")
+def _audio_features_node(ctx, audio_path, activity):
+    if ctx.deadline.expired():
+        raise TimeoutError("speech budget spent before audio features")
+    return extract_speech_features(audio_path, ctx.trace, ctx.profile, activity)
+
+@ANALYZERS.analyzer("speech", inputs=("transcript",), optional_inputs=("audio_features", "voice_activity"))
+def _speech_node(ctx, transcript_data, audio_features, activity):
+    partial = transcript_data.get("partial", False) or ctx.status("audio_features") != "ok"
+    return score_speech(transcript_data, audio_features, activity, partial=partial)
+
+@ANALYZERS.analyzer("facial", inputs=("video", "frames.facial"))
+def _facial_node(ctx, video_path, frames):
+    return analyze_confidence_emotions(video_path, trace=ctx.trace, profile=ctx.profile,
+                                       deadline=ctx.deadline, frames=frames)
+
+@ANALYZERS.analyzer("body", inputs=("video", "frames.body"))
+def _body_node(ctx, video_path, frames):
+    return analyze_body_confidence(video_path, trace=ctx.trace, profile=ctx.profile,
+                                   deadline=ctx.deadline, frames=frames)
+
+def _component_score(name, data):
+    """Pull the headline score out of an analyzer's result (None if it produced none)"""
+    if not isinstance(data, dict):
+        return data  # analyzers return a bare 0 when no frames could be analysed
+    key = {"facial": "confidence_score", "speech": "speech_confidence", "body": "body_confidence"}[name]
+    return data.get(key)
+
+def final_confidence_score(video_path, trace=None, profile=None, audio_path=None, cancelled=None):
+    """Analyze a recording. audio_path is an already extracted 16 kHz mono WAV
+    of it (e.g. from a resumable upload or a client-reduced upload); audio
+    extraction is then skipped. video_path may also be a directory of
+    client-extracted frames named <milliseconds>.jpg/.png, which needs
+    audio_path for speech analysis. Setting the cancelled event stops the
+    analyzers as if the deadline had passed."""
+    start_time = time.time()
+    if trace is None:
+        trace = Trace()
+    media = shared = audio_target = None
     try:
-        start_time = time.time()
+        if profile is None or isinstance(profile, str):
+            profile = get_profile(profile)
+        # Only the models this profile uses count towards models_cached
+        needed = model_cache.model_status([profile.pose_complexity] if profile.run_body else [])
+        models_warm_at_start = all(status["loaded"] for status in needed.values())
+        deadline = Deadline(ANALYSIS_DEADLINE_SECONDS, cancelled)
+        component_status = {}
+        results = {}
         
-        # Extract audio first (needed for speech analysis)
-        audio_path = extract_audio_from_video(video_path)
+        # Remux unseekable browser recordings and load the frame timestamp index
+        frame_paths = None
+        with trace.span("ingest"):
+            if os.path.isdir(video_path):
+                frame_paths, index = load_frame_sequence(video_path)
+                media = PreparedMedia(video_path, video_path, index)
+            else:
+                media = prepare_media(video_path, timeout=deadline.remaining())
+        trace.stage("ingest").set_attribute("remuxed", media.path != video_path)
+        trace.stage("ingest").set_attribute("input", "frames" if frame_paths is not None else "video")
         
-        # Run facial, speech, and body analysis in parallel for better performance
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            # Submit all analysis tasks
-            facial_future = executor.submit(analyze_confidence_emotions, video_path)
-            speech_future = executor.submit(calculate_speech_confidence, audio_path)
-            body_future = executor.submit(analyze_body_confidence, video_path)
-            
-            # Collect results
-            facial_data = facial_future.result()
-            speech_data = speech_future.result()
-            body_data = body_future.result()
-        
-        # Extract confidence scores
-        facial_confidence = facial_data.get('confidence_score', 0) if isinstance(facial_data, dict) else facial_data
-        speech_confidence = speech_data.get('speech_confidence', 0)
-        body_confidence = body_data.get('body_confidence', 0) if isinstance(body_data, dict) else body_data
-        
-        # Get video duration from speech analysis
-        video_duration = speech_data.get('duration_sec', 0)
-
-        # Calculate final confidence score with comprehensive weighting
-        final_score = round(
-            (facial_confidence * 0.4) + 
-            (speech_confidence * 0.4) + 
-            (body_confidence * 0.2), 2
-        )
+        # Audio for speech analysis goes to a unique temp file so concurrent
+        # analyses don't overwrite each other's audio
+        fd, audio_target = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+        
+        # With the ffmpeg-shared backend one ffmpeg process decodes the sampled
+        # frames for every analyzer and writes the audio in the same demux
+        # (low-frame-rate client uploads keep the profile's sampling rate in time)
+        source_fps = media.index.fps if media.index is not None else None
+        intervals = {"facial": frame_interval(profile.face_frame_interval, source_fps)}
+        if MEDIAPIPE_AVAILABLE and profile.run_body:
+            intervals["body"] = frame_interval(profile.body_frame_interval, source_fps)
+        if DECODE_BACKEND == "ffmpeg-shared" and frame_paths is None:
+            try:
+                shared = SharedDecode(media.path, intervals, audio_target if audio_path is None else None,
+                                      profile.max_frame_width, index=media.index)
+            except (FileNotFoundError, subprocess.CalledProcessError, RuntimeError) as e:
+                print(f"Shared decode unavailable ({e}); extracting audio separately")
+        
+        if frame_paths is not None:
+            frames = {name: ImageSequenceFrameSource(frame_paths, interval, profile.max_frame_width, index=media.index)
+                      for name, interval in intervals.items()}
+        elif shared is not None:
+            frames = {name: shared.consumer(name) for name in intervals}
+        else:
+            frames = {name: open_frame_source(media.path, interval, profile.max_frame_width, index=media.index)
+                      for name, interval in intervals.items()}
+        
+        # Run the analyzer DAG: audio extraction overlaps frame analysis, and
+        # Vosk and librosa run side by side once the audio is ready
+        values = {
+            "video": media.path,
+            "frames.facial": frames.get("facial"),
+            "frames.body": frames.get("body"),
+            "audio_target": audio_target,
+            "shared_decode": shared,
+        }
+        if audio_path is not None:
+            values["audio"] = audio_path
+        scheduler = DagScheduler(grace_seconds=ANALYSIS_GRACE_SECONDS)
+        outputs, analyzer_status = scheduler.run(ANALYZERS, values, trace, profile, deadline, COMPONENT_BUDGETS)
+        for name in COMPONENT_WEIGHTS:
+            if name in analyzer_status:
+                component_status[name] = analyzer_status[name]
+            if name in outputs and component_status[name]["status"] in ("ok", "partial"):
+                results[name] = outputs[name]
+        # Outputs of plugged-in analyzers that aren't part of the weighted score
+        additional = {a.name: outputs[a.name] for a in map(ANALYZERS.get, outputs)
+                      if a.component == a.name and a.name not in COMPONENT_WEIGHTS}
+        
+        facial_data = results.get("facial", {})
+        speech_data = results.get("speech", {})
+        body_data = results.get("body", {})
+        
+        # Extract confidence scores (None for components that produced nothing)
+        scores = {name: _component_score(name, results[name]) for name in results}
+        scores = {name: score for name, score in scores.items()
+                  if score is not None and component_status[name]["status"] in ("ok", "partial")}
+        if not scores:
+            return {"error": "No analysis component finished within its time budget",
+                    "component_status": component_status}
+        facial_confidence = scores.get("facial")
+        speech_confidence = scores.get("speech")
+        body_confidence = scores.get("body")
+        
+        # Video duration from the frame index (exact even for webm without a
+        # Duration element), else from speech analysis
+        if media.index is not None:
+            video_duration = media.index.duration
+        else:
+            video_duration = speech_data.get('duration_sec', 0) if isinstance(speech_data, dict) else 0
 
-        # Clean up temporary audio file
-        if os.path.exists(audio_path):
-            os.remove(audio_path)
+        # Calculate final confidence score, re-normalising the weights over
+        # the components that produced a score
+        total_weight = sum(COMPONENT_WEIGHTS[name] for name in scores)
+        weights = {name: (COMPONENT_WEIGHTS[name] / total_weight if name in scores else 0)
+                   for name in COMPONENT_WEIGHTS}
+        final_score = round(sum(scores[name] * weights[name] for name in scores), 2)
 
         processing_time = round(time.time() - start_time, 2)
 
         return {
             "score": final_score,
+            "analysis_profile": profile.name,
+            "partial": any(status["status"] != "ok" for status in component_status.values()),
+            "component_status": component_status,
             "facial_confidence": facial_confidence,
             "speech_confidence": speech_confidence,
             "body_confidence": body_confidence,
             "video_duration": round(video_duration, 2),
             "facial_breakdown": facial_data.get('breakdown', {}) if isinstance(facial_data, dict) else {},
-            "speech_breakdown": speech_data.get('confidence_breakdown', {}),
+            "speech_breakdown": speech_data.get('confidence_breakdown', {}) if isinstance(speech_data, dict) else {},
             "body_breakdown": body_data.get('breakdown', {}) if isinstance(body_data, dict) else {},
             "facial_metrics": facial_data.get('metrics', {}) if isinstance(facial_data, dict) else {},
-            "speech_metrics": speech_data.get('hesitation_indicators', {}),
+            "speech_metrics": speech_data.get('hesitation_indicators', {}) if isinstance(speech_data, dict) else {},
             "body_metrics": body_data.get('metrics', {}) if isinstance(body_data, dict) else {},
+            "statistics": {
+                "facial": facial_data.get('statistics') if isinstance(facial_data, dict) else None,
+                "body": body_data.get('statistics') if isinstance(body_data, dict) else None,
+                "audio": speech_data.get('audio_statistics') if isinstance(speech_data, dict) else None
+            },
+            "additional_analysis": additional,
             "overall_breakdown": {
-                "facial_weight": 0.4,
-                "speech_weight": 0.4,
-                "body_weight": 0.2,
-                "facial_contribution": round(facial_confidence * 0.4, 2),
-                "speech_contribution": round(speech_confidence * 0.4, 2),
-                "body_contribution": round(body_confidence * 0.2, 2)
+                "facial_weight": round(weights["facial"], 4),
+                "speech_weight": round(weights["speech"], 4),
+                "body_weight": round(weights["body"], 4),
+                "facial_contribution": round((facial_confidence or 0) * weights["facial"], 2),
+                "speech_contribution": round((speech_confidence or 0) * weights["speech"], 2),
+                "body_contribution": round((body_confidence or 0) * weights["body"], 2)
             },
             "performance": {
                 "processing_time_seconds": processing_time,
                 "parallel_processing": True,
-                "models_cached": True
+                "models_cached": models_warm_at_start,
+                "profile": profile.to_dict(),
+                "decode_backend": "ffmpeg-shared" if shared is not None else DECODE_BACKEND,
+                "audio_preextracted": audio_path is not None,
+                "frame_intervals": intervals,
+                "media_index": media.index.summary() if media.index is not None else None,
+                "deadline_seconds": ANALYSIS_DEADLINE_SECONDS,
+                "analyzers": analyzer_status,
+                "trace_id": trace.trace_id,
+                "stages": trace.to_dict()
             }
         }
     except Exception as e:
         return {"error": str(e)}
+    finally:
+        # Runs on every exit so a failed analysis doesn't leak ffmpeg
+        # processes or temp files
+        if shared is not None:
+            shared.close()
+        # A timed-out speech analyzer may still hold the audio file
+        try:
+            if audio_target is not None and os.path.exists(audio_target):
+                os.remove(audio_target)
+        except OSError:
+            pass
+        if media is not None:
+            media.close()
+        trace.finish()
 
 # Run
 if __name__ == "__main__":
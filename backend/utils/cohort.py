@@ -0,0 +1,224 @@
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Cohort percentiles without scanning sessions.json: every stored session
+# adds its score and breakdown metrics to fixed-bin histograms, per topic
+# and across all topics ("better than X% of sessions"). Candidates are
+# ranked separately, on histograms of each user's average and best session
+# score ("better than X% of candidates"). All scores are on a 0-100 scale,
+# so a percentile lookup reads two entries of a cumulative count array,
+# independent of how many sessions exist.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COHORT_FILE = os.getenv("COHORT_FILE", os.path.join(PROJECT_ROOT, "data", "cohort_histograms.json"))
+COHORT_BIN_WIDTH = 0.5
+# Percentiles of smaller cohorts are withheld; they would mostly be noise
+COHORT_MIN_SIZE = int(os.getenv("COHORT_MIN_SIZE", "20"))
+ALL_TOPICS = "all"
+SCORE_MAX = 100.0
+COMPONENT_METRICS = ("facial_confidence", "speech_confidence", "body_confidence")
+BREAKDOWNS = ("facial_breakdown", "speech_breakdown", "body_breakdown")
+# Per-candidate metrics: a user's mean and best session score
+CANDIDATE_METRICS = ("avg_score", "highest_score")
+
+
+class ScoreHistogram:
+    """Counts of 0-100 scores in COHORT_BIN_WIDTH bins"""
+
+    def __init__(self, counts: Optional[List[int]] = None, bin_width: float = COHORT_BIN_WIDTH):
+        self.bin_width = bin_width
+        self.counts = counts or [0] * (int(SCORE_MAX / bin_width) + 1)
+        self.total = sum(self.counts)
+        self._cumulative = None
+
+    def _bin(self, value: float) -> int:
+        return int(min(max(value, 0.0), SCORE_MAX) / self.bin_width)
+
+    def add(self, value: float):
+        self.counts[self._bin(value)] += 1
+        self.total += 1
+        self._cumulative = None
+
+    def remove(self, value: float):
+        self.counts[self._bin(value)] -= 1
+        self.total -= 1
+        self._cumulative = None
+
+    def percentile(self, value: float, exclude: int = 0) -> Optional[float]:
+        """Percent of the cohort scoring below value (ties in its bin count half).
+
+        exclude leaves out that many entries equal to value, e.g. the
+        asker's own when ranking them against everyone else.
+        """
+        if self.total - exclude <= 0:
+            return None
+        if self._cumulative is None:
+            running = 0
+            self._cumulative = []
+            for count in self.counts:
+                self._cumulative.append(running)  # scores in lower bins
+                running += count
+        index = self._bin(value)
+        below = self._cumulative[index] + (self.counts[index] - exclude) / 2
+        return round(below / (self.total - exclude) * 100, 1)
+
+
+def session_metrics(session: Dict) -> Dict[str, float]:
+    """The scores of a stored session that get a cohort: score, components and breakdown metrics"""
+    values = {"score": session.get("score")}
+    detailed = session.get("detailed_metrics") or {}
+    for name in COMPONENT_METRICS:
+        values[name] = detailed.get(name)
+    for breakdown in BREAKDOWNS:
+        for name, value in (detailed.get(breakdown) or {}).items():
+            values[name] = value  # breakdown keys (eye_contact, pace_score, posture, ...) are unique
+    return {name: float(value) for name, value in values.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)}
+
+
+class CohortIndex:
+    """Histograms per topic and metric, persisted to COHORT_FILE.
+
+    Built once from all sessions when the file doesn't exist, then updated
+    incrementally as sessions are added. Another process's updates are
+    picked up by reloading when the file changes. Per-user score sums are
+    kept alongside, so a user's new session moves their entry in the
+    candidate histograms instead of adding one.
+    """
+
+    def __init__(self, load_all_sessions: Callable[[], Iterable[Dict]], path: str = COHORT_FILE):
+        self.path = path
+        self._load_all_sessions = load_all_sessions
+        self._cohorts: Dict[str, Dict[str, ScoreHistogram]] = {}
+        # user_id -> {"count", "sum", "best"} of their session scores
+        self._users: Dict[str, Dict[str, float]] = {}
+        self._candidates: Dict[str, ScoreHistogram] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _add(self, session: Dict):
+        metrics = session_metrics(session)
+        for topic in (ALL_TOPICS, session.get("topic")):
+            if not topic:
+                continue
+            cohort = self._cohorts.setdefault(topic, {})
+            for metric, value in metrics.items():
+                cohort.setdefault(metric, ScoreHistogram()).add(value)
+        if session.get("user_id") and "score" in metrics:
+            self._add_candidate_score(session["user_id"], metrics["score"])
+
+    def _add_candidate_score(self, user_id: str, score: float):
+        user = self._users.get(user_id)
+        histograms = {metric: self._candidates.setdefault(metric, ScoreHistogram()) for metric in CANDIDATE_METRICS}
+        if user is None:
+            user = self._users[user_id] = {"count": 0, "sum": 0.0, "best": 0.0}
+        else:
+            for metric, histogram in histograms.items():
+                histogram.remove(self._candidate_value(user, metric))
+        user["count"] += 1
+        user["sum"] += score
+        user["best"] = max(user["best"], score)
+        for metric, histogram in histograms.items():
+            histogram.add(self._candidate_value(user, metric))
+
+    @staticmethod
+    def _candidate_value(user: Dict[str, float], metric: str) -> float:
+        return user["sum"] / user["count"] if metric == "avg_score" else user["best"]
+
+    def _build(self):
+        self._cohorts, self._users, self._candidates = {}, {}, {}
+        for session in self._load_all_sessions():
+            self._add(session)
+        self._save()
+
+    def _refresh(self) -> bool:
+        """Load the histograms if the file changed since we last read it; True if they had to be built"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            self._build()
+            return True
+        if mtime == self._mtime:
+            return False
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return False  # keep what we have
+        if "users" not in data:
+            self._build()  # written before candidates were tracked
+            return True
+        bin_width = data.get("bin_width", COHORT_BIN_WIDTH)
+        self._cohorts = {
+            topic: {metric: ScoreHistogram(counts, bin_width) for metric, counts in metrics.items()}
+            for topic, metrics in data.get("cohorts", {}).items()
+        }
+        self._users = data["users"]
+        self._candidates = {metric: ScoreHistogram(counts, bin_width)
+                            for metric, counts in data.get("candidates", {}).items()}
+        self._mtime = mtime
+        return False
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "bin_width": COHORT_BIN_WIDTH,
+                "cohorts": {topic: {metric: histogram.counts for metric, histogram in metrics.items()}
+                            for topic, metrics in self._cohorts.items()},
+                "candidates": {metric: histogram.counts for metric, histogram in self._candidates.items()},
+                "users": self._users,
+            }, f)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.stat(self.path).st_mtime_ns
+
+    def add_sessions(self, sessions: Iterable[Dict]):
+        """Count newly stored sessions (call after they are saved)"""
+        with self._lock:
+            if self._refresh():
+                return  # the first build already read them from the store
+            for session in sessions:
+                self._add(session)
+            self._save()
+
+    def rebuild(self):
+        """Recount every cohort from all stored sessions"""
+        with self._lock:
+            self._build()
+
+    def percentile(self, value: float, metric: str = "score", topic: Optional[str] = None) -> Dict:
+        """{"percentile", "cohort_size", ...}; percentile is None below COHORT_MIN_SIZE"""
+        with self._lock:
+            self._refresh()
+            histogram = self._cohorts.get(topic or ALL_TOPICS, {}).get(metric)
+            size = histogram.total if histogram is not None else 0
+            percentile = histogram.percentile(value) if size >= COHORT_MIN_SIZE else None
+        return {"metric": metric, "topic": topic or ALL_TOPICS, "value": value,
+                "percentile": percentile, "cohort_size": size}
+
+    def candidate_percentile(self, user_id: str, metric: str = "avg_score") -> Dict:
+        """Percent of the other candidates whose average (avg_score) or best (highest_score) score is lower.
+
+        percentile is None below COHORT_MIN_SIZE other candidates, and for
+        users without stored sessions.
+        """
+        with self._lock:
+            self._refresh()
+            user = self._users.get(user_id)
+            histogram = self._candidates.get(metric)
+            size = histogram.total - 1 if histogram is not None and user is not None else 0
+            value = self._candidate_value(user, metric) if size > 0 else None
+            percentile = histogram.percentile(value, exclude=1) if size >= COHORT_MIN_SIZE else None
+        return {"metric": metric, "value": value, "percentile": percentile, "cohort_size": size}
+
+    def metrics(self, topic: Optional[str] = None) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._cohorts.get(topic or ALL_TOPICS, {}))
+
+    def topics(self) -> List[str]:
+        with self._lock:
+            self._refresh()
+            return sorted(self._cohorts)
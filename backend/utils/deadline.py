@@ -0,0 +1,44 @@
+import threading
+import time
+from typing import Optional
+
+
+class Deadline:
+    """Monotonic time budget shared between a scheduler and the analyzer it runs.
+
+    Analyzers poll expired() in their frame/audio loops and stop early with a
+    partial result; the scheduler uses remaining() to bound how long it waits.
+    A Deadline with seconds=None never expires. Setting cancelled ends it
+    (and its children) at once, e.g. when a worker loses its job's lease.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, cancelled: Optional[threading.Event] = None):
+        self.seconds = seconds
+        self.cancelled = cancelled
+        self.started = time.monotonic()
+        self.expires_at = None if seconds is None else self.started + seconds
+
+    def remaining(self) -> Optional[float]:
+        if self.cancelled is not None and self.cancelled.is_set():
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        if self.cancelled is not None and self.cancelled.is_set():
+            return True
+        return self.expires_at is not None and time.monotonic() >= self.expires_at
+
+    def child(self, seconds: Optional[float]) -> "Deadline":
+        """A deadline that ends after seconds or when this one does, whichever is first"""
+        remaining = self.remaining()
+        if seconds is None:
+            return Deadline(remaining, self.cancelled)
+        if remaining is None:
+            return Deadline(seconds, self.cancelled)
+        return Deadline(min(seconds, remaining), self.cancelled)
+
+
+# Shared never-expiring instance for callers that don't pass a deadline
+NO_DEADLINE = Deadline(None)
@@ -0,0 +1,505 @@
+import os
+import json
+import subprocess
+import tempfile
+import threading
+from collections import deque
+from math import gcd
+from typing import Dict, Iterator, List, Optional, Tuple
+import cv2
+import numpy as np
+
+# Video decode backends:
+#   opencv        - cv2.VideoCapture per analyzer (default)
+#   ffmpeg        - ffmpeg subprocess per analyzer, sampling/scaling done by ffmpeg filters
+#   ffmpeg-shared - one ffmpeg process per video emitting the sampled frames for every
+#                   analyzer and the 16 kHz mono audio from a single demux
+DECODE_BACKEND = os.getenv("VIDEO_DECODE_BACKEND", "opencv").lower()
+DECODE_THREADS = int(os.getenv("VIDEO_DECODE_THREADS", "0"))  # 0 = library default
+DECODE_HWACCEL = os.getenv("VIDEO_DECODE_HWACCEL", "false").lower() in ("1", "true", "yes")
+# Frames buffered in memory per consumer in ffmpeg-shared mode; frames for a
+# consumer further behind go to a temp file in VIDEO_DECODE_SPILL_DIR, so the
+# decode (and with it the audio) never waits for the slowest analyzer
+DECODE_QUEUE_FRAMES = int(os.getenv("VIDEO_DECODE_QUEUE_FRAMES", "256"))
+DECODE_SPILL_DIR = os.getenv("VIDEO_DECODE_SPILL_DIR") or None  # None = system temp dir
+# With a frame index, the OpenCV backend seeks to the last keyframe before the
+# next sampled frame when that skips at least DECODE_SEEK_MIN_FRAMES frames
+DECODE_SEEK = os.getenv("VIDEO_DECODE_SEEK", "true").lower() in ("1", "true", "yes")
+# OpenCV re-decodes up to 16 frames before a seek target, so shorter skips cost more than they save
+DECODE_SEEK_MIN_FRAMES = 24
+
+BACKENDS = ("opencv", "ffmpeg", "ffmpeg-shared")
+
+
+def downscale_frame(frame, max_width):
+    """Resize frame to at most max_width pixels wide; returns (frame, scale)"""
+    if not max_width or frame.shape[1] <= max_width:
+        return frame, 1.0
+    scale = max_width / frame.shape[1]
+    resized = cv2.resize(frame, (max_width, int(round(frame.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    return resized, scale
+
+
+def scaled_size(width: int, height: int, max_width: Optional[int]) -> Tuple[int, int, float]:
+    """Output size for ffmpeg's scale filter (even dimensions) and the scale factor"""
+    if not max_width or width <= max_width:
+        return width, height, 1.0
+    scale = max_width / width
+    out_w = max_width - (max_width % 2)
+    out_h = int(round(height * scale / 2)) * 2
+    return out_w, out_h, out_w / width
+
+
+def _parse_rate(rate: str) -> float:
+    try:
+        num, _, den = rate.partition("/")
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def probe_video(video_path: str) -> Dict:
+    """Stream facts from ffprobe (width, height, fps, duration, frames, has_audio)"""
+    command = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "stream=codec_type,width,height,avg_frame_rate,r_frame_rate,nb_frames:format=duration",
+        "-of", "json", video_path
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    data = json.loads(output or "{}")
+    streams = data.get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"), None)
+    if video is None:
+        raise RuntimeError("No video stream found")
+    fps = _parse_rate(video.get("avg_frame_rate", "0/0")) or _parse_rate(video.get("r_frame_rate", "0/0"))
+    try:
+        duration = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    try:
+        frames = int(video.get("nb_frames"))
+    except (TypeError, ValueError):
+        frames = 0
+    return {
+        "width": int(video["width"]),
+        "height": int(video["height"]),
+        "fps": fps,
+        "duration": duration,
+        "frames": frames,
+        "has_audio": any(s.get("codec_type") == "audio" for s in streams),
+    }
+
+
+def _union_indices(intervals: List[int]) -> Iterator[int]:
+    """Increasing frame indices that are a multiple of any interval"""
+    step = 1
+    for interval in intervals:
+        step = step * interval // gcd(step, interval)
+    offsets = sorted({n for interval in intervals for n in range(0, step, interval)})
+    base = 0
+    while True:
+        for offset in offsets:
+            yield base + offset
+        base += step
+
+
+class FrameSource:
+    """Iterates (frame_index, BGR frame) for every interval-th frame of a video.
+
+    frames_read is the number of source frames consumed so far (decoded or
+    skipped), scale the factor frames were resized by, fps 0 when unknown.
+    With a MediaIndex (utils.media_index) fps, frame count and durations come
+    from the real frame timestamps instead of container metadata.
+    """
+
+    interval = 1
+    fps = 0.0
+    total_frames = 0
+    scale = 1.0
+    index = None
+
+    def __init__(self):
+        self.frames_read = 0
+
+    def __iter__(self) -> Iterator[Tuple[int, np.ndarray]]:
+        raise NotImplementedError
+
+    def _use_index(self, index):
+        if index is not None and index.frame_count:
+            self.index = index
+            self.fps = index.fps
+            self.total_frames = index.frame_count
+
+    def duration_seconds(self) -> Optional[float]:
+        """Duration of the part of the video read so far"""
+        if self.index is not None:
+            return self.index.timestamp(self.frames_read)
+        return self.frames_read / self.fps if self.fps > 0 else None
+
+    def timestamp(self, frame_index: int) -> Optional[float]:
+        """Seconds from the start of the video to frame_index (None if fps is unknown)"""
+        if self.index is not None:
+            return self.index.timestamp(frame_index)
+        return frame_index / self.fps if self.fps > 0 else None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class OpenCVFrameSource(FrameSource):
+    """cv2.VideoCapture, optionally with a decoder thread count and hardware acceleration.
+
+    With a MediaIndex, frames between samples that lie before a keyframe are
+    skipped by seeking to that keyframe instead of being decoded (seek).
+    """
+
+    def __init__(self, video_path: str, interval: int = 1, max_width: Optional[int] = None,
+                 threads: int = DECODE_THREADS, hwaccel: bool = DECODE_HWACCEL, index=None,
+                 seek: bool = DECODE_SEEK):
+        super().__init__()
+        self.interval = interval
+        self.max_width = max_width
+        self.seek = seek
+        self.seeks = 0
+        params = []
+        if threads and hasattr(cv2, "CAP_PROP_N_THREADS"):
+            params += [cv2.CAP_PROP_N_THREADS, threads]
+        if hwaccel and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        self.cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, params) if params else cv2.VideoCapture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 0.0
+        self.total_frames = max(0, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self._use_index(index)
+
+    def _skip_to_keyframe(self):
+        """Seek to the last keyframe before the next sampled frame if that skips enough frames"""
+        position = self.frames_read
+        if not self.seek or self.index is None or position % self.interval == 0:
+            return
+        keyframe = self.index.keyframe_before(position + self.interval - position % self.interval)
+        if keyframe - position < DECODE_SEEK_MIN_FRAMES:
+            return
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+        landed = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        if landed != keyframe:
+            # The container doesn't seek frame-accurately; decode sequentially from here
+            self.seek = False
+        self.frames_read = landed
+        self.seeks += 1
+
+    def __iter__(self):
+        while self.cap.isOpened():
+            self._skip_to_keyframe()
+            # grab() skips converting frames we don't sample
+            if not self.cap.grab():
+                break
+            index = self.frames_read
+            self.frames_read += 1
+            if index % self.interval:
+                continue
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                break
+            frame, self.scale = downscale_frame(frame, self.max_width)
+            yield index, frame
+
+    def close(self):
+        self.cap.release()
+
+
+class ImageSequenceFrameSource(FrameSource):
+    """Frames that were extracted on the client, one image file per frame.
+
+    The MediaIndex built from the file names supplies timestamps and fps.
+    """
+
+    def __init__(self, paths: List[str], interval: int = 1, max_width: Optional[int] = None, index=None):
+        super().__init__()
+        self.paths = paths
+        self.interval = interval
+        self.max_width = max_width
+        self.total_frames = len(paths)
+        self._use_index(index)
+
+    def __iter__(self):
+        for index, path in enumerate(self.paths):
+            self.frames_read = index + 1
+            if index % self.interval:
+                continue
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            frame, self.scale = downscale_frame(frame, self.max_width)
+            yield index, frame
+
+
+class FFmpegFrameSource(FrameSource):
+    """Raw BGR frames piped from an ffmpeg subprocess.
+
+    ffmpeg does the frame selection and scaling, with its own decoder threads.
+    With audio_path set, the same process also writes 16 kHz mono PCM audio,
+    so the file is demuxed only once. intervals selects the union of several
+    sampling rates (used by SharedDecode).
+    """
+
+    def __init__(self, video_path: str, interval: int = 1, max_width: Optional[int] = None,
+                 threads: int = DECODE_THREADS, hwaccel: bool = DECODE_HWACCEL,
+                 audio_path: Optional[str] = None, intervals: Optional[List[int]] = None, index=None):
+        super().__init__()
+        self.interval = interval
+        self.intervals = intervals or [interval]
+        info = probe_video(video_path)
+        self.fps = info["fps"]
+        self.total_frames = info["frames"] or (int(info["duration"] * self.fps) if info["duration"] and self.fps else 0)
+        self.probe_duration = info["duration"]
+        self._use_index(index)
+        self.width, self.height, self.scale = scaled_size(info["width"], info["height"], max_width)
+        self.exhausted = False
+
+        filters = []
+        if self.intervals != [1]:
+            condition = "+".join(f"not(mod(n\\,{i}))" for i in self.intervals)
+            filters.append(f"select='{condition}'")
+        if self.scale != 1.0:
+            filters.append(f"scale={self.width}:{self.height}")
+
+        command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y"]
+        if threads:
+            command += ["-threads", str(threads)]
+        if hwaccel:
+            command += ["-hwaccel", "auto"]
+        command += ["-i", video_path, "-map", "0:v:0"]
+        if filters:
+            command += ["-vf", ",".join(filters)]
+        command += ["-vsync", "0", "-f", "rawvideo", "-pix_fmt", "bgr24", "pipe:1"]
+        if audio_path and info["has_audio"]:
+            command += ["-map", "0:a:0", "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", audio_path]
+        self.has_audio = bool(audio_path and info["has_audio"])
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def __iter__(self):
+        frame_bytes = self.width * self.height * 3
+        for index in _union_indices(self.intervals):
+            buffer = self.process.stdout.read(frame_bytes)
+            if len(buffer) < frame_bytes:
+                self.exhausted = True
+                break
+            self.frames_read = index + 1
+            yield index, np.frombuffer(buffer, np.uint8).reshape(self.height, self.width, 3)
+
+    def duration_seconds(self):
+        if self.exhausted and self.index is not None:
+            return self.index.duration
+        if self.exhausted and self.probe_duration:
+            return self.probe_duration
+        return super().duration_seconds()
+
+    def wait(self) -> int:
+        """Wait for ffmpeg to exit (drains remaining output) and return its exit code"""
+        if self.process.stdout:
+            while self.process.stdout.read(1 << 20):
+                pass
+        return self.process.wait()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        if self.process.stdout:
+            self.process.stdout.close()
+
+
+class _QueueFrameSource(FrameSource):
+    """One analyzer's view of a SharedDecode stream.
+
+    The first maxsize pending frames are kept in memory; while the analyzer
+    is further behind, new frames are appended to a temp file and read back
+    in order, so put() never blocks the decode.
+    """
+
+    _DONE = object()
+
+    def __init__(self, parent: "SharedDecode", interval: int, maxsize: int, spill_dir: Optional[str] = None):
+        super().__init__()
+        self.parent = parent
+        self.interval = interval
+        self.maxsize = maxsize
+        self.spill_dir = spill_dir
+        self.closed = threading.Event()
+        self.frames_spilled = 0
+        self._memory = deque()
+        # (index, shape) of each frame in the spill file, in file order; _DONE marks the end
+        self._spilled = deque()
+        self._spill_file = None
+        self._spill_read = 0
+        self._condition = threading.Condition()
+
+    @property
+    def fps(self):
+        return self.parent.source.fps
+
+    @property
+    def total_frames(self):
+        return self.parent.source.total_frames
+
+    @property
+    def scale(self):
+        return self.parent.source.scale
+
+    @property
+    def index(self):
+        return self.parent.source.index
+
+    def put(self, item):
+        with self._condition:
+            if self.closed.is_set():
+                return  # the analyzer has stopped reading
+            # Once frames spill, later ones follow them to keep the order
+            if not self._spilled and len(self._memory) < self.maxsize:
+                self._memory.append(item)
+            elif item is self._DONE:
+                self._spilled.append(item)
+            else:
+                index, frame = item
+                if self._spill_file is None:
+                    self._spill_file = tempfile.TemporaryFile(prefix="frames-", dir=self.spill_dir)
+                self._spill_file.seek(0, os.SEEK_END)
+                self._spill_file.write(frame.tobytes())
+                self._spilled.append((index, frame.shape))
+                self.frames_spilled += 1
+            self._condition.notify()
+
+    def _next(self):
+        with self._condition:
+            while not self._memory and not self._spilled:
+                if self.closed.is_set():
+                    return self._DONE
+                self._condition.wait(0.1)
+            if self._memory:
+                return self._memory.popleft()
+            entry = self._spilled.popleft()
+            if entry is self._DONE:
+                return entry
+            index, shape = entry
+            size = int(np.prod(shape))
+            self._spill_file.seek(self._spill_read)
+            frame = np.frombuffer(self._spill_file.read(size), np.uint8).reshape(shape)
+            self._spill_read += size
+            if not self._spilled:
+                # Caught up: reuse the file from the start
+                self._spill_file.seek(0)
+                self._spill_file.truncate()
+                self._spill_read = 0
+            return index, frame
+
+    def __iter__(self):
+        while not self.closed.is_set():
+            item = self._next()
+            if item is self._DONE:
+                self.frames_read = max(self.frames_read, self.parent.source.frames_read)
+                break
+            index, frame = item
+            self.frames_read = index + 1
+            yield index, frame
+
+    def duration_seconds(self):
+        if self.parent.finished.is_set() and self.frames_read >= self.parent.source.frames_read:
+            return self.parent.source.duration_seconds()
+        return super().duration_seconds()
+
+    def close(self):
+        with self._condition:
+            self.closed.set()
+            self._memory.clear()
+            self._spilled.clear()
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            self._condition.notify_all()
+
+
+class SharedDecode:
+    """Single ffmpeg demux feeding several analyzers and producing the audio file.
+
+    Each consumer gets its own buffer with the frames matching its interval;
+    frames are shared read-only between consumers. Buffers spill to disk
+    rather than block, so the decode runs at ffmpeg's pace and the audio file
+    is complete (wait_audio) without waiting for the slowest frame analyzer.
+    """
+
+    def __init__(self, video_path: str, intervals: Dict[str, int], audio_path: str,
+                 max_width: Optional[int] = None, threads: int = DECODE_THREADS,
+                 hwaccel: bool = DECODE_HWACCEL, queue_frames: int = DECODE_QUEUE_FRAMES, index=None,
+                 spill_dir: Optional[str] = DECODE_SPILL_DIR):
+        self.audio_path = audio_path
+        self.source = FFmpegFrameSource(video_path, max_width=max_width, threads=threads, hwaccel=hwaccel,
+                                        audio_path=audio_path, intervals=sorted(set(intervals.values())),
+                                        index=index)
+        self.consumers = {name: _QueueFrameSource(self, interval, queue_frames, spill_dir)
+                          for name, interval in intervals.items()}
+        self.finished = threading.Event()
+        self.returncode = None
+        self._thread = threading.Thread(target=self._pump, name="shared-decode", daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        try:
+            for index, frame in self.source:
+                active = [c for c in self.consumers.values() if not c.closed.is_set()]
+                if not active and not self.source.has_audio:
+                    self.source.close()  # nobody needs the rest
+                    return
+                for consumer in active:
+                    if index % consumer.interval == 0:
+                        consumer.put((index, frame))
+            # The audio file is complete once ffmpeg exits
+            self.returncode = self.source.wait()
+        except Exception as e:
+            print(f"Shared decode error: {e}")
+            self.source.close()
+        finally:
+            self.finished.set()
+            for consumer in self.consumers.values():
+                consumer.put(_QueueFrameSource._DONE)
+
+    def consumer(self, name: str) -> FrameSource:
+        return self.consumers[name]
+
+    @property
+    def frames_spilled(self) -> int:
+        return sum(consumer.frames_spilled for consumer in self.consumers.values())
+
+    def wait_audio(self, timeout: Optional[float] = None) -> str:
+        """Block until the audio file is complete; raises RuntimeError if it isn't usable"""
+        if not self.finished.wait(timeout):
+            raise RuntimeError("Audio extraction timed out")
+        if not self.source.has_audio:
+            raise RuntimeError("No audio stream found")
+        if self.returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with code {self.returncode}")
+        return self.audio_path
+
+    def close(self):
+        for consumer in self.consumers.values():
+            consumer.close()
+        if not self.finished.is_set():
+            self.source.close()
+
+
+def open_frame_source(video_path: str, interval: int = 1, max_width: Optional[int] = None,
+                      backend: Optional[str] = None, index=None) -> FrameSource:
+    """Frame source for one analyzer using the configured (or given) backend"""
+    backend = (backend or DECODE_BACKEND).lower()
+    if backend == "ffmpeg":
+        try:
+            return FFmpegFrameSource(video_path, interval, max_width, index=index)
+        except (FileNotFoundError, subprocess.CalledProcessError, RuntimeError) as e:
+            print(f"ffmpeg decode unavailable ({e}); falling back to OpenCV")
+    return OpenCVFrameSource(video_path, interval, max_width, index=index)
@@ -0,0 +1,96 @@
+import re
+from typing import Dict, List, Optional
+
+# Filler phrases, matched on whole words. Multi-word phrases go through a
+# word trie so every word position is examined once.
+FILLER_PHRASES = (
+    "um", "uh", "er", "ah", "like", "you know", "basically", "actually", "so", "well",
+    "i mean", "kind of", "sort of",
+)
+# Drawn-out hesitation sounds ("umm", "uhhh", "errr") count as one filler
+HESITATION_SOUND = re.compile(r"^(?:u+m+|u+h+|e+r+|a+h+)$")
+LONG_PAUSE_SECONDS = 1.0  # gap between words counted as a hesitation pause
+
+_END = object()
+
+
+def _build_trie(phrases):
+    root = {}
+    for phrase in phrases:
+        node = root
+        for token in phrase.split():
+            node = node.setdefault(token, {})
+        node[_END] = phrase
+    return root
+
+
+FILLER_TRIE = _build_trie(FILLER_PHRASES)
+
+
+class DisfluencyReport:
+    """Fillers, long pauses and repetitions found in one pass over a word list"""
+
+    def __init__(self):
+        self.fillers: List[Dict] = []
+        self.pauses: List[Dict] = []
+        self.repetitions: List[Dict] = []
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return {
+            "filler_words": len(self.fillers),
+            "pauses": len(self.pauses),
+            "repetitions": len(self.repetitions),
+        }
+
+    def to_dict(self) -> Dict:
+        return {"fillers": self.fillers, "pauses": self.pauses, "repetitions": self.repetitions}
+
+
+def _match_filler(tokens: List[str], i: int) -> Optional[tuple]:
+    """Longest filler phrase starting at tokens[i] as (phrase, word count)"""
+    if HESITATION_SOUND.match(tokens[i]):
+        return tokens[i], 1
+    node = FILLER_TRIE
+    match = None
+    for j in range(i, len(tokens)):
+        node = node.get(tokens[j])
+        if node is None:
+            break
+        if _END in node:
+            match = (node[_END], j - i + 1)
+    return match
+
+
+def scan_words(words: List[Dict]) -> DisfluencyReport:
+    """Scan Vosk word dicts ({"word", "start", "end"}) for disfluencies.
+
+    A filler is counted once even when it matches more than one pattern,
+    and words inside a matched phrase aren't matched again. A repetition is
+    a word said three or more times in a row (counted once per extra
+    occurrence past the second).
+    """
+    report = DisfluencyReport()
+    tokens = [w.get("word", "").lower() for w in words]
+    skip_until = 0
+    for i, word in enumerate(words):
+        if i >= skip_until:
+            match = _match_filler(tokens, i)
+            if match:
+                phrase, length = match
+                report.fillers.append({"text": phrase, "start": word.get("start"),
+                                       "end": words[i + length - 1].get("end")})
+                skip_until = i + length
+        if i >= 1:
+            previous = words[i - 1]
+            if "end" in previous and "start" in word and word["start"] - previous["end"] > LONG_PAUSE_SECONDS:
+                report.pauses.append({"start": previous["end"], "end": word["start"],
+                                      "duration": round(word["start"] - previous["end"], 2)})
+        if i >= 2 and tokens[i] == tokens[i - 1] == tokens[i - 2]:
+            report.repetitions.append({"word": tokens[i], "start": word.get("start")})
+    return report
+
+
+def scan_transcript(transcript: str) -> DisfluencyReport:
+    """Filler scan for a plain transcript (no timing, so no pauses)"""
+    return scan_words([{"word": token} for token in re.findall(r"[a-z']+", transcript.lower())])
@@ -0,0 +1,53 @@
+from typing import Dict, List, Optional
+
+# Interview-level summary over the per-answer /analyze results of one mock interview
+
+COMPONENTS = ("facial_confidence", "speech_confidence", "body_confidence")
+
+
+def _weighted_mean(pairs) -> Optional[float]:
+    """Mean of (value, weight) pairs, ignoring missing values; equal weights when all are zero"""
+    pairs = [(value, weight) for value, weight in pairs if value is not None]
+    if not pairs:
+        return None
+    total_weight = sum(weight for _, weight in pairs)
+    if total_weight <= 0:
+        return round(sum(value for value, _ in pairs) / len(pairs), 2)
+    return round(sum(value * weight for value, weight in pairs) / total_weight, 2)
+
+
+def is_scored(result) -> bool:
+    return isinstance(result, dict) and "error" not in result and result.get("score") is not None
+
+
+def build_interview_report(answers: List[Dict]) -> Dict:
+    """Combine answers [{"question", "result"}] into one report.
+
+    Scores are averaged weighted by answer duration, so a ten-second answer
+    doesn't count as much as a three-minute one.
+    """
+    scored = [(i, answer) for i, answer in enumerate(answers) if is_scored(answer.get("result"))]
+    durations = {i: answer["result"].get("video_duration") or 0.0 for i, answer in scored}
+
+    report = {
+        "answers": len(answers),
+        "answers_scored": len(scored),
+        "answers_failed": len(answers) - len(scored),
+        "total_duration": round(sum(durations.values()), 2),
+        "score": _weighted_mean((answer["result"]["score"], durations[i]) for i, answer in scored),
+        "partial": len(scored) < len(answers) or any(answer["result"].get("partial") for _, answer in scored),
+    }
+    for component in COMPONENTS:
+        report[component] = _weighted_mean((answer["result"].get(component), durations[i]) for i, answer in scored)
+
+    if scored:
+        ranked = sorted(scored, key=lambda item: item[1]["result"]["score"])
+        weakest, strongest = ranked[0], ranked[-1]
+        report["strongest_answer"] = {"index": strongest[0], "question": strongest[1].get("question"),
+                                      "score": strongest[1]["result"]["score"]}
+        report["weakest_answer"] = {"index": weakest[0], "question": weakest[1].get("question"),
+                                    "score": weakest[1]["result"]["score"]}
+        # Spread between answers; a large one means uneven performance across questions
+        scores = [answer["result"]["score"] for _, answer in scored]
+        report["score_range"] = round(max(scores) - min(scores), 2)
+    return report
@@ -0,0 +1,316 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Durable analysis job queue shared by the API tier and analysis workers.
+#
+# The API enqueues a job and workers lease it. A lease expires unless the
+# worker heartbeats, so a crashed or partitioned worker's job goes back to
+# the queue after the retry backoff (up to max_attempts). Other brokers plug in through
+# register_broker; JOB_QUEUE_URL picks one by scheme.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+JOB_QUEUE_URL = os.getenv("JOB_QUEUE_URL", "sqlite://" + os.path.join(PROJECT_ROOT, "data", "jobs.db"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+# Uploads waiting for a worker; must be storage every worker can read
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join(PROJECT_ROOT, "data", "uploads"))
+# Finished jobs (and their results) are kept this long for GET /jobs/{id}
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+TERMINAL = (SUCCEEDED, FAILED)
+
+
+class Job:
+    """One queued unit of work. lease_token identifies the current lease."""
+
+    def __init__(self, id: str, kind: str, payload: Dict, status: str = QUEUED, attempts: int = 0,
+                 max_attempts: int = JOB_MAX_ATTEMPTS, worker: Optional[str] = None,
+                 lease_token: Optional[str] = None, lease_expires_at: Optional[float] = None,
+                 heartbeat_at: Optional[float] = None, result: Optional[Dict] = None,
+                 error: Optional[str] = None, created_at: Optional[float] = None,
+                 updated_at: Optional[float] = None):
+        self.id = id
+        self.kind = kind
+        self.payload = payload
+        self.status = status
+        self.attempts = attempts
+        self.max_attempts = max_attempts
+        self.worker = worker
+        self.lease_token = lease_token
+        self.lease_expires_at = lease_expires_at
+        self.heartbeat_at = heartbeat_at
+        self.result = result
+        self.error = error
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL
+
+    def to_dict(self) -> Dict:
+        """Client-facing view (no lease token or payload paths)"""
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "worker": self.worker,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "result": self.result,
+        }
+
+
+class JobQueue(ABC):
+    """Broker interface. Methods taking a lease token return False when the
+    lease was lost (expired and handed to another worker)."""
+
+    @abstractmethod
+    def enqueue(self, kind: str, payload: Dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+        ...
+
+    @abstractmethod
+    def lease(self, worker: str, lease_seconds: float = JOB_LEASE_SECONDS,
+              kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+        """Claim the oldest available job, or None when there is none"""
+        ...
+
+    @abstractmethod
+    def heartbeat(self, job_id: str, lease_token: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, job_id: str, lease_token: str, result: Dict) -> bool:
+        ...
+
+    @abstractmethod
+    def fail(self, job_id: str, lease_token: str, error: str, retry: bool = True) -> bool:
+        """Record a failed attempt; retried with backoff while attempts remain"""
+        ...
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Job]:
+        ...
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        ...
+
+    @abstractmethod
+    def purge(self, older_than_seconds: float) -> List[Job]:
+        """Delete finished jobs last updated before the cutoff and return them"""
+        ...
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff before attempt attempts + 1"""
+    return JOB_RETRY_BACKOFF_SECONDS * (2 ** max(0, attempts - 1))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    available_at REAL NOT NULL,
+    worker TEXT,
+    lease_token TEXT,
+    lease_expires_at REAL,
+    heartbeat_at REAL,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_available ON jobs (status, available_at);
+"""
+
+_COLUMNS = ("id", "kind", "payload", "status", "attempts", "max_attempts", "worker", "lease_token",
+            "lease_expires_at", "heartbeat_at", "result", "error", "created_at", "updated_at")
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue in a SQLite database (WAL mode).
+
+    Leasing runs in a BEGIN IMMEDIATE transaction, so concurrent workers
+    never claim the same job. Any number of processes on one host (or on
+    hosts sharing a volume with working POSIX locks) can use the same file;
+    use another broker when workers have no such volume.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread; sqlite3 connections aren't shared across threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+    @staticmethod
+    def _job(row) -> Optional[Job]:
+        if row is None:
+            return None
+        values = dict(zip(_COLUMNS, row))
+        values["payload"] = json.loads(values["payload"])
+        values["result"] = json.loads(values["result"]) if values["result"] else None
+        return Job(**values)
+
+    def enqueue(self, kind: str, payload: Dict, max_attempts: int = JOB_MAX_ATTEMPTS) -> Job:
+        now = time.time()
+        job = Job(uuid.uuid4().hex, kind, payload, max_attempts=max_attempts, created_at=now, updated_at=now)
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, payload, status, max_attempts, available_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, kind, json.dumps(payload), QUEUED, max_attempts, now, now, now))
+        return job
+
+    def _reclaim_expired(self, conn, now: float):
+        """Requeue jobs whose lease ran out after the retry backoff (or fail them when out of attempts)"""
+        expired = conn.execute(
+            "SELECT id, attempts, max_attempts, worker FROM jobs WHERE status = ? AND lease_expires_at < ?",
+            (RUNNING, now)).fetchall()
+        for job_id, attempts, max_attempts, worker in expired:
+            error = f"lease expired on worker {worker}"
+            if attempts >= max_attempts:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, lease_token = NULL, updated_at = ? WHERE id = ?",
+                             (FAILED, f"{error} (attempt {attempts} of {max_attempts})", now, job_id))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, lease_token = NULL, available_at = ?, "
+                             "updated_at = ? WHERE id = ?", (QUEUED, error, now + retry_delay(attempts), now, job_id))
+
+    def lease(self, worker: str, lease_seconds: float = JOB_LEASE_SECONDS,
+              kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._transaction() as conn:
+            self._reclaim_expired(conn, now)
+            query = "SELECT id FROM jobs WHERE status = ? AND available_at <= ?"
+            params = [QUEUED, now]
+            if kinds:
+                kinds = list(kinds)
+                query += f" AND kind IN ({', '.join('?' * len(kinds))})"
+                params.extend(kinds)
+            row = conn.execute(query + " ORDER BY created_at LIMIT 1", params).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, attempts = attempts + 1, worker = ?, lease_token = ?, "
+                "lease_expires_at = ?, heartbeat_at = ?, updated_at = ? WHERE id = ?",
+                (RUNNING, worker, token, now + lease_seconds, now, now, row[0]))
+            return self._job(conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?",
+                                          (row[0],)).fetchone())
+
+    def heartbeat(self, job_id: str, lease_token: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_expires_at = ?, heartbeat_at = ?, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = ?",
+                (now + lease_seconds, now, now, job_id, lease_token, RUNNING))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, lease_token: str, result: Dict) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_token = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_token = ? AND status = ?",
+                (SUCCEEDED, json.dumps(result, default=str), now, job_id, lease_token, RUNNING))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: str, lease_token: str, error: str, retry: bool = True) -> bool:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_token = ? AND status = ?",
+                               (job_id, lease_token, RUNNING)).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if retry and attempts < max_attempts:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, lease_token = NULL, available_at = ?, "
+                             "updated_at = ? WHERE id = ?",
+                             (QUEUED, error, now + retry_delay(attempts), now, job_id))
+            else:
+                conn.execute("UPDATE jobs SET status = ?, error = ?, lease_token = NULL, updated_at = ? WHERE id = ?",
+                             (FAILED, error, now, job_id))
+            return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        row = self._connection().execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row)
+
+    def counts(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, SUCCEEDED, FAILED)}
+        counts.update(dict(rows))
+        return counts
+
+    def purge(self, older_than_seconds: float) -> List[Job]:
+        cutoff = time.time() - older_than_seconds
+        with self._transaction() as conn:
+            rows = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                                (SUCCEEDED, FAILED, cutoff)).fetchall()
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(row[0],) for row in rows])
+        return [self._job(row) for row in rows]
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT (ROLLBACK on error) on an autocommit connection"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+# URL scheme -> factory taking the rest of the URL
+BROKERS: Dict[str, Callable[[str], JobQueue]] = {
+    "sqlite": SQLiteJobQueue,
+}
+
+
+def register_broker(scheme: str, factory: Callable[[str], JobQueue]):
+    """Make JOB_QUEUE_URL=<scheme>://... open a queue built by factory"""
+    BROKERS[scheme] = factory
+
+
+def open_queue(url: Optional[str] = None) -> JobQueue:
+    """Open the queue named by url (default JOB_QUEUE_URL), e.g. sqlite:///srv/confidencelab/jobs.db"""
+    url = url or JOB_QUEUE_URL
+    scheme, separator, location = url.partition("://")
+    if not separator or scheme not in BROKERS:
+        raise ValueError(f"Unsupported job queue URL '{url}'. Known schemes: {', '.join(sorted(BROKERS))}")
+    return BROKERS[scheme](location)
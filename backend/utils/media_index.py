@@ -0,0 +1,311 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import subprocess
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from utils.decode import probe_video
+
+# Browser MediaRecorder webm has no Duration element and no Cues, so FPS,
+# frame counts and seeking are unreliable. Such files are remuxed (stream
+# copy, no re-encode) to Matroska with cues once, and the remuxed copy and a
+# frame timestamp/keyframe index are cached next to the recording.
+NORMALIZE_CONTAINERS = os.getenv("VIDEO_NORMALIZE", "true").lower() in ("1", "true", "yes")
+# Directory for cached indexes and remuxed copies (default: next to the file,
+# <video>.index.json and <video>.remux.mkv)
+INDEX_CACHE_DIR = os.getenv("MEDIA_INDEX_DIR") or None
+# Cache directory of the command-line tools when MEDIA_INDEX_DIR isn't set, so
+# they don't write into the directories of the recordings they read
+CLI_INDEX_CACHE_DIR = os.path.join(tempfile.gettempdir(), "confidencelab-media-index")
+
+INDEX_VERSION = 1
+
+
+class MediaIndex:
+    """Presentation timestamps and keyframes of a video stream.
+
+    timestamps[i] is the start time (seconds) of frame i in display order,
+    so frame/time lookups don't depend on the container's FPS metadata.
+    """
+
+    def __init__(self, timestamps: List[float], keyframes: List[int], has_audio: bool = False,
+                 remuxed: bool = False):
+        self.timestamps = timestamps
+        self.keyframes = keyframes
+        self.has_audio = has_audio
+        self.remuxed = remuxed
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def frame_duration(self) -> float:
+        """Typical (median) frame duration"""
+        if len(self.timestamps) < 2:
+            return 0.0
+        deltas = sorted(b - a for a, b in zip(self.timestamps, self.timestamps[1:]))
+        return deltas[len(deltas) // 2]
+
+    @property
+    def fps(self) -> float:
+        """Average frame rate measured from the timestamps"""
+        if len(self.timestamps) < 2 or self.timestamps[-1] <= self.timestamps[0]:
+            return 0.0
+        return (len(self.timestamps) - 1) / (self.timestamps[-1] - self.timestamps[0])
+
+    @property
+    def duration(self) -> float:
+        """Video duration (start of the first frame to the end of the last)"""
+        if not self.timestamps:
+            return 0.0
+        return self.timestamps[-1] - self.timestamps[0] + self.frame_duration
+
+    def timestamp(self, frame_index: int) -> float:
+        """Time of a frame relative to the first frame (end of video past the last frame)"""
+        if not self.timestamps:
+            return 0.0
+        if frame_index >= len(self.timestamps):
+            return self.duration
+        return self.timestamps[max(0, frame_index)] - self.timestamps[0]
+
+    def keyframe_before(self, frame_index: int) -> int:
+        """Nearest keyframe at or before frame_index (where a seek has to start decoding)"""
+        position = bisect_right(self.keyframes, frame_index) - 1
+        return self.keyframes[position] if position >= 0 else 0
+
+    def keyframe_interval(self) -> Optional[float]:
+        """Mean number of frames between keyframes"""
+        if len(self.keyframes) < 2:
+            return None
+        return (self.keyframes[-1] - self.keyframes[0]) / (len(self.keyframes) - 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            "version": INDEX_VERSION,
+            "timestamps": [round(t, 6) for t in self.timestamps],
+            "keyframes": self.keyframes,
+            "has_audio": self.has_audio,
+            "remuxed": self.remuxed,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "MediaIndex":
+        return cls(data["timestamps"], data["keyframes"], data.get("has_audio", False), data.get("remuxed", False))
+
+    def summary(self) -> Dict:
+        return {
+            "frames": self.frame_count,
+            "fps": round(self.fps, 3),
+            "duration_seconds": round(self.duration, 3),
+            "keyframes": len(self.keyframes),
+            "remuxed": self.remuxed,
+        }
+
+
+def build_index(video_path: str) -> MediaIndex:
+    """Read every video packet's timestamp and keyframe flag with ffprobe (no decoding)"""
+    command = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", "packet=pts_time,dts_time,flags", "-of", "csv=p=0", video_path
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    packets = []
+    for line in output.splitlines():
+        fields = line.split(",")
+        if len(fields) < 3:
+            continue
+        pts, dts, flags = fields[:3]
+        try:
+            packets.append((float(pts if pts != "N/A" else dts), "K" in flags))
+        except ValueError:
+            continue
+    if not packets:
+        raise RuntimeError("No video packets found")
+    # Packets are in decode order; frames are indexed in display order
+    packets.sort(key=lambda packet: packet[0])
+    timestamps = [pts for pts, _ in packets]
+    keyframes = [i for i, (_, key) in enumerate(packets) if key]
+    has_audio = probe_video(video_path)["has_audio"]
+    return MediaIndex(timestamps, keyframes, has_audio)
+
+
+def set_cache_dir(directory: Optional[str]):
+    """Cache indexes and remuxed copies in directory (None: next to each video)"""
+    global INDEX_CACHE_DIR
+    INDEX_CACHE_DIR = directory
+
+
+def _cache_path(video_path: str, suffix: str) -> str:
+    if INDEX_CACHE_DIR:
+        stat = os.stat(video_path)
+        key = f"{os.path.abspath(video_path)}:{stat.st_size}".encode()
+        return os.path.join(INDEX_CACHE_DIR, hashlib.sha1(key).hexdigest() + suffix)
+    return video_path + suffix
+
+
+def index_path(video_path: str) -> str:
+    return _cache_path(video_path, ".index.json")
+
+
+def remux_path(video_path: str) -> str:
+    """Where the seekable copy of an unseekable recording is cached"""
+    return _cache_path(video_path, ".remux.mkv")
+
+
+def _source_stamp(video_path: str) -> Dict:
+    stat = os.stat(video_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def load_index(video_path: str) -> Optional[MediaIndex]:
+    """Cached index for video_path, or None if missing or stale"""
+    try:
+        with open(index_path(video_path), "r") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != INDEX_VERSION or data.get("source") != _source_stamp(video_path):
+        return None
+    return MediaIndex.from_dict(data)
+
+
+def save_index(video_path: str, index: MediaIndex):
+    """Cache the index; failures (read-only directories) are not fatal"""
+    path = index_path(video_path)
+    data = index.to_dict()
+    data["source"] = _source_stamp(video_path)
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Could not cache media index for {video_path}: {e}")
+
+
+def discard_index(video_path: str):
+    """Remove the cached index and remuxed copy (e.g. together with a temporary upload)"""
+    for path in (index_path(video_path), remux_path(video_path)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def needs_remux(video_path: str) -> bool:
+    """True when the container has no duration (and so usually no cue index)"""
+    return probe_video(video_path)["duration"] is None
+
+
+def remux(video_path: str, output_path: str, timeout: Optional[float] = None) -> str:
+    """Copy all streams into Matroska with a duration and cues at the front"""
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+        "-i", video_path, "-map", "0", "-c", "copy",
+        "-f", "matroska", "-cues_to_front", "1", output_path
+    ]
+    subprocess.run(command, check=True, capture_output=True, timeout=timeout)
+    return output_path
+
+
+class PreparedMedia:
+    """A recording ready for analysis: seekable path plus its frame index.
+
+    path is the remuxed copy when the original wasn't seekable, otherwise
+    the original. index is None when ffprobe isn't available. close()
+    removes path if it is temporary (a remuxed copy that couldn't be cached).
+    """
+
+    def __init__(self, source_path: str, path: str, index: Optional[MediaIndex], temporary: bool = False):
+        self.source_path = source_path
+        self.path = path
+        self.index = index
+        self.temporary = temporary
+
+    def close(self):
+        if self.temporary:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+# Client-extracted frames are named by their timestamp in milliseconds
+FRAME_FILE = re.compile(r"^(\d{1,9})\.(?:jpe?g|png)$", re.IGNORECASE)
+
+
+def load_frame_sequence(directory: str) -> Tuple[List[str], MediaIndex]:
+    """Image paths in time order and their index for a directory of <ms>.jpg/.png frames"""
+    frames = []
+    for name in os.listdir(directory):
+        match = FRAME_FILE.match(name)
+        if match:
+            frames.append((int(match.group(1)) / 1000.0, os.path.join(directory, name)))
+    if not frames:
+        raise RuntimeError("No frame images found")
+    frames.sort()
+    return [path for _, path in frames], MediaIndex([t for t, _ in frames], list(range(len(frames))))
+
+
+def prepare_media(video_path: str, normalize: bool = NORMALIZE_CONTAINERS,
+                  timeout: Optional[float] = None) -> PreparedMedia:
+    """Remux unseekable recordings and load (or build and cache) the frame index.
+
+    The remuxed copy is cached next to the index and reused while the index
+    is current.
+    """
+    index = load_index(video_path)
+    path = video_path
+    temporary = False
+    try:
+        if normalize and (index.remuxed if index is not None else needs_remux(video_path)):
+            cached = remux_path(video_path)
+            if index is not None and os.path.exists(cached):
+                path = cached
+            else:
+                path, temporary = _remux_to_cache(video_path, cached, timeout)
+        if index is None:
+            # Stream-copy keeps every timestamp, so the index describes both files
+            index = build_index(path)
+            index.remuxed = path != video_path
+            save_index(video_path, index)
+    except (FileNotFoundError, subprocess.CalledProcessError, RuntimeError) as e:
+        print(f"Media index unavailable for {video_path}: {e}")
+    return PreparedMedia(video_path, path, index, temporary)
+
+
+def _remux_to_cache(video_path: str, cached: str, timeout: Optional[float]) -> Tuple[str, bool]:
+    """Remux into the cache; returns (path, temporary), a temp file if the cache isn't writable"""
+    try:
+        os.makedirs(os.path.dirname(cached) or ".", exist_ok=True)
+        fd, path = tempfile.mkstemp(suffix=".mkv", dir=os.path.dirname(cached) or ".")
+    except OSError:
+        fd, path = tempfile.mkstemp(suffix=".mkv")
+        cached = None
+    os.close(fd)
+    try:
+        remux(video_path, path, timeout)
+    except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print(f"Remux failed for {video_path}: {e}")
+        os.remove(path)
+        return video_path, False
+    if cached is None:
+        return path, True
+    # Renamed into place, so a concurrent analysis never sees a partial copy
+    try:
+        os.replace(path, cached)
+    except OSError:
+        return path, True  # e.g. the cached copy is open on Windows
+    return cached, False
@@ -0,0 +1,266 @@
+import time
+import shutil
+import tempfile
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# Minimal Prometheus text-format (0.0.4) registry. Kept in-house so the API
+# doesn't need prometheus_client just to expose a handful of series.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ANALYSIS_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Unlabelled gauges report 0 until first set
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def get(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(counts), self._sums[key]) for key, counts in self._counts.items()]
+        lines = self.header()
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose samples are computed at scrape time"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 callback: Callable[[], Dict[Tuple[str, ...], float]], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            samples = self.callback()
+        except Exception as e:
+            print(f"Metrics callback error for {self.name}: {e}")
+            samples = {}
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in samples.items()
+        ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, labelnames, callback, kind="gauge") -> CallbackMetric:
+        return self.register(CallbackMetric(name, documentation, labelnames, callback, kind))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Global registry and the service's metrics
+registry = Registry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status"))
+ANALYZE_IN_FLIGHT = registry.gauge(
+    "analyze_in_flight", "Analysis requests currently accepted and not yet finished")
+ANALYSIS_QUEUE_DEPTH = registry.gauge(
+    "analysis_queue_depth", "Analysis jobs waiting for a free analysis worker")
+ANALYSIS_STAGE_DURATION = registry.histogram(
+    "analysis_stage_duration_seconds", "Time spent in each analysis stage per run",
+    ("stage",), buckets=ANALYSIS_BUCKETS)
+ANALYSIS_RESOURCES_IN_USE = registry.gauge(
+    "analysis_resources_in_use", "Estimated cost units and memory (MB) reserved by running analyses",
+    ("resource",))
+ADMISSION_REJECTIONS = registry.counter(
+    "analysis_admission_rejections_total", "Uploads rejected before analysis", ("reason",))
+DATASTORE_LATENCY = registry.histogram(
+    "datastore_operation_duration_seconds", "JSON data store read/write latency",
+    ("store", "operation"))
+
+
+def observe_trace(trace):
+    """Feed a finished analysis Trace's stage durations into the stage histogram"""
+    for name, record in trace.stages.items():
+        if record.calls:
+            ANALYSIS_STAGE_DURATION.observe(record.total_seconds, stage=name)
+
+
+def _temp_disk_usage():
+    usage = shutil.disk_usage(tempfile.gettempdir())
+    return {("total",): usage.total, ("used",): usage.used, ("free",): usage.free}
+
+
+registry.callback(
+    "temp_disk_bytes", "Disk usage of the temp directory used for uploads", ("kind",), _temp_disk_usage)
+
+
+def register_model_cache(model_cache):
+    """Expose ModelCache hit and cold-load counters"""
+    registry.callback(
+        "model_cache_hits_total", "Model lookups served from the cache", ("model",),
+        lambda: {(name,): count for name, count in model_cache.hit_counts().items()}, kind="counter")
+    registry.callback(
+        "model_cold_loads_total", "Models loaded from disk", ("model",),
+        lambda: {(name,): count for name, count in model_cache.load_counts().items()}, kind="counter")
+    registry.callback(
+        "model_load_seconds", "Time the last load of each model took", ("model",),
+        lambda: {(name,): status["load_time_seconds"] for name, status in model_cache.model_status().items()
+                 if status["load_time_seconds"] is not None})
+
+
+def register_job_queue(job_queue):
+    """Expose the shared job queue's job counts by status"""
+    registry.callback(
+        "analysis_jobs", "Jobs in the shared analysis queue", ("status",),
+        lambda: {(status,): count for status, count in job_queue.counts().items()})
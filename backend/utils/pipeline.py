@@ -0,0 +1,247 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, Iterable, List, Optional
+
+from utils import profiling
+from utils.deadline import Deadline
+
+
+def _pool_size(name: str, default: int) -> int:
+    return max(1, int(os.getenv(f"ANALYSIS_POOL_{name.upper()}_WORKERS", str(default))))
+
+
+# Worker threads per resource type for one analysis run
+POOL_SIZES = {
+    "cpu": _pool_size("cpu", 3),  # frame analysis, VAD, librosa, scoring
+    "asr": _pool_size("asr", 1),  # Vosk decoding
+    "io": _pool_size("io", 1),    # ffmpeg audio extraction
+}
+
+# Statuses an analyzer may return in its output's "status" key
+ANALYZER_STATUSES = ("ok", "partial", "timeout", "error")
+
+
+class Analyzer:
+    """One node of the analysis DAG.
+
+    fn(ctx, *inputs, *optional_inputs) returns the node's output, published
+    under the node's name. inputs must succeed for the node to run;
+    optional_inputs are passed as None when they failed or were skipped.
+    component groups nodes that share a time budget and a trace stage.
+    """
+
+    def __init__(self, name: str, fn: Callable, inputs: Iterable[str] = (), optional_inputs: Iterable[str] = (),
+                 pool: str = "cpu", component: Optional[str] = None, span: Optional[str] = None,
+                 enabled: Optional[Callable] = None):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.optional_inputs = tuple(optional_inputs)
+        self.pool = pool
+        self.component = component or name
+        self.span = span
+        self.enabled = enabled or (lambda profile: True)
+
+    @property
+    def dependencies(self):
+        return self.inputs + self.optional_inputs
+
+
+class AnalyzerRegistry:
+    def __init__(self):
+        self._analyzers: Dict[str, Analyzer] = {}
+
+    def add(self, analyzer: Analyzer) -> Analyzer:
+        if analyzer.name in self._analyzers:
+            raise ValueError(f"Analyzer {analyzer.name} already registered")
+        self._analyzers[analyzer.name] = analyzer
+        return analyzer
+
+    def analyzer(self, name: str, **options):
+        """Decorator registering fn as an analyzer"""
+        def register(fn):
+            self.add(Analyzer(name, fn, **options))
+            return fn
+        return register
+
+    def get(self, name: str) -> Analyzer:
+        return self._analyzers[name]
+
+    def names(self) -> List[str]:
+        return list(self._analyzers)
+
+    def plan(self, available: Iterable[str], profile=None) -> List[Analyzer]:
+        """Enabled analyzers in dependency order.
+
+        available names the initial values; raises ValueError for unknown
+        inputs or cycles. Analyzers needing a disabled analyzer's output are
+        dropped too, and an analyzer whose output is already among the
+        initial values (e.g. pre-extracted audio) isn't run.
+        """
+        available = set(available)
+        enabled = {name for name, a in self._analyzers.items() if a.enabled(profile)}
+        order, state, runnable_names = [], {}, set()
+
+        def visit(name, path):
+            if state.get(name) == "done":
+                return name in runnable_names
+            if state.get(name) == "visiting":
+                raise ValueError(f"Analyzer dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            analyzer = self._analyzers[name]
+            runnable = name in enabled
+            for dependency in analyzer.dependencies:
+                if dependency in available:
+                    continue
+                if dependency not in self._analyzers:
+                    raise ValueError(f"Analyzer {name} needs unknown input {dependency}")
+                if not visit(dependency, path + [name]) and dependency in analyzer.inputs:
+                    runnable = False
+            state[name] = "done"
+            if runnable:
+                order.append(analyzer)
+                runnable_names.add(name)
+            return runnable
+
+        for name in self._analyzers:
+            if name not in available:
+                visit(name, [])
+        return order
+
+
+class AnalysisContext:
+    """What a running analyzer sees besides its inputs"""
+
+    def __init__(self, trace, profile, deadline: Deadline, statuses: Dict[str, Dict]):
+        self.trace = trace
+        self.profile = profile
+        self.deadline = deadline
+        self._statuses = statuses
+
+    def status(self, name: str) -> Optional[str]:
+        """Final status of another analyzer (None while it's still running)"""
+        entry = self._statuses.get(name)
+        return entry["status"] if entry else None
+
+
+class DagScheduler:
+    """Runs an AnalyzerRegistry's DAG with a thread pool per resource type.
+
+    Each analyzer starts as soon as its inputs are ready, so independent
+    chains overlap. Components get deadline.child(budgets[component]); an
+    analyzer still running grace_seconds past that is reported as timed out
+    and its dependents are skipped. Pools are not used as context managers:
+    a stalled analyzer must not block the result.
+    """
+
+    def __init__(self, pool_sizes: Optional[Dict[str, int]] = None, grace_seconds: float = 5.0):
+        self.pool_sizes = dict(POOL_SIZES, **(pool_sizes or {}))
+        self.grace_seconds = grace_seconds
+
+    def run(self, registry: AnalyzerRegistry, values: Dict, trace, profile, deadline: Deadline,
+            budgets: Optional[Dict[str, Optional[float]]] = None):
+        """Returns ({name: output}, {name: {"status", ...}}) for every planned analyzer"""
+        budgets = budgets or {}
+        values = dict(values)
+        plan = registry.plan(values, profile)
+        planned = {a.name for a in plan}
+        statuses: Dict[str, Dict] = {}
+        deadlines = {a.component: deadline.child(budgets.get(a.component)) for a in plan}
+        windows: Dict[str, List[int]] = {}
+        pools = {}
+        running = {}
+        waiting = list(plan)
+
+        def resolved(name):
+            return name in values and name not in statuses or (
+                name in statuses and statuses[name]["status"] in ("ok", "partial"))
+
+        try:
+            while waiting or running:
+                for analyzer in list(waiting):
+                    failed = [d for d in analyzer.inputs if d in statuses and statuses[d]["status"] not in ("ok", "partial")]
+                    if failed:
+                        upstream = statuses[failed[0]]
+                        statuses[analyzer.name] = {
+                            "status": upstream["status"] if upstream["status"] in ("timeout", "error") else "skipped",
+                            "error": f"{failed[0]}: {upstream.get('error', upstream['status'])}",
+                        }
+                        waiting.remove(analyzer)
+                        continue
+                    if not all(resolved(d) for d in analyzer.inputs) or \
+                            any(d in planned and d not in values and d not in statuses
+                                for d in analyzer.optional_inputs):
+                        continue
+                    waiting.remove(analyzer)
+                    args = [values.get(d) if resolved(d) else None for d in analyzer.dependencies]
+                    ctx = AnalysisContext(trace, profile, deadlines[analyzer.component], statuses)
+                    if analyzer.pool not in pools:
+                        pools[analyzer.pool] = ThreadPoolExecutor(max_workers=self.pool_sizes.get(analyzer.pool, 1),
+                                                                  thread_name_prefix=f"analysis-{analyzer.pool}")
+                    future = pools[analyzer.pool].submit(self._call, analyzer, ctx, args)
+                    running[future] = analyzer
+
+                if not running:
+                    if waiting:  # only reachable if inputs never appear
+                        for analyzer in waiting:
+                            statuses[analyzer.name] = {"status": "skipped", "error": "inputs unavailable"}
+                    break
+
+                limits = [deadlines[a.component].expires_at for a in running.values()]
+                limits = [limit + self.grace_seconds - time.monotonic() for limit in limits if limit is not None]
+                timeout = max(0.0, min(limits)) if limits else None
+                done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    analyzer = running.pop(future)
+                    try:
+                        output, start_ns, end_ns = future.result()
+                    except TimeoutError as e:
+                        statuses[analyzer.name] = {"status": "timeout", "error": str(e) or "out of budget"}
+                        continue
+                    except Exception as e:
+                        statuses[analyzer.name] = {"status": "error", "error": str(e)}
+                        continue
+                    values[analyzer.name] = output
+                    windows.setdefault(analyzer.component, []).extend((start_ns, end_ns))
+                    # Analyzers report their own budget cut-offs and failures
+                    # ({"status": "timeout"}); anything unrecognised counts as ok
+                    status = output.get("status", "ok") if isinstance(output, dict) else "ok"
+                    if status not in ANALYZER_STATUSES:
+                        status = "ok"
+                    statuses[analyzer.name] = {"status": status}
+                    if status in ("timeout", "error") and output.get("error"):
+                        statuses[analyzer.name]["error"] = str(output["error"])
+                    if isinstance(output, dict) and "coverage" in output:
+                        statuses[analyzer.name]["coverage"] = output["coverage"]
+
+                now = time.monotonic()
+                for future, analyzer in list(running.items()):
+                    expires_at = deadlines[analyzer.component].expires_at
+                    if expires_at is not None and now >= expires_at + self.grace_seconds:
+                        running.pop(future)
+                        future.cancel()
+                        statuses[analyzer.name] = {"status": "timeout"}
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=False, cancel_futures=True)
+
+        # One stage per component covering its first start to its last finish
+        for component, times in windows.items():
+            trace.stage(component).add_time(min(times), max(times))
+
+        outputs = {a.name: values[a.name] for a in plan if a.name in values}
+        return outputs, statuses
+
+    @staticmethod
+    def _call(analyzer: Analyzer, ctx: AnalysisContext, args):
+        start_ns = time.time_ns()
+        # Pool threads show up in the run's profile while they work on it
+        with profiling.attach(ctx.trace):
+            if analyzer.span:
+                with ctx.trace.span(analyzer.span):
+                    output = analyzer.fn(ctx, *args)
+            else:
+                output = analyzer.fn(ctx, *args)
+        return output, start_ns, time.time_ns()
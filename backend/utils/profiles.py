@@ -0,0 +1,85 @@
+import os
+from typing import Dict, Optional
+
+# Default profile when a request doesn't name one ("auto" picks from load)
+DEFAULT_PROFILE = os.getenv("ANALYSIS_PROFILE", "balanced").lower()
+# "auto" switches to the fast profile once this many jobs per worker are ahead
+AUTO_FAST_LOAD = float(os.getenv("ANALYSIS_AUTO_FAST_LOAD", "1.0"))
+# Frame intervals below assume camera-rate video; recordings under
+# LOW_FPS_THRESHOLD (client-reduced uploads, frame sequences) are sampled at
+# the same rate in time instead
+REFERENCE_FPS = 30.0
+LOW_FPS_THRESHOLD = 20.0
+# Per-sample facial counts (blinks) were calibrated on every 15th frame of
+# camera-rate video; they are scaled to this sampling rate so the profile
+# only changes their precision
+REFERENCE_FACE_SAMPLES_PER_SECOND = REFERENCE_FPS / 15
+
+
+class AnalysisProfile:
+    """Named quality/latency trade-off for one analysis run"""
+
+    def __init__(self, name: str, face_frame_interval: int, body_frame_interval: int,
+                 max_frame_width: Optional[int], pose_complexity: int,
+                 run_deepface: bool, run_body: bool, full_audio_features: bool):
+        self.name = name
+        self.face_frame_interval = face_frame_interval  # analyze every Nth frame for facial cues
+        self.body_frame_interval = body_frame_interval  # analyze every Nth frame for pose
+        self.max_frame_width = max_frame_width          # downscale wider frames (None = native)
+        self.pose_complexity = pose_complexity          # MediaPipe Pose model_complexity (0-2)
+        self.run_deepface = run_deepface                # DeepFace smile analysis (slowest facial step)
+        self.run_body = run_body                        # MediaPipe body language analysis
+        self.full_audio_features = full_audio_features  # also extract MFCCs (not used for scoring)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "face_frame_interval": self.face_frame_interval,
+            "body_frame_interval": self.body_frame_interval,
+            "max_frame_width": self.max_frame_width,
+            "pose_complexity": self.pose_complexity,
+            "run_deepface": self.run_deepface,
+            "run_body": self.run_body,
+            "full_audio_features": self.full_audio_features
+        }
+
+
+PROFILES = {
+    # Peak-hour setting: sparse sampling, downscaled frames, lite pose, no DeepFace
+    "fast": AnalysisProfile("fast", face_frame_interval=30, body_frame_interval=40, max_frame_width=480,
+                            pose_complexity=0, run_deepface=False, run_body=True, full_audio_features=False),
+    # Original pipeline settings
+    "balanced": AnalysisProfile("balanced", face_frame_interval=15, body_frame_interval=20, max_frame_width=None,
+                                pose_complexity=1, run_deepface=True, run_body=True, full_audio_features=False),
+    # Off-peak / re-scoring setting: dense sampling and the heavy pose model
+    "thorough": AnalysisProfile("thorough", face_frame_interval=5, body_frame_interval=10, max_frame_width=None,
+                                pose_complexity=2, run_deepface=True, run_body=True, full_audio_features=True),
+}
+
+
+def frame_interval(interval: int, fps: Optional[float]) -> int:
+    """Profile frame interval adjusted for a low-frame-rate source"""
+    if fps and 0 < fps < LOW_FPS_THRESHOLD:
+        return max(1, round(interval * fps / REFERENCE_FPS))
+    return interval
+
+
+def get_profile(name: Optional[str] = None) -> AnalysisProfile:
+    """Look up a profile by name (None = balanced); raises ValueError for unknown names"""
+    key = (name or "balanced").lower()
+    if key not in PROFILES:
+        raise ValueError(f"Unknown analysis profile '{name}'. Choose from: {', '.join(PROFILES)} or auto")
+    return PROFILES[key]
+
+
+def select_profile(requested: Optional[str], jobs_ahead: int, workers: int) -> AnalysisProfile:
+    """Resolve the profile for a request.
+
+    An explicit name wins; "auto" (or no name with ANALYSIS_PROFILE=auto) picks
+    fast when the backlog per worker reaches ANALYSIS_AUTO_FAST_LOAD, else balanced.
+    """
+    name = (requested or DEFAULT_PROFILE).lower()
+    if name != "auto":
+        return get_profile(name)
+    load = jobs_ahead / max(1, workers)
+    return PROFILES["fast"] if load >= AUTO_FAST_LOAD else PROFILES["balanced"]
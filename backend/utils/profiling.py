@@ -0,0 +1,254 @@
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# Opt-in sampling profiler for single analyses.
+#
+# A background thread snapshots the stacks of the threads working on one
+# analysis (the thread running final_confidence_score and the DAG pool
+# threads, which attach themselves through the trace) every
+# PROFILE_INTERVAL_MS. Other analyses running at the same time are not
+# sampled. The result is stored as collapsed stacks (flamegraph.pl /
+# speedscope input) plus the top hot functions, and linked from the
+# result's performance block.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(PROJECT_ROOT, "data", "profiles"))
+# Fraction of analyses profiled without being asked (changeable at runtime via /admin/profiling)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "10"))
+PROFILE_TOP_N = int(os.getenv("PROFILE_TOP_N", "25"))
+# Newest profiles kept on disk
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+# Samples whose innermost Python frame is in one of these modules are
+# blocked (waiting on a lock, future, queue or socket), not working: the
+# thread running final_confidence_score spends most of a run in the DAG
+# scheduler's wait(). They stay in the collapsed stacks but aren't ranked.
+WAIT_MODULES = ("threading.py", "queue.py", "selectors.py")
+
+
+class SamplingProfiler:
+    """Periodically samples the stacks of attached threads"""
+
+    def __init__(self, profile_id: str, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.profile_id = profile_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.thread_samples: Counter = Counter()
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{profile_id[:8]}", daemon=True)
+        self.started_at = None
+        self.elapsed = 0.0
+
+    def attach(self, thread: Optional[threading.Thread] = None):
+        thread = thread or threading.current_thread()
+        with self._lock:
+            self._threads[thread.ident] = thread.name
+
+    def detach(self, thread: Optional[threading.Thread] = None):
+        thread = thread or threading.current_thread()
+        with self._lock:
+            self._threads.pop(thread.ident, None)
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        self.elapsed = time.perf_counter() - self.started_at
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            with self._lock:
+                threads = dict(self._threads)
+            if not threads:
+                continue
+            frames = sys._current_frames()
+            self.samples += 1
+            for ident, name in threads.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(name)
+                self.stacks[";".join(reversed(stack))] += 1
+                self.thread_samples[name] += 1
+
+    def collapsed(self) -> str:
+        """Folded stacks, one "root;...;leaf count" line each"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    @staticmethod
+    def _is_waiting(frame: str) -> bool:
+        """Whether a "name (file:line)" frame is inside a blocking primitive"""
+        return frame.rpartition("(")[2].split(":")[0] in WAIT_MODULES
+
+    def waiting_samples(self) -> int:
+        return sum(count for stack, count in self.stacks.items() if self._is_waiting(stack.rpartition(";")[2]))
+
+    def top_functions(self, n: int = PROFILE_TOP_N) -> List[Dict]:
+        """Hottest functions by self samples, with inclusive samples alongside.
+
+        Samples blocked in a wait or lock (WAIT_MODULES) are left out, so
+        percentages are of the samples where a thread was working.
+        """
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")[1:]  # first entry is the thread
+            if not frames or self._is_waiting(frames[-1]):
+                continue
+            own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        total = (sum(self.thread_samples.values()) - self.waiting_samples()) or 1
+        return [{
+            "function": function,
+            "self_samples": count,
+            "self_percent": round(count / total * 100, 2),
+            "total_samples": inclusive[function],
+            "total_percent": round(inclusive[function] / total * 100, 2),
+            "self_seconds": round(count * self.interval, 3),
+        } for function, count in own.most_common(n)]
+
+
+_active: Dict[str, SamplingProfiler] = {}
+_active_lock = threading.Lock()
+_settings_lock = threading.Lock()
+_settings = {"sample_rate": PROFILE_SAMPLE_RATE, "pending": 0}
+
+
+def get_settings() -> Dict:
+    with _settings_lock:
+        return dict(_settings)
+
+
+def configure(sample_rate: Optional[float] = None, next_runs: Optional[int] = None) -> Dict:
+    """Change the sampling rate and/or profile the next next_runs analyses unconditionally"""
+    with _settings_lock:
+        if sample_rate is not None:
+            _settings["sample_rate"] = min(1.0, max(0.0, sample_rate))
+        if next_runs is not None:
+            _settings["pending"] = max(0, next_runs)
+        return dict(_settings)
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Decide whether to profile an analysis (explicit request, pending runs, then the sampling rate)"""
+    if requested:
+        return True
+    with _settings_lock:
+        if _settings["pending"] > 0:
+            _settings["pending"] -= 1
+            return True
+        return _settings["sample_rate"] > 0 and random.random() < _settings["sample_rate"]
+
+
+def start(trace) -> SamplingProfiler:
+    """Start profiling the analysis recorded by trace from the calling thread"""
+    profiler = SamplingProfiler(trace.trace_id)
+    profiler.attach()
+    with _active_lock:
+        _active[trace.trace_id] = profiler
+    profiler.start()
+    return profiler
+
+
+@contextmanager
+def attach(trace):
+    """Include the calling thread in trace's profile (if it is being profiled) for the block"""
+    with _active_lock:
+        profiler = _active.get(getattr(trace, "trace_id", None))
+    if profiler is None:
+        yield
+        return
+    profiler.attach()
+    try:
+        yield
+    finally:
+        profiler.detach()
+
+
+def finish(trace) -> Optional[Dict]:
+    """Stop trace's profiler, store its output and return the summary for the performance block"""
+    with _active_lock:
+        profiler = _active.pop(trace.trace_id, None)
+    if profiler is None:
+        return None
+    profiler.stop()
+    summary = {
+        "profile_id": profiler.profile_id,
+        "interval_ms": round(profiler.interval * 1000, 2),
+        "duration_seconds": round(profiler.elapsed, 3),
+        "samples": profiler.samples,
+        "threads": dict(profiler.thread_samples),
+        "waiting_samples": profiler.waiting_samples(),
+        "top_functions": profiler.top_functions(),
+        "collapsed_url": f"/admin/profiles/{profiler.profile_id}?format=collapsed",
+        "url": f"/admin/profiles/{profiler.profile_id}",
+    }
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        with open(os.path.join(PROFILE_DIR, profiler.profile_id + ".folded"), "w") as f:
+            f.write(profiler.collapsed())
+        with open(os.path.join(PROFILE_DIR, profiler.profile_id + ".json"), "w") as f:
+            json.dump(dict(summary, created_at=time.time()), f, indent=2)
+        _prune()
+    except OSError as e:
+        print(f"Could not store profile {profiler.profile_id}: {e}")
+        summary["stored"] = False
+    # Inline copy stays short; the stored one has the full top-N
+    summary["top_functions"] = summary["top_functions"][:10]
+    return summary
+
+
+def _prune():
+    profiles = sorted((entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")),
+                      key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in profiles[PROFILE_KEEP:]:
+        for suffix in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, entry.name[:-len(".json")] + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def profile_path(profile_id: str, collapsed: bool = False) -> Optional[str]:
+    """Stored file of a profile, or None if it doesn't exist"""
+    # Profile ids are trace ids (uuid hex); anything else can't be one of ours
+    if not profile_id.isalnum():
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + (".folded" if collapsed else ".json"))
+    return path if os.path.exists(path) else None
+
+
+def list_profiles(limit: int = 50) -> List[Dict]:
+    """Newest stored profiles (id, creation time, duration, samples)"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    entries = sorted((entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".json")),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)[:limit]
+    profiles = []
+    for entry in entries:
+        try:
+            with open(entry.path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({key: data.get(key) for key in ("profile_id", "created_at", "duration_seconds", "samples",
+                                                         "url", "collapsed_url")})
+    return profiles
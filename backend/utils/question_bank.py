@@ -0,0 +1,150 @@
+import json
+import os
+import random
+import hashlib
+import threading
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, List, Optional
+
+# Get the project root directory (go up from utils/question_bank.py to project root)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+QUESTIONS_DIR = os.path.join(PROJECT_ROOT, "data", "questions")
+
+# Map interview types to file names
+QUESTION_FILES = {
+    "hr": "hr_questions.json",
+    "technical": "technical_questions.json",
+    "behavioral": "behavioral_questions.json"
+}
+
+# Upper bound for pre-serialised filtered responses kept per bank
+MAX_FILTERED_VARIANTS = 64
+
+
+def _serialize(data) -> bytes:
+    """Serialise a payload to compact UTF-8 JSON bytes"""
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _make_etag(payload: bytes) -> str:
+    """Strong ETag derived from the response body"""
+    return '"' + hashlib.sha1(payload).hexdigest() + '"'
+
+
+class QuestionBankEntry:
+    """In-memory copy of one question bank file plus its pre-serialised body"""
+
+    def __init__(self, interview_type: str, data: Dict, mtime_ns: int, size: int):
+        self.interview_type = interview_type
+        self.data = data
+        self.questions: List[Dict] = data.get("questions", [])
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.body = _serialize(data)
+        self.etag = _make_etag(self.body)
+        self.last_modified = formatdate(mtime_ns / 1e9, usegmt=True)
+        self._filtered: Dict[tuple, tuple] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, difficulty: Optional[str] = None, category: Optional[str] = None) -> List[Dict]:
+        """Return the questions matching the given difficulty/category"""
+        questions = self.questions
+        if difficulty:
+            questions = [q for q in questions if q.get("difficulty") == difficulty]
+        if category:
+            category_lower = category.lower()
+            questions = [q for q in questions if str(q.get("category", "")).lower() == category_lower]
+        return questions
+
+    def filtered_body(self, difficulty: Optional[str], category: Optional[str]) -> tuple:
+        """Pre-serialised (body, etag) for a deterministic filter, memoised per bank version"""
+        key = (difficulty or "", (category or "").lower())
+        cached = self._filtered.get(key)
+        if cached is not None:
+            return cached
+
+        payload = {"interviewType": self.data.get("interviewType", self.interview_type),
+                   "questions": self.filter(difficulty, category)}
+        body = _serialize(payload)
+        result = (body, _make_etag(body))
+        with self._lock:
+            if len(self._filtered) < MAX_FILTERED_VARIANTS:
+                self._filtered[key] = result
+        return result
+
+
+class QuestionBank:
+    """Loads question banks once and reloads a bank when its file changes on disk"""
+
+    def __init__(self, questions_dir: str = QUESTIONS_DIR, files: Dict[str, str] = None):
+        self.questions_dir = questions_dir
+        self.files = files or QUESTION_FILES
+        self._entries: Dict[str, QuestionBankEntry] = {}
+        self._lock = threading.Lock()
+
+    def is_valid_type(self, interview_type: str) -> bool:
+        return interview_type in self.files
+
+    def path_for(self, interview_type: str) -> str:
+        return os.path.join(self.questions_dir, self.files[interview_type])
+
+    def get(self, interview_type: str) -> QuestionBankEntry:
+        """Return the cached bank, reloading it if the file's mtime or size changed.
+
+        Raises KeyError for unknown interview types and FileNotFoundError if the
+        bank file is missing.
+        """
+        if interview_type not in self.files:
+            raise KeyError(interview_type)
+
+        file_path = self.path_for(interview_type)
+        stat = os.stat(file_path)
+
+        entry = self._entries.get(interview_type)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(interview_type)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entry = QuestionBankEntry(interview_type, data, stat.st_mtime_ns, stat.st_size)
+            self._entries[interview_type] = entry
+        return entry
+
+    def preload(self):
+        """Load every known bank into memory (missing files are skipped)"""
+        for interview_type in self.files:
+            try:
+                self.get(interview_type)
+            except (FileNotFoundError, json.JSONDecodeError) as e:
+                print(f"Question bank preload failed for {interview_type}: {e}")
+
+    def sample(self, interview_type: str, n: int, difficulty: Optional[str] = None,
+               category: Optional[str] = None) -> Dict:
+        """Random sample of up to n questions matching the filters"""
+        entry = self.get(interview_type)
+        questions = entry.filter(difficulty, category)
+        n = max(0, min(n, len(questions)))
+        return {"interviewType": entry.data.get("interviewType", interview_type),
+                "questions": random.sample(questions, n)}
+
+
+def is_not_modified(etag: str, last_modified: str, if_none_match: Optional[str],
+                    if_modified_since: Optional[str]) -> bool:
+    """Evaluate conditional request headers (If-None-Match takes precedence)"""
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or ("W/" + etag) in candidates
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+# Global question bank instance
+question_bank = QuestionBank()
@@ -0,0 +1,80 @@
+import gzip
+import json
+import os
+import threading
+from typing import Dict, Iterable, List
+
+from utils.metrics import DATASTORE_LATENCY
+
+# Cold tier for old sessions: full session records in one gzip-compressed
+# JSONL segment per month (sessions-YYYY-MM.jsonl.gz). sessions.json keeps
+# their summary fields and an "archived" month, so listings and stats never
+# open the archive; only requests for an archived session's
+# detailed_metrics read its month's segment.
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SESSION_ARCHIVE_DIR = os.getenv("SESSION_ARCHIVE_DIR", os.path.join(PROJECT_ROOT, "data", "archive"))
+SESSION_ARCHIVE_AFTER_DAYS = float(os.getenv("SESSION_ARCHIVE_AFTER_DAYS", "90"))
+# Decoded segments kept in memory for repeated history reads
+SEGMENT_CACHE_SIZE = 4
+
+
+class SessionArchive:
+    """Monthly compressed segments of archived session records"""
+
+    def __init__(self, directory: str = SESSION_ARCHIVE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # month -> (mtime_ns, {session_id: record}), most recently used last
+        self._cache: Dict[str, tuple] = {}
+
+    def segment_path(self, month: str) -> str:
+        return os.path.join(self.directory, f"sessions-{month}.jsonl.gz")
+
+    def months(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name[len("sessions-"):-len(".jsonl.gz")] for name in os.listdir(self.directory)
+                      if name.startswith("sessions-") and name.endswith(".jsonl.gz"))
+
+    def append(self, month: str, records: Iterable[Dict]):
+        """Add full session records to a month's segment, durably.
+
+        Each call appends one gzip member; readers see all members as one
+        stream. A record archived twice (after a crash before sessions.json
+        was rewritten) is read back once, the last copy winning.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock, DATASTORE_LATENCY.time(store="archive", operation="write"):
+            with open(self.segment_path(month), "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                    for record in records:
+                        f.write((json.dumps(record, separators=(",", ":")) + "\n").encode())
+                raw.flush()
+                os.fsync(raw.fileno())
+
+    def records(self, month: str) -> Dict[str, Dict]:
+        """{session_id: full record} of one month (empty if the month has no segment)"""
+        path = self.segment_path(month)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        with self._lock:
+            cached = self._cache.pop(month, None)
+            if cached is not None and cached[0] == mtime:
+                self._cache[month] = cached
+                return cached[1]
+        records = {}
+        with DATASTORE_LATENCY.time(store="archive", operation="read"), gzip.open(path, "rt") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    records[record["id"]] = record
+        with self._lock:
+            self._cache[month] = (mtime, records)
+            while len(self._cache) > SEGMENT_CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+        return records
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(self.segment_path(month)) for month in self.months())
@@ -0,0 +1,184 @@
+import json
+import os
+import sys
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+try:
+    from opentelemetry import trace as otel_trace
+    OPENTELEMETRY_AVAILABLE = True
+except ImportError:
+    OPENTELEMETRY_AVAILABLE = False
+
+# Exporter selection: "none" (default), "stdout" or "otel"
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+
+
+class StageRecord:
+    """Aggregated timing for one named stage of an analysis run.
+
+    A stage may be entered many times (e.g. once per sampled frame); calls and
+    total_seconds accumulate, start/end cover the first entry to the last exit.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.total_seconds = 0.0
+        self.start_ns: Optional[int] = None
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, start_ns: int, end_ns: int):
+        with self._lock:
+            self.calls += 1
+            self.total_seconds += (end_ns - start_ns) / 1e9
+            if self.start_ns is None or start_ns < self.start_ns:
+                self.start_ns = start_ns
+            if self.end_ns is None or end_ns > self.end_ns:
+                self.end_ns = end_ns
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def increment(self, key: str, amount: int = 1):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def to_dict(self) -> Dict:
+        return {
+            "seconds": round(self.total_seconds, 4),
+            "calls": self.calls,
+            **self.attributes
+        }
+
+
+class Trace:
+    """Collects per-stage spans for one analysis run; safe to share across worker threads"""
+
+    def __init__(self, name: str = "analysis", exporter=None):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.exporter = exporter
+        self.stages: Dict[str, StageRecord] = {}
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> StageRecord:
+        """Get (or create) the record for a stage"""
+        record = self.stages.get(name)
+        if record is None:
+            with self._lock:
+                record = self.stages.setdefault(name, StageRecord(name))
+        return record
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a block and add it to the named stage"""
+        record = self.stage(name)
+        for key, value in attributes.items():
+            record.set_attribute(key, value)
+        start_ns = time.time_ns()
+        try:
+            yield record
+        finally:
+            record.add_time(start_ns, time.time_ns())
+
+    def finish(self):
+        """Close the trace and hand its stages to the exporter"""
+        self.end_ns = time.time_ns()
+        exporter = self.exporter or get_exporter()
+        try:
+            exporter.export(self)
+        except Exception as e:
+            print(f"Trace export error: {e}")
+
+    def to_dict(self) -> Dict:
+        return {name: record.to_dict() for name, record in self.stages.items()}
+
+
+class NoopExporter:
+    """Drops traces (default)"""
+
+    def export(self, trace: Trace):
+        pass
+
+
+class StdoutExporter:
+    """Writes one JSON line per stage, for local debugging and log shipping"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def export(self, trace: Trace):
+        for record in trace.stages.values():
+            self.stream.write(json.dumps({
+                "trace_id": trace.trace_id,
+                "trace": trace.name,
+                "span": record.name,
+                "start_ns": record.start_ns,
+                "end_ns": record.end_ns,
+                **record.to_dict()
+            }) + "\n")
+        self.stream.flush()
+
+
+class OpenTelemetryExporter:
+    """Re-emits stages as OpenTelemetry spans under one root span.
+
+    Uses whatever TracerProvider the process has configured; without one the
+    OpenTelemetry API is itself a no-op.
+    """
+
+    def __init__(self, tracer_name: str = "confidencelab.analysis"):
+        if not OPENTELEMETRY_AVAILABLE:
+            raise RuntimeError("opentelemetry-api is not installed")
+        self.tracer = otel_trace.get_tracer(tracer_name)
+
+    def export(self, trace: Trace):
+        root = self.tracer.start_span(trace.name, start_time=trace.start_ns,
+                                      attributes={"confidencelab.trace_id": trace.trace_id})
+        context = otel_trace.set_span_in_context(root)
+        for record in trace.stages.values():
+            if record.start_ns is None:
+                continue
+            attributes = {k: v for k, v in record.to_dict().items() if isinstance(v, (str, bool, int, float))}
+            span = self.tracer.start_span(record.name, context=context, start_time=record.start_ns,
+                                          attributes=attributes)
+            span.end(end_time=record.end_ns)
+        root.end(end_time=trace.end_ns or time.time_ns())
+
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+
+def _exporter_from_env():
+    if TRACING_EXPORTER == "stdout":
+        return StdoutExporter()
+    if TRACING_EXPORTER == "otel":
+        if OPENTELEMETRY_AVAILABLE:
+            return OpenTelemetryExporter()
+        print("Warning: TRACING_EXPORTER=otel but opentelemetry is not installed. Tracing disabled.")
+    return NoopExporter()
+
+
+def get_exporter():
+    """Process-wide exporter, chosen from TRACING_EXPORTER on first use"""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                _exporter = _exporter_from_env()
+    return _exporter
+
+
+def set_exporter(exporter):
+    """Install a custom exporter (any object with an export(trace) method)"""
+    global _exporter
+    with _exporter_lock:
+        _exporter = exporter
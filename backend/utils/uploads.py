@@ -0,0 +1,318 @@
+import base64
+import binascii
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from utils import admission
+
+# Resumable uploads: the client creates an upload, PATCHes chunks at the
+# current offset (re-sending only what the server didn't acknowledge after
+# a dropped connection) and finalizes it. Chunks go straight to local disk.
+# While chunks arrive they are also piped into ffmpeg, so by the time the
+# last chunk lands the 16 kHz audio is already extracted (streamable
+# containers such as browser webm; others fall back to normal extraction).
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(tempfile.gettempdir(), "confidencelab-uploads"))
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+UPLOAD_CHUNK_MAX_BYTES = int(float(os.getenv("UPLOAD_CHUNK_MAX_MB", "16")) * 1024 * 1024)
+UPLOAD_EARLY_AUDIO = os.getenv("UPLOAD_EARLY_AUDIO", "true").lower() in ("1", "true", "yes")
+
+
+class UploadError(Exception):
+    """Protocol error for a resumable upload; status_code is the HTTP status to return"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _decode_digest(value: str) -> bytes:
+    """Digest given as hex or base64"""
+    value = value.strip()
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        pass
+    try:
+        return base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise UploadError(400, "Checksum must be hex or base64")
+
+
+def verify_checksum(data: bytes, header: Optional[str]):
+    """Check an Upload-Checksum header ("sha256 <digest>") against a chunk"""
+    if not header:
+        return
+    algorithm, _, digest = header.strip().partition(" ")
+    if algorithm.lower() != "sha256":
+        raise UploadError(400, f"Unsupported checksum algorithm '{algorithm}' (use sha256)")
+    if hashlib.sha256(data).digest() != _decode_digest(digest):
+        raise UploadError(460, "Chunk checksum mismatch")
+
+
+class UploadSession:
+    """Metadata of one resumable upload, stored as <id>.json next to <id>.part"""
+
+    def __init__(self, id: str, filename: str, extension: str, length: Optional[int] = None,
+                 sha256: Optional[str] = None, offset: int = 0, created_at: float = None,
+                 updated_at: float = None):
+        self.id = id
+        self.filename = filename
+        self.extension = extension
+        self.length = length
+        self.sha256 = sha256
+        self.offset = offset
+        self.created_at = created_at or time.time()
+        self.updated_at = updated_at or self.created_at
+
+    @property
+    def complete(self) -> bool:
+        return self.length is not None and self.offset == self.length
+
+    def to_dict(self) -> Dict:
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "offset": self.offset,
+            "length": self.length,
+            "complete": self.complete,
+            "chunk_max_bytes": UPLOAD_CHUNK_MAX_BYTES,
+        }
+
+
+class EarlyAudioExtractor:
+    """ffmpeg reading the upload from a pipe as it arrives and writing 16 kHz mono WAV.
+
+    Fails quietly (failed = True) when the container can't be read as a
+    stream, e.g. MP4 with its index at the end.
+    """
+
+    def __init__(self, audio_path: str):
+        self.audio_path = audio_path
+        self.failed = False
+        self._process = subprocess.Popen(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", "pipe:0", "-vn",
+             "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", audio_path],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    def feed(self, data: bytes):
+        if self.failed:
+            return
+        try:
+            self._process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            self.failed = True
+
+    def finish(self, timeout: float = 30.0) -> Optional[str]:
+        """Close the input and wait; the WAV path if extraction succeeded"""
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            code = self._process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            code = -1
+        if self.failed or code != 0 or not os.path.exists(self.audio_path) or os.path.getsize(self.audio_path) <= 44:
+            return None
+        return self.audio_path
+
+    def abort(self):
+        self.failed = True
+        self._process.kill()
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        self._process.wait()
+
+
+class UploadStore:
+    """Resumable uploads on local disk.
+
+    Chunks for one upload are serialised by a per-upload lock; metadata is
+    rewritten atomically after each chunk, so a crash loses at most the
+    chunk in flight and the client resumes from the stored offset.
+    """
+
+    def __init__(self, directory: str = UPLOAD_SESSION_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._extractors: Dict[str, EarlyAudioExtractor] = {}
+
+    def _path(self, upload_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, upload_id + suffix)
+
+    def _lock(self, upload_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _save(self, session: UploadSession):
+        session.updated_at = time.time()
+        tmp_path = self._path(session.id, ".json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(vars(session), f)
+        os.replace(tmp_path, self._path(session.id, ".json"))
+
+    def create(self, filename: Optional[str], length: Optional[int] = None,
+               sha256: Optional[str] = None) -> UploadSession:
+        """Start an upload; length (total bytes) and sha256 (hex) of the whole file are optional"""
+        self.expire()
+        extension = admission.check_extension(filename)
+        if length is not None and length > admission.UPLOAD_MAX_BYTES:
+            raise admission.AdmissionError(413, f"Upload exceeds the {admission.UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit",
+                                           "size")
+        if sha256 is not None:
+            sha256 = _decode_digest(sha256).hex()
+        session = UploadSession(uuid.uuid4().hex, filename or "video" + extension, extension, length, sha256)
+        open(self._path(session.id, ".part"), "wb").close()
+        self._save(session)
+        return session
+
+    def get(self, upload_id: str) -> UploadSession:
+        # Upload ids are uuid hex; anything else can't be a file of ours
+        if not upload_id.isalnum():
+            raise UploadError(404, "Upload not found")
+        try:
+            with open(self._path(upload_id, ".json")) as f:
+                return UploadSession(**json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            raise UploadError(404, "Upload not found")
+
+    def append(self, upload_id: str, offset: int, data: bytes, checksum: Optional[str] = None) -> UploadSession:
+        """Write a chunk at offset, which must equal the bytes received so far"""
+        if len(data) > UPLOAD_CHUNK_MAX_BYTES:
+            raise UploadError(413, f"Chunks are limited to {UPLOAD_CHUNK_MAX_BYTES} bytes")
+        verify_checksum(data, checksum)
+        with self._lock(upload_id):
+            session = self.get(upload_id)
+            if offset != session.offset:
+                raise UploadError(409, f"Offset mismatch: upload is at {session.offset}")
+            end = offset + len(data)
+            if session.length is not None and end > session.length:
+                raise UploadError(413, "Chunk goes past the declared upload length")
+            if end > admission.UPLOAD_MAX_BYTES:
+                raise admission.AdmissionError(413, f"Upload exceeds the {admission.UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit",
+                                               "size")
+            with open(self._path(upload_id, ".part"), "r+b") as f:
+                # Bytes past the stored offset are a torn earlier write; overwrite them
+                f.seek(offset)
+                f.write(data)
+                f.truncate()
+                f.flush()
+                os.fsync(f.fileno())
+            previous_offset = session.offset
+            session.offset = end
+            self._save(session)
+            # After the offset is stored, so a retried chunk is never fed to ffmpeg twice
+            self._feed_audio(session, previous_offset, data)
+            return session
+
+    def _feed_audio(self, session: UploadSession, offset: int, data: bytes):
+        if not UPLOAD_EARLY_AUDIO:
+            return
+        extractor = self._extractors.get(session.id)
+        if extractor is None:
+            if session.id in self._extractors:
+                return  # already gave up on this upload
+            try:
+                extractor = EarlyAudioExtractor(self._path(session.id, ".wav"))
+            except FileNotFoundError:
+                self._extractors[session.id] = None  # no ffmpeg
+                return
+            self._extractors[session.id] = extractor
+            if offset:
+                # Started after a restart: replay the prefix already on disk
+                with open(self._path(session.id, ".part"), "rb") as f:
+                    remaining = offset
+                    while remaining > 0 and not extractor.failed:
+                        block = f.read(min(remaining, 1024 * 1024))
+                        if not block:
+                            break
+                        extractor.feed(block)
+                        remaining -= len(block)
+        extractor.feed(data)
+
+    def finalize(self, upload_id: str, destination_dir: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """Verify a finished upload and hand it over as (video_path, audio_path or None).
+
+        The files move to destination_dir (default the upload directory) and
+        belong to the caller from then on.
+        """
+        with self._lock(upload_id):
+            session = self.get(upload_id)
+            part_path = self._path(upload_id, ".part")
+            # The stored offset is authoritative; drop any torn write past it
+            size = session.offset
+            with open(part_path, "r+b") as f:
+                f.truncate(size)
+            if session.length is not None and size != session.length:
+                raise UploadError(409, f"Upload incomplete: {size} of {session.length} bytes received")
+            if size == 0:
+                raise UploadError(409, "Upload is empty")
+            if session.sha256 is not None:
+                digest = hashlib.sha256()
+                with open(part_path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        digest.update(block)
+                if digest.hexdigest() != session.sha256:
+                    raise UploadError(460, "Upload checksum mismatch; re-upload the file")
+
+            extractor = self._extractors.pop(upload_id, None)
+            audio_path = extractor.finish() if extractor is not None else None
+
+            destination_dir = destination_dir or self.directory
+            os.makedirs(destination_dir, exist_ok=True)
+            video_path = os.path.join(destination_dir, upload_id + session.extension)
+            shutil.move(part_path, video_path)
+            if audio_path is not None:
+                shutil.move(audio_path, os.path.join(destination_dir, upload_id + ".wav"))
+                audio_path = os.path.join(destination_dir, upload_id + ".wav")
+            else:
+                self._remove(self._path(upload_id, ".wav"))
+            self._remove(self._path(upload_id, ".json"))
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+        return video_path, audio_path
+
+    def discard(self, upload_id: str):
+        self.get(upload_id)
+        with self._lock(upload_id):
+            extractor = self._extractors.pop(upload_id, None)
+            if extractor is not None:
+                extractor.abort()
+            for suffix in (".part", ".wav", ".json"):
+                self._remove(self._path(upload_id, suffix))
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+    def expire(self):
+        """Delete uploads not touched for UPLOAD_SESSION_TTL_HOURS"""
+        cutoff = time.time() - UPLOAD_SESSION_TTL_HOURS * 3600
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            try:
+                if os.path.getmtime(os.path.join(self.directory, name)) < cutoff:
+                    self.discard(upload_id)
+            except (OSError, UploadError):
+                continue
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -1,9 +1,17 @@
 import json
 import os
 import hashlib
-from datetime import datetime
-from typing import Dict, List, Optional
+import hmac
+import base64
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
 import uuid
+from utils.metrics import DATASTORE_LATENCY
+from utils.cohort import CohortIndex
+from utils.session_archive import SESSION_ARCHIVE_AFTER_DAYS, SessionArchive
 
 # File paths - use absolute paths to avoid confusion
 import os
@@ -26,30 +34,107 @@ def ensure_data_files():
         with open(SESSIONS_FILE, 'w') as f:
             json.dump({}, f)
 
-def hash_password(password: str) -> str:
-    """Hash password using SHA-256"""
-    return hashlib.sha256(password.encode()).hexdigest()
+# Password hashing (scrypt KDF). Cost can be tuned per deployment; see
+# benchmarks/login_benchmark.py for picking a value that fits the login budget.
+SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+SALT_BYTES = 16
+HASH_BYTES = 32
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+# Bounded pool so KDF work never runs on (or floods) the event loop
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="kdf")
+
+# Serialises read-modify-write of the users file for password upgrades
+_users_lock = threading.Lock()
+
+def _b64encode(raw: bytes) -> str:
+    return base64.b64encode(raw).decode("ascii")
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2), dklen=HASH_BYTES)
+
+def hash_password(password: str, n: int = None, r: int = None, p: int = None) -> str:
+    """Hash password with salted scrypt, encoded as scrypt$n$r$p$salt$hash"""
+    n = n or SCRYPT_N
+    r = r or SCRYPT_R
+    p = p or SCRYPT_P
+    salt = os.urandom(SALT_BYTES)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"scrypt${n}${r}${p}${_b64encode(salt)}${_b64encode(digest)}"
+
+def _is_legacy_hash(stored_hash: str) -> bool:
+    """Legacy hashes are bare unsalted SHA-256 hex digests"""
+    return len(stored_hash) == 64 and "$" not in stored_hash
+
+def verify_password(password: str, stored_hash: str) -> Tuple[bool, bool]:
+    """Check password against a stored hash.
+
+    Returns (matches, needs_rehash). needs_rehash is True for legacy SHA-256
+    hashes and for scrypt hashes created with different cost parameters.
+    """
+    if not stored_hash:
+        return False, False
+
+    if _is_legacy_hash(stored_hash):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored_hash), True
+
+    try:
+        scheme, n, r, p, salt_b64, hash_b64 = stored_hash.split("$")
+        if scheme != "scrypt":
+            return False, False
+        n, r, p = int(n), int(r), int(p)
+        salt = base64.b64decode(salt_b64)
+        expected = base64.b64decode(hash_b64)
+    except (ValueError, TypeError):
+        return False, False
+
+    digest = _scrypt(password, salt, n, r, p)
+    matches = hmac.compare_digest(digest, expected)
+    needs_rehash = (n, r, p) != (SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return matches, needs_rehash
+
+def _upgrade_password_hash(email: str, old_hash: str, password: str):
+    """Replace a stale hash after a successful login, unless it changed meanwhile"""
+    new_hash = hash_password(password)
+    with _users_lock:
+        users = load_users()
+        user = users.get(email)
+        if user is None or user.get("password") != old_hash:
+            return
+        user["password"] = new_hash
+        save_users(users)
 
 def load_users() -> Dict:
     """Load users from JSON file"""
     ensure_data_files()
     try:
-        with open(USERS_FILE, 'r') as f:
+        with DATASTORE_LATENCY.time(store="users", operation="read"), open(USERS_FILE, 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return {}
 
+def _write_json(path: str, data: Dict):
+    """Write to a temp file and rename it over path, so readers never see a half-written file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
 def save_users(users: Dict):
     """Save users to JSON file"""
     ensure_data_files()
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    with DATASTORE_LATENCY.time(store="users", operation="write"):
+        _write_json(USERS_FILE, users)
 
 def load_sessions() -> Dict:
     """Load sessions from JSON file"""
     ensure_data_files()
     try:
-        with open(SESSIONS_FILE, 'r') as f:
+        with DATASTORE_LATENCY.time(store="sessions", operation="read"), open(SESSIONS_FILE, 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return {}
@@ -57,18 +142,35 @@ def load_sessions() -> Dict:
 def save_sessions(sessions: Dict):
     """Save sessions to JSON file"""
     ensure_data_files()
-    with open(SESSIONS_FILE, 'w') as f:
-        json.dump(sessions, f, indent=2)
+    with DATASTORE_LATENCY.time(store="sessions", operation="write"):
+        _write_json(SESSIONS_FILE, sessions)
+
+# Old sessions' detailed_metrics live in monthly compressed segments
+session_archive = SessionArchive()
+
+def _with_details(session: Dict) -> Dict:
+    """session with its detailed_metrics, read from the archive if it was archived"""
+    if "archived" not in session or "detailed_metrics" in session:
+        return session
+    record = session_archive.records(session["archived"]).get(session["id"])
+    if record is None or "detailed_metrics" not in record:
+        return session
+    return dict(session, detailed_metrics=record["detailed_metrics"])
+
+def load_sessions_with_details() -> List[Dict]:
+    """Every session, archived ones with their detailed_metrics (reads the whole archive)"""
+    return [_with_details(session) for session in load_sessions().values()]
+
+# Score histograms for cohort percentiles, built from all sessions on first use
+cohort_index = CohortIndex(load_sessions_with_details)
 
 def create_user(name: str, email: str, password: str) -> Dict:
     """Create a new user"""
-    users = load_users()
-    
-    # Check if user already exists
-    if email in users:
+    if email in load_users():
         raise ValueError("User with this email already exists")
     
     user_id = str(uuid.uuid4())
+    # Hash outside the lock; the KDF is the slow part
     hashed_password = hash_password(password)
     
     user_data = {
@@ -80,8 +182,12 @@ def create_user(name: str, email: str, password: str) -> Dict:
         "sessions": []
     }
     
-    users[email] = user_data
-    save_users(users)
+    with _users_lock:
+        users = load_users()
+        if email in users:
+            raise ValueError("User with this email already exists")
+        users[email] = user_data
+        save_users(users)
     
     # Return user data without password
     return {
@@ -99,11 +205,15 @@ def authenticate_user(email: str, password: str) -> Optional[Dict]:
         return None
     
     user = users[email]
-    hashed_password = hash_password(password)
+    matches, needs_rehash = verify_password(password, user["password"])
     
-    if user["password"] != hashed_password:
+    if not matches:
         return None
     
+    # Transparently migrate legacy/outdated hashes to the current KDF settings
+    if needs_rehash:
+        _upgrade_password_hash(email, user["password"], password)
+    
     # Return user data without password
     return {
         "id": user["id"],
@@ -112,6 +222,16 @@ def authenticate_user(email: str, password: str) -> Optional[Dict]:
         "created_at": user["created_at"]
     }
 
+async def create_user_async(name: str, email: str, password: str) -> Dict:
+    """Create a user with the KDF running on the bounded password executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, create_user, name, email, password)
+
+async def authenticate_user_async(email: str, password: str) -> Optional[Dict]:
+    """Authenticate a user with the KDF running on the bounded password executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, authenticate_user, email, password)
+
 def get_user_by_id(user_id: str) -> Optional[Dict]:
     """Get user by ID"""
     users = load_users()
@@ -127,50 +247,82 @@ def get_user_by_id(user_id: str) -> Optional[Dict]:
     
     return None
 
-def add_session(user_id: str, topic: str, score: float, duration: int, question: str = None, detailed_metrics: Dict = None) -> Dict:
-    """Add a new session for a user"""
-    users = load_users()
-    sessions = load_sessions()
-    
-    # Find user by ID
-    user_email = None
-    for email, user in users.items():
-        if user["id"] == user_id:
-            user_email = email
-            break
-    
-    if not user_email:
-        raise ValueError("User not found")
-    
-    session_id = str(uuid.uuid4())
+def _new_session(user_id: str, topic: str, score: float, duration: int, question: str = None,
+                 detailed_metrics: Dict = None, interview_id: str = None) -> Dict:
     session_data = {
-        "id": session_id,
+        "id": str(uuid.uuid4()),
         "user_id": user_id,
         "topic": topic,
         "score": score,
         "duration": duration,
         "timestamp": datetime.now().isoformat()
     }
-    
+
     # Add optional fields
     if question:
         session_data["question"] = question
     if detailed_metrics:
         session_data["detailed_metrics"] = detailed_metrics
+    if interview_id:
+        session_data["interview_id"] = interview_id
+    return session_data
+
+def add_sessions(user_id: str, entries: List[Dict], interview_id: str = None) -> List[Dict]:
+    """Add several sessions for a user in one transaction.
+
+    entries are dicts with add_session's arguments (topic, score, duration,
+    question, detailed_metrics). Either all sessions are stored or, if the
+    user doesn't exist, none; both files are read and written once.
+    """
+    with _users_lock:
+        users = load_users()
+        sessions = load_sessions()
     
-    # Add to sessions file
-    sessions[session_id] = session_data
+        # Find user by ID
+        user_email = None
+        for email, user in users.items():
+            if user["id"] == user_id:
+                user_email = email
+                break
     
-    # Add to user's sessions list
-    users[user_email]["sessions"].append(session_id)
+        if not user_email:
+            raise ValueError("User not found")
     
-    save_sessions(sessions)
-    save_users(users)
+        created = [_new_session(user_id, interview_id=interview_id, **entry) for entry in entries]
+        for session_data in created:
+            # Add to sessions file and to the user's sessions list
+            sessions[session_data["id"]] = session_data
+            users[user_email]["sessions"].append(session_data["id"])
     
-    return session_data
+        # Sessions first: a crash in between leaves unlisted sessions, never dangling ids
+        save_sessions(sessions)
+        save_users(users)
+    
+        try:
+            cohort_index.add_sessions(created)
+        except OSError as e:
+            # The sessions are stored; percentiles just miss them until a rebuild
+            print(f"Could not update cohort histograms: {e}")
+    
+    return created
+
+def add_session(user_id: str, topic: str, score: float, duration: int, question: str = None, detailed_metrics: Dict = None) -> Dict:
+    """Add a new session for a user"""
+    return add_sessions(user_id, [{
+        "topic": topic,
+        "score": score,
+        "duration": duration,
+        "question": question,
+        "detailed_metrics": detailed_metrics,
+    }])[0]
 
-def get_user_sessions(user_id: str) -> List[Dict]:
-    """Get all sessions for a user"""
+def get_user_sessions(user_id: str, details: bool = True, since: str = None, until: str = None) -> List[Dict]:
+    """Get a user's sessions, newest first, optionally within [since, until) (ISO timestamps).
+
+    With details, archived sessions get their detailed_metrics back from the
+    archive (only the months in range are read); without, only the summary
+    fields kept in sessions.json are returned.
+    """
     users = load_users()
     sessions = load_sessions()
     
@@ -180,21 +332,66 @@ def get_user_sessions(user_id: str) -> List[Dict]:
         if user["id"] == user_id:
             for session_id in user["sessions"]:
                 if session_id in sessions:
-                    user_sessions.append(sessions[session_id])
+                    session = sessions[session_id]
+                    if since and session["timestamp"] < since or until and session["timestamp"] >= until:
+                        continue
+                    user_sessions.append(_with_details(session) if details else session)
             break
     
     return sorted(user_sessions, key=lambda x: x["timestamp"], reverse=True)
 
+def archive_old_sessions(older_than_days: float = None) -> Dict:
+    """Move detailed_metrics of sessions older than older_than_days to the monthly archive.
+
+    The summary fields (score, topic, duration, timestamp, ...) stay in
+    sessions.json with "archived": "YYYY-MM". Segments are written and
+    synced before sessions.json is rewritten, so a crash never loses data.
+    """
+    older_than_days = SESSION_ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+    with _users_lock:
+        size_before = os.path.getsize(SESSIONS_FILE) if os.path.exists(SESSIONS_FILE) else 0
+        sessions = load_sessions()
+        by_month: Dict[str, List[Dict]] = {}
+        for session in sessions.values():
+            if "detailed_metrics" in session and session.get("timestamp", "") < cutoff:
+                by_month.setdefault(session["timestamp"][:7], []).append(session)
+        if not by_month:
+            return {"archived": 0, "months": [], "sessions_file_bytes_before": size_before,
+                    "sessions_file_bytes": size_before, "archive_bytes": session_archive.size_bytes()}
+    
+        for month, records in sorted(by_month.items()):
+            session_archive.append(month, records)
+        for month, records in by_month.items():
+            for record in records:
+                hot = {key: value for key, value in record.items() if key != "detailed_metrics"}
+                hot["archived"] = month
+                sessions[record["id"]] = hot
+        save_sessions(sessions)
+    
+    archived = sum(len(records) for records in by_month.values())
+    print(f"Archived {archived} session(s) older than {older_than_days:g} days into {sorted(by_month)}")
+    return {
+        "archived": archived,
+        "months": sorted(by_month),
+        "sessions_file_bytes_before": size_before,
+        "sessions_file_bytes": os.path.getsize(SESSIONS_FILE),
+        "archive_bytes": session_archive.size_bytes(),
+    }
+
 def get_user_stats(user_id: str) -> Dict:
     """Get user statistics"""
-    sessions = get_user_sessions(user_id)
+    # Summary fields only, so archived months are never decompressed for stats
+    sessions = get_user_sessions(user_id, details=False)
     
     if not sessions:
         return {
             "total_sessions": 0,
             "avg_score": 0,
             "highest_score": 0,
-            "total_duration": 0
+            "total_duration": 0,
+            "avg_score_percentile": None,
+            "highest_score_percentile": None
         }
     
     total_sessions = len(sessions)
@@ -207,5 +404,9 @@ def get_user_stats(user_id: str) -> Dict:
         "total_sessions": total_sessions,
         "avg_score": avg_score,
         "highest_score": highest_score,
-        "total_duration": total_duration
+        "total_duration": total_duration,
+        # Ranked against the other users' average and best scores (None while
+        # there are too few of them)
+        "avg_score_percentile": cohort_index.candidate_percentile(user_id, "avg_score")["percentile"],
+        "highest_score_percentile": cohort_index.candidate_percentile(user_id, "highest_score")["percentile"]
     }
@@ -0,0 +1,135 @@
+import os
+import wave
+from bisect import bisect_right
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# Energy-based voice activity detection. Only voiced segments are sent to
+# Vosk and pitch tracking; the silences between them are kept as timing
+# metadata and word timestamps are mapped back onto the original timeline.
+VAD_ENABLED = os.getenv("SPEECH_VAD", "true").lower() in ("1", "true", "yes")
+
+FRAME_SECONDS = 0.03        # RMS window
+PADDING_SECONDS = 0.25      # kept around voiced regions so word onsets/endings aren't clipped
+MIN_GAP_SECONDS = 0.4       # shorter silences stay inside a segment
+MIN_SPEECH_SECONDS = 0.09   # drop clicks and pops
+NOISE_PERCENTILE = 10       # quietest frames estimate the noise floor
+THRESHOLD_RATIO = 3.0       # ~10 dB above the noise floor counts as voice
+ABSOLUTE_FLOOR = 1e-3       # ~-60 dBFS; digital silence never counts as voice
+
+
+class VoiceActivity:
+    """Voiced segments [(start, end)] in seconds over an audio clip"""
+
+    def __init__(self, segments: List[Tuple[float, float]], duration: float):
+        self.segments = segments
+        self.duration = duration
+        # Start of each segment on the concatenated voiced-only timeline
+        self._offsets = []
+        position = 0.0
+        for start, end in segments:
+            self._offsets.append(position)
+            position += end - start
+
+    @property
+    def voiced_seconds(self) -> float:
+        return sum(end - start for start, end in self.segments)
+
+    def silences(self, min_duration: float = 0.0) -> List[Tuple[float, float]]:
+        """Gaps between voiced segments, including leading and trailing silence"""
+        spans = []
+        position = 0.0
+        for start, end in self.segments + [(self.duration, self.duration)]:
+            if start - position > min_duration:
+                spans.append((position, start))
+            position = max(position, end)
+        return spans
+
+    def to_original(self, seconds: float) -> float:
+        """Map a time on the voiced-only timeline back to the original audio"""
+        if not self.segments:
+            return seconds
+        i = max(0, bisect_right(self._offsets, seconds) - 1)
+        start, end = self.segments[i]
+        return min(end, start + seconds - self._offsets[i])
+
+    def to_dict(self) -> Dict:
+        silences = self.silences()
+        return {
+            "duration_sec": round(self.duration, 2),
+            "voiced_sec": round(self.voiced_seconds, 2),
+            "segments": len(self.segments),
+            "leading_silence_sec": round(silences[0][1], 2) if silences and silences[0][0] == 0 else 0.0,
+            "trailing_silence_sec": round(self.duration - silences[-1][0], 2)
+            if silences and silences[-1][1] == self.duration else 0.0,
+            "long_silences": [[round(s, 2), round(e, 2)] for s, e in self.silences(min_duration=1.0)],
+        }
+
+
+def wav_frame_rms(audio_path: str) -> Optional[Tuple[np.ndarray, float, float]]:
+    """(RMS per FRAME_SECONDS window, window seconds, duration) for 16-bit mono WAV, else None.
+
+    The file is read in chunks, so memory is bounded by the RMS array.
+    """
+    with wave.open(audio_path, "rb") as wf:
+        if wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            return None
+        rate = wf.getframerate()
+        frame = max(1, int(rate * FRAME_SECONDS))
+        blocks = []
+        while True:
+            data = wf.readframes(frame * 1000)
+            if not data:
+                break
+            samples = np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+            count = len(samples) // frame
+            if count:
+                blocks.append(np.sqrt(np.mean(np.square(samples[:count * frame].reshape(count, frame)), axis=1)))
+        duration = wf.getnframes() / rate if rate else 0.0
+    rms = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    return rms, frame / rate, duration
+
+
+def detect_voice_activity(audio_path: str) -> Optional[VoiceActivity]:
+    """Voiced segments of a 16-bit mono WAV (None for other formats)"""
+    measured = wav_frame_rms(audio_path)
+    if measured is None:
+        return None
+    return segments_from_rms(*measured)
+
+
+def segments_from_rms(rms: np.ndarray, frame_seconds: float, duration: float) -> VoiceActivity:
+    """Find voiced segments from short-time RMS energy against an adaptive noise floor"""
+    if len(rms) == 0:
+        return VoiceActivity([(0.0, duration)] if duration else [], duration)
+
+    threshold = max(float(np.percentile(rms, NOISE_PERCENTILE)) * THRESHOLD_RATIO, ABSOLUTE_FLOOR)
+    voiced = (rms > threshold).astype(np.int8)
+
+    # [start, end) frame runs of voiced frames
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced, [0]))))
+    segments = []
+    for start_frame, end_frame in edges.reshape(-1, 2):
+        if (end_frame - start_frame) * frame_seconds < MIN_SPEECH_SECONDS:
+            continue
+        start = max(0.0, start_frame * frame_seconds - PADDING_SECONDS)
+        end = min(duration, end_frame * frame_seconds + PADDING_SECONDS)
+        if segments and start - segments[-1][1] < MIN_GAP_SECONDS:
+            segments[-1] = (segments[-1][0], max(end, segments[-1][1]))
+        else:
+            segments.append((start, end))
+    return VoiceActivity(segments, duration)
+
+
+def voiced_samples(samples: np.ndarray, sample_rate: int, activity: VoiceActivity,
+                   offset: float = 0.0) -> np.ndarray:
+    """Concatenate the voiced parts of samples, which start offset seconds into the audio.
+
+    Returns samples unchanged when no segments were found.
+    """
+    if not activity.segments:
+        return samples
+    end_time = offset + len(samples) / sample_rate
+    parts = [samples[int(max(0.0, start - offset) * sample_rate):int((min(end, end_time) - offset) * sample_rate)]
+             for start, end in activity.segments if end > offset and start < end_time]
+    return np.concatenate(parts) if parts else samples[:0]
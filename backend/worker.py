@@ -0,0 +1,247 @@
+"""Analysis worker.
+
+Leases analysis jobs from the shared job queue (utils/job_queue.py) and runs
+them. Start any number of workers, on as many hosts as share the queue and
+the upload spool directory; the API tier only enqueues when started with
+ANALYSIS_MODE=queue.
+
+Usage (from backend/):
+    python worker.py --concurrency 2
+    JOB_QUEUE_URL=sqlite:///srv/confidencelab/jobs.db JOB_SPOOL_DIR=/srv/confidencelab/uploads python worker.py
+
+Models are loaded and warmed before the first job is leased (see
+MODEL_WARMUP). A leased job waits until its estimated cost fits the node's
+ANALYSIS_COST_CAPACITY and ANALYSIS_MEMORY_BUDGET_MB, as in inline mode;
+--concurrency only caps the number of jobs. While a job runs its lease is
+renewed every lease/3 seconds; a worker that loses the lease stops the
+analysis. If the worker dies the lease runs out and another worker picks the
+job up again (up to JOB_MAX_ATTEMPTS). SIGTERM/Ctrl+C stops leasing and lets
+running jobs finish.
+"""
+import argparse
+import os
+import shutil
+import signal
+import socket
+import threading
+import time
+
+from utils import profiling
+from utils.admission import UNKNOWN_COST, ThreadCostLimiter, cost_capacities
+from utils.analyze import final_confidence_score, warm_up
+from utils.job_queue import JOB_LEASE_SECONDS, JOB_RETENTION_HOURS, open_queue
+from utils.media_index import discard_index
+from utils.profiles import get_profile
+from utils.tracing import Trace
+
+ANALYZE_JOB = "analyze"
+PURGE_INTERVAL_SECONDS = 600
+
+
+class JobError(Exception):
+    """An analysis that produced no result; retry is False when another attempt can't help"""
+
+    def __init__(self, message: str, retry: bool = True):
+        super().__init__(message)
+        self.retry = retry
+
+
+class LeaseKeeper(threading.Thread):
+    """Heartbeats one job's lease until stopped; the lost event is set if the lease was taken away"""
+
+    def __init__(self, queue, job, lease_seconds: float):
+        super().__init__(name=f"lease-{job.id[:8]}", daemon=True)
+        self.queue = queue
+        self.job = job
+        self.lease_seconds = lease_seconds
+        self.lost = threading.Event()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.lease_seconds / 3):
+            try:
+                if not self.queue.heartbeat(self.job.id, self.job.lease_token, self.lease_seconds):
+                    self.lost.set()
+                    return
+            except Exception as e:
+                # Keep trying; the lease only lapses if heartbeats fail for a whole lease period
+                print(f"Heartbeat for job {self.job.id} failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def remove_media(path: str):
+    """Delete a spooled upload and its cached frame index"""
+    if not path:
+        return
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)  # client-extracted frames
+        return
+    discard_index(path)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Could not remove {path}: {e}")
+
+
+def run_analysis_job(job, worker_id: str, cancelled: threading.Event = None):
+    """Analyze the upload named in an analyze job's payload; raises JobError when it fails.
+
+    Setting cancelled stops the analysis early (its result is then meaningless).
+    """
+    payload = job.payload
+    video_path = payload["video_path"]
+    if not os.path.exists(video_path):
+        raise JobError(f"Video file not found: {video_path}", retry=False)
+    audio_path = payload.get("audio_path")
+    if audio_path and not os.path.exists(audio_path):
+        audio_path = None  # extract it again from the video
+    trace = Trace()
+    profiled = payload.get("profiling", False)
+    if profiled:
+        profiling.start(trace)
+    try:
+        result = final_confidence_score(video_path, trace=trace, profile=get_profile(payload.get("profile")),
+                                        audio_path=audio_path, cancelled=cancelled)
+    finally:
+        summary = profiling.finish(trace) if profiled else None
+    # final_confidence_score reports failures as {"error": ...} rather than raising
+    if not isinstance(result, dict) or "error" in result:
+        raise JobError(result.get("error") if isinstance(result, dict) else f"Unexpected result {result!r}")
+    if "performance" in result:
+        if summary is not None:
+            result["performance"]["profiling"] = summary
+        if payload.get("admission"):
+            result["performance"]["admission"] = payload["admission"]
+        result["performance"]["job"] = {"job_id": job.id, "worker": worker_id, "attempt": job.attempts}
+    return result
+
+
+class AnalysisWorker:
+    """concurrency threads, each leasing and running one job at a time"""
+
+    def __init__(self, queue, concurrency: int = 1, lease_seconds: float = JOB_LEASE_SECONDS,
+                 poll_seconds: float = 1.0, worker_id: str = None):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.stopping = threading.Event()
+        self.limiter = ThreadCostLimiter(cost_capacities())
+
+    def run(self):
+        threads = [threading.Thread(target=self._loop, args=(f"{self.worker_id}-{slot}",), name=f"worker-{slot}")
+                   for slot in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        print(f"Worker {self.worker_id} started with {self.concurrency} slot(s)")
+        last_purge = 0.0
+        while any(thread.is_alive() for thread in threads):
+            if not self.stopping.is_set() and time.monotonic() - last_purge > PURGE_INTERVAL_SECONDS:
+                self._purge()
+                last_purge = time.monotonic()
+            for thread in threads:
+                thread.join(timeout=1.0)
+        print(f"Worker {self.worker_id} stopped")
+
+    def stop(self):
+        if not self.stopping.is_set():
+            print("Stopping: no new jobs will be leased; waiting for running jobs")
+        self.stopping.set()
+
+    def _loop(self, slot_id: str):
+        while not self.stopping.is_set():
+            try:
+                job = self.queue.lease(slot_id, self.lease_seconds, kinds=[ANALYZE_JOB])
+            except Exception as e:
+                print(f"Lease failed: {e}")
+                job = None
+            if job is None:
+                self.stopping.wait(self.poll_seconds)
+                continue
+            self._process(job, slot_id)
+
+    def _process(self, job, slot_id: str):
+        keeper = LeaseKeeper(self.queue, job, self.lease_seconds)
+        keeper.start()
+        error = None
+        try:
+            result = self._run(job, slot_id, keeper.lost)
+        except Exception as e:
+            error = e
+        finally:
+            keeper.stop()
+        if keeper.lost.is_set():
+            # Another worker owns the job now; it also owns the upload
+            print(f"Job {job.id}: lease lost, analysis abandoned")
+            return
+        if error is not None:
+            recorded = self.queue.fail(job.id, job.lease_token, str(error), retry=getattr(error, "retry", True))
+            print(f"Job {job.id} failed: {error}")
+        else:
+            recorded = self.queue.complete(job.id, job.lease_token, result)
+        if not recorded:
+            # Another worker owns the job now; it also owns the upload
+            print(f"Job {job.id}: lease lost, result discarded")
+            return
+        current = self.queue.get(job.id)
+        if current is not None and current.finished:
+            remove_media(job.payload.get("video_path"))
+            remove_media(job.payload.get("audio_path"))
+
+    def _run(self, job, slot_id: str, lease_lost: threading.Event):
+        """Run the job once its estimated cost fits this node (None if the lease was lost meanwhile)"""
+        # Jobs queued before their amounts were recorded are charged as unknown
+        amounts = (job.payload.get("admission") or {}).get("amounts") or {"cost": UNKNOWN_COST}
+        with self.limiter.reserve(amounts, cancelled=lease_lost) as granted:
+            if not granted:
+                return None
+            started = time.time()
+            print(f"Job {job.id} started on {slot_id} (attempt {job.attempts}/{job.max_attempts})")
+            result = run_analysis_job(job, slot_id, cancelled=lease_lost)
+            if not lease_lost.is_set():
+                print(f"Job {job.id} finished in {time.time() - started:.1f}s")
+            return result
+
+    def _purge(self):
+        try:
+            for job in self.queue.purge(JOB_RETENTION_HOURS * 3600):
+                remove_media(job.payload.get("video_path"))
+                remove_media(job.payload.get("audio_path"))
+        except Exception as e:
+            print(f"Purging finished jobs failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analysis jobs from the shared job queue")
+    parser.add_argument("--queue", help="Job queue URL (default: JOB_QUEUE_URL)")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("ANALYSIS_WORKERS", "2")),
+                        help="Jobs analysed at once on this node")
+    parser.add_argument("--lease-seconds", type=float, default=JOB_LEASE_SECONDS)
+    parser.add_argument("--poll-seconds", type=float, default=1.0, help="Wait between polls of an empty queue")
+    parser.add_argument("--worker-id", help="Name reported in job status (default: host-pid)")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Start leasing jobs without loading the models first (MODEL_WARMUP=false)")
+    args = parser.parse_args()
+
+    if not args.no_warmup and os.getenv("MODEL_WARMUP", "true").lower() in ("1", "true", "yes"):
+        # Only lease jobs once the models are loaded, so no job pays for a cold start
+        profiles = os.getenv("MODEL_WARMUP_PROFILES", "fast,balanced").split(",")
+        state = warm_up([get_profile(name.strip()).pose_complexity for name in profiles if name.strip()])
+        print(f"Models warmed up in {state['seconds']:.1f}s" if state["ready"] else
+              f"Warm-up incomplete: {[name for name, step in state['steps'].items() if not step['ok']]}")
+
+    worker = AnalysisWorker(open_queue(args.queue), args.concurrency, args.lease_seconds,
+                            args.poll_seconds, args.worker_id)
+    signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
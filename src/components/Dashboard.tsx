@@ -45,11 +45,20 @@ interface DashboardProps {
 function Dashboard({ user, onLogout }: DashboardProps) {
   const [selectedTopic, setSelectedTopic] = useState<string | null>(null);
   const [showSessions, setShowSessions] = useState(false);
-  const [stats, setStats] = useState({
+  const [stats, setStats] = useState<{
+    totalSessions: number;
+    avgScore: number;
+    highestScore: number;
+    totalDuration: number;
+    avgScorePercentile: number | null;
+    highestScorePercentile: number | null;
+  }>({
     totalSessions: 0,
     avgScore: 0,
     highestScore: 0,
-    totalDuration: 0
+    totalDuration: 0,
+    avgScorePercentile: null,
+    highestScorePercentile: null
   });
 
   useEffect(() => {
@@ -143,6 +152,9 @@ function Dashboard({ user, onLogout }: DashboardProps) {
                 <p className="text-3xl font-bold bg-gradient-to-r from-blue-400 to-blue-600 text-transparent bg-clip-text">
                   {stats.avgScore}%
                 </p>
+                {stats.avgScorePercentile !== null && (
+                  <p className="text-xs text-gray-500">Better than {Math.round(stats.avgScorePercentile)}% of candidates</p>
+                )}
               </div>
             </div>
           </div>
@@ -155,6 +167,9 @@ function Dashboard({ user, onLogout }: DashboardProps) {
                 <p className="text-3xl font-bold bg-gradient-to-r from-green-400 to-green-600 text-transparent bg-clip-text">
                   {stats.highestScore}%
                 </p>
+                {stats.highestScorePercentile !== null && (
+                  <p className="text-xs text-gray-500">Better than {Math.round(stats.highestScorePercentile)}% of candidates</p>
+                )}
               </div>
             </div>
           </div>
@@ -2,6 +2,8 @@ import { useState, useEffect, useRef } from 'react';
 import { Video, X, RotateCcw, Clock, Lightbulb } from 'lucide-react';
 import { addSession, getCurrentUser } from '../utils/auth';
 import { getRandomQuestion, Question } from '../utils/questionLoader';
+import { analyzeRecording } from '../utils/upload';
+import { startReducedCapture, ReducedCapture, ReducedMedia } from '../utils/reducedCapture';
 
 interface HRInterviewProps {
   onClose: () => void;
@@ -36,6 +38,8 @@ function HRInterview({ onClose }: HRInterviewProps) {
   const chunksRef = useRef<Blob[]>([]);
   const videoRef = useRef<HTMLVideoElement>(null);
   const streamRef = useRef<MediaStream | null>(null);
+  const reducedRef = useRef<ReducedCapture | null>(null);
+  const reducedMediaRef = useRef<Promise<ReducedMedia> | null>(null);
 
   useEffect(() => {
     let interval: number;
@@ -176,6 +180,8 @@ function HRInterview({ onClose }: HRInterviewProps) {
       };
 
       recorder.start();
+      reducedRef.current = startReducedCapture(stream);
+      reducedMediaRef.current = null;
       setMediaRecorder(recorder);
       setIsRecording(true);
       setTimer(0);
@@ -188,6 +194,9 @@ function HRInterview({ onClose }: HRInterviewProps) {
   };
 
   const stopRecording = () => {
+    // Before the tracks stop, so the reduced capture gets every frame
+    reducedMediaRef.current = reducedRef.current?.stop() ?? null;
+    reducedRef.current = null;
     mediaRecorder?.stop();
 
     if (streamRef.current) {
@@ -198,20 +207,12 @@ function HRInterview({ onClose }: HRInterviewProps) {
     setIsRecording(false);
   };
 
-  const analyzeVideo = async (blob: Blob) => {
+  const analyzeVideo = async (blob: Blob, reducedMedia?: Promise<ReducedMedia> | null) => {
     setIsAnalyzing(true);
     setScore(null);
 
-    const formData = new FormData();
-    formData.append("file", blob, "hr_interview.webm");
-
     try {
-      const response = await fetch("http://127.0.0.1:8000/analyze", {
-        method: "POST",
-        body: formData,
-      });
-
-      const data = await response.json();
+      const data = await analyzeRecording(blob, "hr_interview.webm", '', await reducedMedia);
       if (data.error) {
         throw new Error(data.error);
       }
@@ -438,7 +439,7 @@ function HRInterview({ onClose }: HRInterviewProps) {
 
               {!isRecording && videoURL && recordedBlob && (
                 <button
-                  onClick={() => analyzeVideo(recordedBlob)}
+                  onClick={() => analyzeVideo(recordedBlob, reducedMediaRef.current)}
                   disabled={isAnalyzing}
                   className="px-6 py-3 bg-emerald-600 hover:bg-emerald-700 text-white rounded-lg flex items-center gap-2 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
                 >
@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { Video, X } from 'lucide-react';
-import { addSession, getCurrentUser } from '../utils/auth';
+import { getCurrentUser } from '../utils/auth';
+import { analyzeInterview } from '../utils/upload';
 
 interface InterviewSimulatorProps {
   topic: {
@@ -18,6 +19,9 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
   const [videoURL, setVideoURL] = useState<string | null>(null);
   const [cameraLabel, setCameraLabel] = useState<string | null>(null);
   const [isAnalyzing, setIsAnalyzing] = useState(false);
+  // Answers recorded (or uploaded) so far; analysed together when the interview ends
+  const [answers, setAnswers] = useState<Blob[]>([]);
+  const [answerScores, setAnswerScores] = useState<(number | null)[]>([]);
 
   const chunksRef = useRef<Blob[]>([]);
   const videoRef = useRef<HTMLVideoElement>(null);
@@ -33,25 +37,6 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
     return () => clearInterval(interval);
   }, [isRecording]);
 
-  // Save session when score is received
-  useEffect(() => {
-    const saveSession = async () => {
-      if (score !== null && score > 0) {
-        const currentUser = getCurrentUser();
-        
-        if (currentUser) {
-          try {
-            await addSession(currentUser.id, topic.name, score, timer);
-          } catch (error) {
-            console.error("Failed to save session:", error);
-          }
-        }
-      }
-    };
-
-    saveSession();
-  }, [score, timer, topic.name]);
-
   const formatTime = (seconds: number) => {
     const mins = Math.floor(seconds / 60);
     const secs = seconds % 60;
@@ -111,7 +96,7 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
           videoRef.current.src = finalURL;
         }
 
-        analyzeVideo(completeBlob);
+        setAnswers((previous) => [...previous, completeBlob]);
       };
 
       recorder.start();
@@ -137,27 +122,22 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
     setIsRecording(false);
   };
 
-  const analyzeVideo = async (blob: Blob) => {
+  // One /interviews/analyze request for all answers; the backend saves the
+  // scored answers as sessions in a single write
+  const analyzeAnswers = async () => {
     setIsAnalyzing(true);
     setScore(null);
 
-    const formData = new FormData();
-    formData.append("file", blob, "interview.webm");
-
     try {
-      const response = await fetch("http://127.0.0.1:8000/analyze", {
-        method: "POST",
-        body: formData,
-      });
-
-      const data = await response.json();
-      if (data.error) {
-        throw new Error(data.error);
+      const data = await analyzeInterview(answers, topic.name, getCurrentUser()?.id);
+      if (data.report.score === null) {
+        throw new Error('No answer could be scored');
       }
-      setScore(data.score);
+      setScore(data.report.score);
+      setAnswerScores(data.answers.map((answer: { result: { score?: number } }) => answer.result.score ?? null));
     } catch (err) {
-      console.error("❌ Failed to analyze video:", err);
-      alert("❌ Failed to analyze the video. Check backend connection.");
+      console.error("❌ Failed to analyze interview:", err);
+      alert("❌ Failed to analyze the interview. Check backend connection.");
     } finally {
       setIsAnalyzing(false);
     }
@@ -201,23 +181,35 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
           <div className="flex flex-col items-center gap-4 mb-6">
             <button
               onClick={isRecording ? stopRecording : startRecording}
-              disabled={isAnalyzing}
+              disabled={isAnalyzing || score !== null}
               className={`px-6 py-3 rounded-lg flex items-center gap-2 transition-all ${
                 isRecording
                   ? 'bg-red-500 hover:bg-red-600 text-white'
                   : 'bg-indigo-600 hover:bg-indigo-700 text-white'
-              } ${isAnalyzing ? 'opacity-50 cursor-not-allowed' : ''}`}
+              } ${isAnalyzing || score !== null ? 'opacity-50 cursor-not-allowed' : ''}`}
             >
               {isRecording ? (
                 <>
-                  <span className="animate-pulse">●</span> Stop Recording
+                  <span className="animate-pulse">●</span> Stop Answer
                 </>
               ) : (
                 <>
-                  <Video className="w-5 h-5" /> Start Recording
+                  <Video className="w-5 h-5" /> Record Answer {answers.length + 1}
                 </>
               )}
             </button>
+
+            {!isRecording && answers.length > 0 && score === null && (
+              <button
+                onClick={analyzeAnswers}
+                disabled={isAnalyzing}
+                className={`px-6 py-3 rounded-lg bg-green-600 hover:bg-green-700 text-white transition-all ${
+                  isAnalyzing ? 'opacity-50 cursor-not-allowed' : ''
+                }`}
+              >
+                Finish Interview ({answers.length} {answers.length === 1 ? 'answer' : 'answers'})
+              </button>
+            )}
   
             {!isRecording && (videoURL || score !== null) && (
               <button
@@ -225,6 +217,8 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
                   setVideoURL(null);
                   setScore(null);
                   setTimer(0);
+                  setAnswers([]);
+                  setAnswerScores([]);
                 }}
                 className="text-sm text-gray-500 hover:text-gray-700 underline"
               >
@@ -235,18 +229,17 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
   
           {/* File Upload */}
           <div className="mb-6 border-t pt-6">
-            <h3 className="text-lg font-medium mb-2">Upload a video file for analysis</h3>
+            <h3 className="text-lg font-medium mb-2">Upload a video file as an answer</h3>
             <input
               type="file"
               accept="video/*"
-              disabled={isAnalyzing}
+              disabled={isAnalyzing || score !== null}
               onChange={(e) => {
                 const file = e.target.files?.[0];
                 if (file) {
                   const url = URL.createObjectURL(file);
                   setVideoURL(url);
-                  analyzeVideo(file);
-                  
+                  setAnswers((previous) => [...previous, file]);
                 }
               }}
               className="mb-4 block w-full"
@@ -256,7 +249,7 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
           {/* Analyzing Loader */}
           {isAnalyzing && (
             <div className="text-center text-gray-600 my-4 animate-pulse">
-              ⏳ Analyzing your performance...
+              ⏳ Analyzing your {answers.length} {answers.length === 1 ? 'answer' : 'answers'}...
             </div>
           )}
   
@@ -276,6 +269,15 @@ function InterviewSimulator({ topic, onClose }: InterviewSimulatorProps) {
             <div className="bg-gray-50 rounded-lg p-6 text-center border-t mt-6">
               <h3 className="text-xl font-semibold mb-2">Performance Score</h3>
               <div className="text-4xl font-bold text-indigo-600 mb-4">{score}%</div>
+              {answerScores.length > 1 && (
+                <ul className="text-sm text-gray-600 mb-4">
+                  {answerScores.map((answerScore, index) => (
+                    <li key={index}>
+                      Answer {index + 1}: {answerScore !== null ? `${answerScore}%` : 'not scored'}
+                    </li>
+                  ))}
+                </ul>
+              )}
               <div className="text-gray-600">
                 <p className="mb-2">Areas for improvement:</p>
                 <ul className="text-left max-w-md mx-auto list-disc list-inside text-sm">
@@ -117,13 +117,15 @@ export const getUserStats = async (userId: string) => {
         totalSessions: response.stats.total_sessions,
         avgScore: response.stats.avg_score,
         highestScore: response.stats.highest_score,
-        totalDuration: response.stats.total_duration
+        totalDuration: response.stats.total_duration,
+        avgScorePercentile: response.stats.avg_score_percentile ?? null,
+        highestScorePercentile: response.stats.highest_score_percentile ?? null
       };
     }
     
-    return { totalSessions: 0, avgScore: 0, highestScore: 0, totalDuration: 0 };
+    return { totalSessions: 0, avgScore: 0, highestScore: 0, totalDuration: 0, avgScorePercentile: null, highestScorePercentile: null };
   } catch  {
-    return { totalSessions: 0, avgScore: 0, highestScore: 0, totalDuration: 0 };
+    return { totalSessions: 0, avgScore: 0, highestScore: 0, totalDuration: 0, avgScorePercentile: null, highestScorePercentile: null };
   }
 };
 
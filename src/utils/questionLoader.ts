@@ -39,16 +39,53 @@ export const loadQuestions = async (interviewType: 'hr' | 'technical' | 'behavio
   }
 };
 
+export interface QuestionQuery {
+  difficulty?: 'easy' | 'medium' | 'hard';
+  category?: string;
+  sample?: number;
+}
+
+// Fetch a filtered/sampled subset from the server without downloading the whole bank
+export const queryQuestions = async (
+  interviewType: 'hr' | 'technical' | 'behavioral',
+  query: QuestionQuery
+): Promise<Question[]> => {
+  // Serve from the full bank when it is already cached
+  if (questionsCache[interviewType] && !query.sample) {
+    return questionsCache[interviewType].filter(q =>
+      (!query.difficulty || q.difficulty === query.difficulty) &&
+      (!query.category || q.category.toLowerCase() === query.category.toLowerCase())
+    );
+  }
+
+  const params = new URLSearchParams();
+  if (query.difficulty) params.set('difficulty', query.difficulty);
+  if (query.category) params.set('category', query.category);
+  if (query.sample) params.set('sample', String(query.sample));
+
+  try {
+    const response = await fetch(`http://localhost:8000/questions/${interviewType}?${params.toString()}`);
+    if (!response.ok) {
+      throw new Error(`Failed to load questions: ${response.statusText}`);
+    }
+
+    const data: QuestionSet = await response.json();
+    return data.questions;
+  } catch (error) {
+    console.error(`Error querying ${interviewType} questions:`, error);
+    return [];
+  }
+};
+
 // Get a random question from the specified interview type
 export const getRandomQuestion = async (interviewType: 'hr' | 'technical' | 'behavioral'): Promise<Question | null> => {
-  const questions = await loadQuestions(interviewType);
-  
-  if (questions.length === 0) {
-    return null;
+  if (questionsCache[interviewType]) {
+    const questions = questionsCache[interviewType];
+    return questions.length > 0 ? questions[Math.floor(Math.random() * questions.length)] : null;
   }
-  
-  const randomIndex = Math.floor(Math.random() * questions.length);
-  return questions[randomIndex];
+
+  const questions = await queryQuestions(interviewType, { sample: 1 });
+  return questions.length > 0 ? questions[0] : null;
 };
 
 // Get questions by difficulty level
@@ -56,8 +93,7 @@ export const getQuestionsByDifficulty = async (
   interviewType: 'hr' | 'technical' | 'behavioral',
   difficulty: 'easy' | 'medium' | 'hard'
 ): Promise<Question[]> => {
-  const questions = await loadQuestions(interviewType);
-  return questions.filter(q => q.difficulty === difficulty);
+  return queryQuestions(interviewType, { difficulty });
 };
 
 // Get questions by category
@@ -65,8 +101,7 @@ export const getQuestionsByCategory = async (
   interviewType: 'hr' | 'technical' | 'behavioral',
   category: string
 ): Promise<Question[]> => {
-  const questions = await loadQuestions(interviewType);
-  return questions.filter(q => q.category === category);
+  return queryQuestions(interviewType, { category });
 };
 
 // Clear cache (useful for development/testing)
@@ -0,0 +1,129 @@
+// Client-side reduced recording: alongside the full recording, capture a
+// low-FPS downscaled video and 16 kHz mono WAV audio, which is what the
+// backend analyses anyway. Uploads are a fraction of the size and the
+// server skips audio extraction.
+
+const REDUCED_FPS = 5;
+const REDUCED_WIDTH = 480;
+const AUDIO_SAMPLE_RATE = 16000;
+
+export const reducedUploadEnabled = import.meta.env.VITE_REDUCED_UPLOAD !== 'false';
+
+export interface ReducedMedia {
+  video: Blob;
+  audio: Blob;
+}
+
+export interface ReducedCapture {
+  stop: () => Promise<ReducedMedia>;
+}
+
+const encodeWav = (chunks: Float32Array[], sampleRate: number): Blob => {
+  const length = chunks.reduce((total, chunk) => total + chunk.length, 0);
+  const buffer = new ArrayBuffer(44 + length * 2);
+  const view = new DataView(buffer);
+  const writeString = (offset: number, value: string) => {
+    for (let i = 0; i < value.length; i++) view.setUint8(offset + i, value.charCodeAt(i));
+  };
+
+  writeString(0, 'RIFF');
+  view.setUint32(4, 36 + length * 2, true);
+  writeString(8, 'WAVE');
+  writeString(12, 'fmt ');
+  view.setUint32(16, 16, true);
+  view.setUint16(20, 1, true); // PCM
+  view.setUint16(22, 1, true); // mono
+  view.setUint32(24, sampleRate, true);
+  view.setUint32(28, sampleRate * 2, true);
+  view.setUint16(32, 2, true);
+  view.setUint16(34, 16, true);
+  writeString(36, 'data');
+  view.setUint32(40, length * 2, true);
+
+  let offset = 44;
+  for (const chunk of chunks) {
+    for (let i = 0; i < chunk.length; i++, offset += 2) {
+      const sample = Math.max(-1, Math.min(1, chunk[i]));
+      view.setInt16(offset, sample < 0 ? sample * 0x8000 : sample * 0x7fff, true);
+    }
+  }
+  return new Blob([buffer], { type: 'audio/wav' });
+};
+
+// Start a reduced capture of a camera stream; null when disabled or the
+// browser can't do it (the caller then uploads the full recording)
+export const startReducedCapture = (stream: MediaStream): ReducedCapture | null => {
+  if (!reducedUploadEnabled) return null;
+  const [videoTrack] = stream.getVideoTracks();
+  const [audioTrack] = stream.getAudioTracks();
+  if (!videoTrack || !audioTrack) return null;
+
+  let audioContext: AudioContext | null = null;
+  let timer: number | undefined;
+  try {
+    // Video: redraw the camera into a small canvas at REDUCED_FPS
+    const settings = videoTrack.getSettings();
+    const scale = Math.min(1, REDUCED_WIDTH / (settings.width || REDUCED_WIDTH));
+    const canvas = document.createElement('canvas');
+    canvas.width = Math.round((settings.width || REDUCED_WIDTH) * scale);
+    canvas.height = Math.round((settings.height || (REDUCED_WIDTH * 9) / 16) * scale);
+    const context = canvas.getContext('2d');
+    if (!context) return null;
+
+    const source = document.createElement('video');
+    source.muted = true;
+    source.playsInline = true;
+    source.srcObject = new MediaStream([videoTrack]);
+    source.play().catch(() => undefined);
+    timer = window.setInterval(() => {
+      context.drawImage(source, 0, 0, canvas.width, canvas.height);
+    }, 1000 / REDUCED_FPS);
+
+    const videoChunks: Blob[] = [];
+    const videoRecorder = new MediaRecorder(canvas.captureStream(REDUCED_FPS), { mimeType: 'video/webm' });
+    videoRecorder.ondataavailable = (e) => {
+      if (e.data.size > 0) videoChunks.push(e.data);
+    };
+
+    // Audio: resampled by the browser to 16 kHz, kept as raw PCM for the WAV
+    audioContext = new AudioContext({ sampleRate: AUDIO_SAMPLE_RATE });
+    if (audioContext.sampleRate !== AUDIO_SAMPLE_RATE) {
+      window.clearInterval(timer);
+      audioContext.close();
+      return null;
+    }
+    const audioChunks: Float32Array[] = [];
+    const input = audioContext.createMediaStreamSource(new MediaStream([audioTrack]));
+    const processor = audioContext.createScriptProcessor(4096, 1, 1);
+    processor.onaudioprocess = (e) => {
+      audioChunks.push(new Float32Array(e.inputBuffer.getChannelData(0)));
+    };
+    input.connect(processor);
+    processor.connect(audioContext.destination);
+    videoRecorder.start();
+
+    const activeContext = audioContext;
+    return {
+      stop: () =>
+        new Promise<ReducedMedia>((resolve) => {
+          window.clearInterval(timer);
+          processor.disconnect();
+          input.disconnect();
+          activeContext.close();
+          source.srcObject = null;
+          videoRecorder.onstop = () => {
+            resolve({
+              video: new Blob(videoChunks, { type: 'video/webm' }),
+              audio: encodeWav(audioChunks, AUDIO_SAMPLE_RATE),
+            });
+          };
+          videoRecorder.stop();
+        }),
+    };
+  } catch (err) {
+    console.warn('Reduced capture unavailable, uploading the full recording:', err);
+    window.clearInterval(timer);
+    audioContext?.close();
+    return null;
+  }
+};
@@ -0,0 +1,145 @@
+import type { ReducedMedia } from './reducedCapture';
+
+const API_BASE = 'http://127.0.0.1:8000';
+
+// Recordings above this size go through the resumable upload protocol
+const RESUMABLE_THRESHOLD_BYTES = 8 * 1024 * 1024;
+const CHUNK_BYTES = 4 * 1024 * 1024;
+const MAX_RETRIES = 5;
+const JOB_POLL_MS = 2000;
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+const sha256Hex = async (data: ArrayBuffer): Promise<string> => {
+  const digest = await crypto.subtle.digest('SHA-256', data);
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
+const currentOffset = async (uploadId: string): Promise<number> => {
+  const response = await fetch(`${API_BASE}/uploads/${uploadId}`);
+  if (!response.ok) {
+    throw new Error('Upload expired on the server');
+  }
+  return (await response.json()).offset;
+};
+
+// With ANALYSIS_MODE=queue the backend may answer 202 with a job to poll
+// instead of the result; resolve either to the result body
+export const analysisResult = async (response: Response) => {
+  if (response.status !== 202) {
+    return response.json();
+  }
+  const { status_url: statusUrl } = await response.json();
+  for (;;) {
+    await sleep(JOB_POLL_MS);
+    const job = await fetch(`${API_BASE}${statusUrl}`);
+    if (!job.ok) {
+      throw new Error('Analysis job disappeared');
+    }
+    const { status, result, error } = await job.json();
+    if (status === 'succeeded') {
+      return result;
+    }
+    if (status === 'failed') {
+      return { error: error || 'Analysis failed' };
+    }
+  }
+};
+
+// Upload in checksummed chunks; after a dropped connection only the chunks
+// the server hasn't acknowledged are sent again
+const uploadResumable = async (blob: Blob, filename: string, query: string) => {
+  const created = await fetch(`${API_BASE}/uploads`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ filename, length: blob.size, sha256: await sha256Hex(await blob.arrayBuffer()) }),
+  });
+  if (!created.ok) {
+    const error = await created.json();
+    throw new Error(error.detail || 'Could not start upload');
+  }
+  const { upload_id: uploadId } = await created.json();
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < blob.size) {
+    const chunk = await blob.slice(offset, offset + CHUNK_BYTES).arrayBuffer();
+    try {
+      const response = await fetch(`${API_BASE}/uploads/${uploadId}`, {
+        method: 'PATCH',
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(offset),
+          'Upload-Checksum': `sha256 ${await sha256Hex(chunk)}`,
+        },
+        body: chunk,
+      });
+      if (response.status === 409 || response.status === 460) {
+        // Offset conflict or checksum mismatch: resync, but don't loop forever
+        if (++failures > MAX_RETRIES) {
+          throw new Error(response.status === 460 ? 'Chunk checksum keeps failing' : 'Upload offset keeps conflicting');
+        }
+        offset = await currentOffset(uploadId);
+        continue;
+      }
+      if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.detail || 'Upload failed');
+      }
+      offset = (await response.json()).offset;
+      failures = 0;
+    } catch (err) {
+      if (!(err instanceof TypeError) || ++failures > MAX_RETRIES) {
+        throw err;
+      }
+      // Network error: back off, then resume from what the server has
+      await sleep(1000 * 2 ** failures);
+      offset = await currentOffset(uploadId);
+    }
+  }
+
+  const response = await fetch(`${API_BASE}/uploads/${uploadId}/finalize${query}`, { method: 'POST' });
+  return analysisResult(response);
+};
+
+// Analyze a recording; returns the analysis result body. With a reduced
+// capture only the small video and the 16 kHz audio are uploaded.
+export const analyzeRecording = async (blob: Blob, filename: string, query = '', reduced?: ReducedMedia | null) => {
+  const formData = new FormData();
+  if (reduced) {
+    formData.append('file', reduced.video, 'reduced.webm');
+    formData.append('audio', reduced.audio, 'audio.wav');
+  } else if (blob.size > RESUMABLE_THRESHOLD_BYTES) {
+    return uploadResumable(blob, filename, query);
+  } else {
+    formData.append('file', blob, filename);
+  }
+  const response = await fetch(`${API_BASE}/analyze${query}`, {
+    method: 'POST',
+    body: formData,
+  });
+  return analysisResult(response);
+};
+
+// Analyze every answer of a mock interview in one /interviews/analyze request.
+// With a userId the backend also saves the scored answers as sessions.
+export const analyzeInterview = async (answers: Blob[], topic: string, userId?: string) => {
+  const formData = new FormData();
+  answers.forEach((blob, index) =>
+    formData.append('files', blob, blob instanceof File ? blob.name : `answer-${index + 1}.webm`));
+  formData.append('topic', topic);
+  if (userId) {
+    formData.append('user_id', userId);
+  }
+  const response = await fetch(`${API_BASE}/interviews/analyze`, {
+    method: 'POST',
+    body: formData,
+  });
+  if (!response.ok) {
+    const error = await response.json();
+    throw new Error(error.detail || 'Interview analysis failed');
+  }
+  return response.json();
+};
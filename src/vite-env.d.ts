@@ -2,4 +2,5 @@
 
 interface ImportMetaEnv {
     readonly VITE_API_URL: string;  // Add this line
+    readonly VITE_REDUCED_UPLOAD?: string;
   }
\ No newline at end of file